@@ -0,0 +1,168 @@
+"""
+MÓDULO: Motor de Alertas em Streaming
+Avalia regras configuráveis a cada evento ingerido, mantendo estado por device
+"""
+
+import json
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from models import AlertRule, TelemetryEvent
+
+logger = logging.getLogger(__name__)
+
+
+# ==================== REGRAS PADRÃO ====================
+
+DEFAULT_RULES = [
+    AlertRule(
+        rule_id="high_speed",
+        alert_type="high_speed",
+        metric="speed_kmh",
+        operator="gt",
+        threshold=90.0,
+        cooldown_s=60.0,
+        message="Velocidade acima de {threshold:.0f} km/h: {value:.1f} km/h"
+    ),
+    AlertRule(
+        rule_id="engine_overheat",
+        alert_type="engine_temp",
+        metric="engine_temp_c",
+        operator="gt",
+        threshold=105.0,
+        duration_s=30.0,
+        message="Temperatura do motor acima de {threshold:.0f} °C: {value:.1f} °C"
+    ),
+    AlertRule(
+        rule_id="low_battery",
+        alert_type="battery",
+        metric="battery_v",
+        operator="lt",
+        threshold=11.8,
+        duration_s=60.0,
+        message="Bateria abaixo de {threshold:.1f} V: {value:.2f} V"
+    ),
+]
+
+VALID_METRICS = {"speed_kmh", "engine_temp_c", "battery_v"}
+VALID_OPERATORS = {"gt", "lt"}
+
+
+def load_rules(path: str) -> List[AlertRule]:
+    """
+    Carrega regras de um arquivo JSON (lista de AlertRule)
+    Sem arquivo configurado, usa as regras padrão
+    """
+    if not path:
+        return list(DEFAULT_RULES)
+
+    with open(path, encoding="utf-8") as f:
+        rules = [AlertRule(**item) for item in json.load(f)]
+
+    for rule in rules:
+        if rule.metric not in VALID_METRICS:
+            raise ValueError(f"Métrica inválida na regra {rule.rule_id}: {rule.metric}")
+        if rule.operator not in VALID_OPERATORS:
+            raise ValueError(f"Operador inválido na regra {rule.rule_id}: {rule.operator}")
+
+    logger.info(f"Loaded {len(rules)} alert rules from {path}")
+    return rules
+
+
+# ==================== ESTADO POR DEVICE ====================
+
+class _RuleState:
+    """Estado de uma regra para um device (debounce)"""
+    __slots__ = ("since", "fired", "last_fired")
+
+    def __init__(self):
+        self.since: Optional[datetime] = None       # Início da condição atual
+        self.fired = False                          # Já disparou neste episódio
+        self.last_fired: Optional[datetime] = None  # Último disparo (cooldown)
+
+
+class AlertEngine:
+    """
+    Avalia regras incrementalmente a cada evento
+
+    - Regras da frota (device_id=None) valem para todos os devices
+    - Regra com device_id sobrescreve a regra da frota de mesmo rule_id
+    - Um alerta dispara no máximo uma vez por episódio da condição,
+      depois de sustentada por duration_s e respeitando cooldown_s
+    """
+
+    def __init__(self, rules: Optional[List[AlertRule]] = None):
+        self.state: Dict[str, Dict[str, _RuleState]] = {}
+        self.set_rules(rules if rules is not None else DEFAULT_RULES)
+
+    def set_rules(self, rules: List[AlertRule]):
+        """Substitui o conjunto de regras (estado é descartado)"""
+        self.rules = list(rules)
+        self.fleet_rules = {r.rule_id: r for r in self.rules if r.device_id is None}
+        self.device_rules: Dict[str, Dict[str, AlertRule]] = {}
+        for rule in self.rules:
+            if rule.device_id is not None:
+                self.device_rules.setdefault(rule.device_id, {})[rule.rule_id] = rule
+        self._resolved: Dict[str, List[AlertRule]] = {}
+        self.state.clear()
+
+    def rules_for(self, device_id: str) -> List[AlertRule]:
+        """Regras efetivas de um device (cacheadas)"""
+        rules = self._resolved.get(device_id)
+        if rules is None:
+            merged = dict(self.fleet_rules)
+            merged.update(self.device_rules.get(device_id, {}))
+            rules = list(merged.values())
+            self._resolved[device_id] = rules
+        return rules
+
+    def process(self, event: TelemetryEvent) -> List[dict]:
+        """Avalia o evento e retorna os alertas disparados"""
+        fired = []
+        device_state = self.state.get(event.device_id)
+        if device_state is None:
+            device_state = self.state[event.device_id] = {}
+
+        for rule in self.rules_for(event.device_id):
+            value = getattr(event, rule.metric)
+            if value is None:
+                continue
+
+            st = device_state.get(rule.rule_id)
+            if st is None:
+                st = device_state[rule.rule_id] = _RuleState()
+
+            if rule.operator == "gt":
+                active = value > rule.threshold
+            else:
+                active = value < rule.threshold
+
+            if not active:
+                # Fim do episódio: rearma a regra
+                st.since = None
+                st.fired = False
+                continue
+
+            if st.since is None or event.ts < st.since:
+                st.since = event.ts
+            if st.fired:
+                continue
+            if (event.ts - st.since).total_seconds() < rule.duration_s:
+                continue
+            if (st.last_fired is not None
+                    and (event.ts - st.last_fired).total_seconds() < rule.cooldown_s):
+                continue
+
+            st.fired = True
+            st.last_fired = event.ts
+            fired.append({
+                "device_id": event.device_id,
+                "ts": event.ts,
+                "alert_type": rule.alert_type,
+                "rule_id": rule.rule_id,
+                "value": float(value),
+                "message": rule.message.format(value=value, threshold=rule.threshold)
+            })
+
+        return fired
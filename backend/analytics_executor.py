@@ -0,0 +1,135 @@
+"""
+MÓDULO: Executor de analytics
+Análises CPU-bound fora do event loop (processos ou threads), com
+timeout por requisição e medição do atraso do event loop
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import AsyncIterator, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_KINDS = ("process", "thread")
+
+
+class AnalyticsTimeout(Exception):
+    """Análise excedeu o tempo limite da requisição"""
+
+
+class AnalyticsExecutor:
+    """
+    Pool de workers para análises por device
+
+    Com "process" cada device é analisado em outro processo (sem GIL);
+    argumentos e resultados precisam ser serializáveis (pickle).
+    """
+
+    def __init__(self, kind: str = "process", workers: int = 0, timeout_s: float = 30.0):
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"Executor kind must be one of: {', '.join(EXECUTOR_KINDS)}")
+        self.kind = kind
+        self.workers = workers or os.cpu_count() or 4
+        self.timeout_s = timeout_s
+        self.pool: Optional[Executor] = None
+
+    def start(self):
+        if self.kind == "process":
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        else:
+            self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="analytics")
+        logger.info(f"Analytics executor: {self.workers} {self.kind} workers")
+
+    def shutdown(self):
+        if self.pool:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+    async def run(self, fn: Callable, *args):
+        """Executa fn(*args) no pool"""
+        return await asyncio.get_running_loop().run_in_executor(self.pool, fn, *args)
+
+    async def map_devices(
+        self,
+        fn: Callable,
+        items: AsyncIterator[Tuple[str, object]],
+        *args
+    ) -> List:
+        """
+        fn(device_id, dados, *args) para cada item, em paralelo
+
+        No máximo 2x workers devices ficam pendentes (memória limitada).
+        Se a requisição for cancelada, o que ainda não começou é descartado;
+        o que já está rodando num worker termina e o resultado é ignorado.
+        """
+        loop = asyncio.get_running_loop()
+        pending = deque()
+        results = []
+        try:
+            async for device_id, data in items:
+                pending.append(loop.run_in_executor(self.pool, fn, device_id, data, *args))
+                if len(pending) >= 2 * self.workers:
+                    results.append(await pending.popleft())
+            while pending:
+                results.append(await pending.popleft())
+        finally:
+            for future in pending:
+                future.cancel()
+        return results
+
+    async def with_timeout(self, coro):
+        """Aguarda a análise; cancela e levanta AnalyticsTimeout após timeout_s"""
+        try:
+            return await asyncio.wait_for(coro, self.timeout_s)
+        except asyncio.TimeoutError:
+            raise AnalyticsTimeout(f"Analytics exceeded {self.timeout_s:g}s")
+
+
+class LoopLagMonitor:
+    """
+    Mede o atraso do event loop: uma task dorme interval_s e registra
+    quanto acordou depois do previsto (trabalho síncrono no loop)
+    """
+
+    def __init__(self, interval_s: float = 0.05, window: int = 1200):
+        self.interval_s = interval_s
+        self.samples = deque(maxlen=window)
+        self.max_lag_s = 0.0
+        self.task = None
+
+    async def _loop(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval_s)
+            lag = max(0.0, time.perf_counter() - start - self.interval_s)
+            self.samples.append(lag)
+            self.max_lag_s = max(self.max_lag_s, lag)
+
+    def start(self):
+        self.task = asyncio.create_task(self._loop())
+
+    def stop(self):
+        if self.task:
+            self.task.cancel()
+
+    def snapshot(self) -> dict:
+        """Percentis (ms) das amostras recentes e máximo desde o início"""
+        ordered = sorted(self.samples)
+
+        def percentile(p: float) -> float:
+            if not ordered:
+                return 0.0
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 2)
+
+        return {
+            "samples": len(ordered),
+            "window_s": round(len(ordered) * self.interval_s, 1),
+            "p50_ms": percentile(0.50),
+            "p99_ms": percentile(0.99),
+            "max_ms": percentile(1.0),
+            "max_since_start_ms": round(self.max_lag_s * 1000, 2),
+        }
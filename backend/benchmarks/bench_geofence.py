@@ -0,0 +1,110 @@
+"""
+Benchmark do motor de geofences
+10k polígonos × fluxo de eventos (meta: 5k eventos/s)
+
+Uso (dentro de backend/):
+    python benchmarks/bench_geofence.py --fences 10000 --devices 1000 --events 50000
+"""
+
+import argparse
+import math
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from geofence import GeofenceEngine, point_in_polygon  # noqa: E402
+from models import Geofence, TelemetryEvent  # noqa: E402
+
+CENTER = (-23.5505, -46.6333)       # São Paulo
+AREA_DEG = 0.5                      # ~55 km de lado
+
+
+def make_fences(n: int, rng: random.Random) -> list:
+    """Polígonos convexos (6-10 vértices) de 100 m a 1,5 km de raio"""
+    fences = []
+    kinds = ["depot", "customer", "restricted"]
+    for i in range(n):
+        c_lat = CENTER[0] + rng.uniform(-AREA_DEG, AREA_DEG)
+        c_lon = CENTER[1] + rng.uniform(-AREA_DEG, AREA_DEG)
+        radius = rng.uniform(0.001, 0.015)
+        vertices = rng.randint(6, 10)
+        polygon = [
+            (c_lat + radius * math.sin(2 * math.pi * k / vertices),
+             c_lon + radius * math.cos(2 * math.pi * k / vertices))
+            for k in range(vertices)
+        ]
+        fences.append(Geofence(id=i + 1, name=f"F-{i + 1:05d}", kind=kinds[i % 3], polygon=polygon))
+    return fences
+
+
+def make_events(devices: int, count: int, rng: random.Random) -> list:
+    """Eventos em round-robin com passeio aleatório por device"""
+    positions = [
+        [CENTER[0] + rng.uniform(-AREA_DEG, AREA_DEG), CENTER[1] + rng.uniform(-AREA_DEG, AREA_DEG)]
+        for _ in range(devices)
+    ]
+    start = datetime.now(timezone.utc)
+    events = []
+    for i in range(count):
+        d = i % devices
+        pos = positions[d]
+        pos[0] += rng.uniform(-0.0003, 0.0003)
+        pos[1] += rng.uniform(-0.0003, 0.0003)
+        events.append(TelemetryEvent(
+            device_id=f"TRK-{d + 1:05d}",
+            ts=start + timedelta(seconds=i // devices),
+            lat=pos[0],
+            lon=pos[1],
+            speed_kmh=50.0
+        ))
+    return events
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fences", type=int, default=10000)
+    parser.add_argument("--devices", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=50000)
+    parser.add_argument("--brute-sample", type=int, default=500,
+                        help="Eventos avaliados também por força bruta (comparação)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    fences = make_fences(args.fences, rng)
+    events = make_events(args.devices, args.events, rng)
+
+    t0 = time.perf_counter()
+    engine = GeofenceEngine(fences)
+    build_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    transitions = 0
+    for event in events:
+        transitions += len(engine.process(event))
+    elapsed = time.perf_counter() - t0
+    rate = len(events) / elapsed
+
+    # Força bruta numa amostra (valida resultado e mostra o ganho)
+    sample = events[:args.brute_sample]
+    t0 = time.perf_counter()
+    for event in sample:
+        brute = {f.id for f in fences if point_in_polygon(event.lat, event.lon, f.polygon)}
+        assert brute == engine.containing(event.lat, event.lon)
+    brute_rate = len(sample) / (time.perf_counter() - t0) if sample else 0
+
+    print(f"Geofences:        {args.fences}")
+    print(f"Build R-tree:     {build_s * 1000:.1f} ms")
+    print(f"Eventos:          {len(events)} ({args.devices} devices)")
+    print(f"Transições:       {transitions}")
+    print(f"R-tree:           {rate:,.0f} eventos/s")
+    print(f"Força bruta:      {brute_rate:,.0f} eventos/s")
+    print(f"Meta 5k/s:        {'OK' if rate >= 5000 else 'ABAIXO'}")
+
+
+if __name__ == "__main__":
+    main()
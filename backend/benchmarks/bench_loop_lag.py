@@ -0,0 +1,96 @@
+"""
+Benchmark do atraso do event loop durante uma análise de frota
+Compara análise no próprio loop (como antes) com o executor de analytics
+
+Uso (dentro de backend/):
+    python benchmarks/bench_loop_lag.py --devices 500 --points 20000
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from analytics_executor import AnalyticsExecutor, LoopLagMonitor  # noqa: E402
+from fuel_economy import DEFAULT_FUEL_CONFIG  # noqa: E402
+from fuel_kernels import analyze_device_columns, columns_from_arrays  # noqa: E402
+
+
+def make_fleet(devices: int, points: int, seed: int) -> list:
+    """Colunas sintéticas: 1 Hz, passeio aleatório, paradas e arrancadas"""
+    rng = np.random.default_rng(seed)
+    start_us = 1_767_225_600 * 1_000_000
+    fleet = []
+    for d in range(devices):
+        ts = start_us + np.arange(points, dtype=np.int64) * 1_000_000
+        lat = -23.55 + np.cumsum(rng.uniform(-2e-4, 2e-4, points))
+        lon = -46.63 + np.cumsum(rng.uniform(-2e-4, 2e-4, points))
+        speed = np.clip(40 + np.cumsum(rng.normal(0, 2, points)), 0, 110)
+        fleet.append((f"TRK-{d + 1:05d}", columns_from_arrays(ts, lat, lon, speed)))
+    return fleet
+
+
+async def _items(fleet):
+    for device_id, cols in fleet:
+        yield device_id, cols
+        await asyncio.sleep(0)      # Como o cursor: devolve o loop entre devices
+
+
+async def run_inline(fleet):
+    return [
+        analyze_device_columns(device_id, cols, DEFAULT_FUEL_CONFIG)
+        async for device_id, cols in _items(fleet)
+    ]
+
+
+async def measure(label: str, fleet, executor=None):
+    monitor = LoopLagMonitor(interval_s=0.01, window=100_000)
+    monitor.start()
+    await asyncio.sleep(0.05)
+    t0 = time.perf_counter()
+    if executor is None:
+        profiles = await run_inline(fleet)
+    else:
+        profiles = await executor.map_devices(analyze_device_columns, _items(fleet), DEFAULT_FUEL_CONFIG)
+    elapsed = time.perf_counter() - t0
+    monitor.stop()
+    lag = monitor.snapshot()
+    print(f"{label:<12} {elapsed:8.2f} s   lag p50 {lag['p50_ms']:8.2f} ms   "
+          f"p99 {lag['p99_ms']:8.2f} ms   max {lag['max_ms']:8.2f} ms")
+    return profiles
+
+
+async def main_async(args):
+    fleet = make_fleet(args.devices, args.points, args.seed)
+    print(f"Frota: {args.devices} devices × {args.points} pontos\n")
+
+    expected = await measure("inline", fleet)
+    for kind in ("thread", "process"):
+        executor = AnalyticsExecutor(kind, args.workers)
+        executor.start()
+        try:
+            # Aquece o pool (processos novos importam numpy)
+            await executor.map_devices(analyze_device_columns, _items(fleet[:executor.workers]), DEFAULT_FUEL_CONFIG)
+            profiles = await measure(kind, fleet, executor)
+        finally:
+            executor.shutdown()
+        assert profiles == expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=500)
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=0, help="0 = nº de CPUs")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark do armazenamento em memória (main_simple)
+deque de TelemetryEvent + DeviceStatus por evento × anéis colunares
+
+Uso (dentro de backend/):
+    python benchmarks/bench_memory_store.py --devices 10000 --events 100
+"""
+
+import argparse
+import gc
+import random
+import sys
+import time
+import tracemalloc
+from collections import defaultdict, deque
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from models import DeviceStatus, TelemetryEvent  # noqa: E402
+from telemetry_store import TelemetryRingStore  # noqa: E402
+
+
+class LegacyStore:
+    """Armazenamento anterior de InMemoryStorage (referência)"""
+
+    def __init__(self):
+        self.telemetry = defaultdict(lambda: deque(maxlen=1000))
+        self.device_status = {}
+
+    def append(self, event: TelemetryEvent):
+        self.telemetry[event.device_id].append(event)
+        self.device_status[event.device_id] = DeviceStatus(
+            device_id=event.device_id,
+            online=True,
+            last_seen=event.ts,
+            last_lat=event.lat,
+            last_lon=event.lon,
+            last_speed=event.speed_kmh,
+            last_temp=event.engine_temp_c,
+            last_battery=event.battery_v
+        )
+
+    def window_events(self, seconds: float) -> int:
+        now = datetime.now(timezone.utc)
+        return sum(
+            1 for events in self.telemetry.values() for e in events
+            if (now - e.ts).total_seconds() <= seconds
+        )
+
+
+def make_rounds(devices: int, per_device: int, seed: int):
+    """Uma rodada = um evento por device (gerada sob demanda, como na ingestão)"""
+    rng = random.Random(seed)
+    start = datetime.now(timezone.utc) - timedelta(seconds=per_device)
+    for i in range(per_device):
+        ts = start + timedelta(seconds=i)
+        yield [
+            TelemetryEvent(
+                device_id=f"TRK-{d + 1:05d}",
+                ts=ts,
+                lat=round(-23.55 + rng.uniform(-0.5, 0.5), 6),
+                lon=round(-46.63 + rng.uniform(-0.5, 0.5), 6),
+                speed_kmh=round(rng.uniform(0, 110), 2),
+                engine_temp_c=round(rng.uniform(80, 105), 1),
+                battery_v=round(rng.uniform(11.8, 13.2), 2)
+            )
+            for d in range(devices)
+        ]
+
+
+def run(label: str, factory, args):
+    # Vazão: só o append é cronometrado (geração dos eventos fica de fora)
+    store = factory()
+    elapsed = 0.0
+    for events in make_rounds(args.devices, args.events, args.seed):
+        t0 = time.perf_counter()
+        for event in events:
+            store.append(event)
+        elapsed += time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    if isinstance(store, LegacyStore):
+        store.window_events(60)
+    else:
+        store.window_stats(60)
+    metrics_ms = (time.perf_counter() - t0) * 1000
+    del store
+
+    # Memória retida pelo armazenamento (eventos descartados após o append)
+    gc.collect()
+    tracemalloc.start()
+    store = factory()
+    for events in make_rounds(args.devices, args.events, args.seed):
+        for event in events:
+            store.append(event)
+        del events
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    total = args.devices * args.events
+    print(f"{label:<10} {total / elapsed:>10,.0f} eventos/s   "
+          f"memória {current / 2**20:>8.1f} MiB ({current / total:>6.0f} B/evento)   "
+          f"métricas 60s {metrics_ms:>8.1f} ms")
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=10000)
+    parser.add_argument("--events", type=int, default=100, help="Eventos por device")
+    parser.add_argument("--history", type=int, default=1000, help="Anel por device")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{args.devices} devices × {args.events} eventos\n")
+    legacy = run("deque", LegacyStore, args)
+    ring = run("colunar", lambda: TelemetryRingStore(args.history), args)
+    print(f"\nMemória: {legacy / ring:.1f}x menor")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark do snapshot do modo memória
+Tempo de gravação (e atraso máximo do event loop durante ela) e de
+restauração a frio, com e sem memmap
+
+Uso (dentro de backend/):
+    python benchmarks/bench_snapshot.py --devices 1000 --history 1000
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from analytics_executor import LoopLagMonitor  # noqa: E402
+from store_snapshot import load_snapshot, write_snapshot  # noqa: E402
+from telemetry_store import TelemetryRingStore  # noqa: E402
+
+
+def make_store(devices: int, history: int, seed: int) -> TelemetryRingStore:
+    """Anéis cheios preenchidos direto nos arrays (append de 1M eventos levaria minutos)"""
+    rng = np.random.default_rng(seed)
+    store = TelemetryRingStore(history)
+    start_us = 1_767_225_600 * 1_000_000
+    for d in range(devices):
+        store._slot(f"TRK-{d + 1:05d}")
+    for block in store.blocks:
+        shape = block.ts.shape
+        block.ts[:] = start_us + np.arange(history, dtype=np.int64) * 1_000_000
+        block.lat[:] = -23.55 + rng.uniform(-0.1, 0.1, shape)
+        block.lon[:] = -46.63 + rng.uniform(-0.1, 0.1, shape)
+        block.speed_kmh[:] = rng.uniform(0, 110, shape)
+        block.engine_temp_c[:] = rng.uniform(80, 100, shape)
+        block.battery_v[:] = rng.uniform(12, 14, shape)
+    store.heads[:devices] = history
+    return store
+
+
+async def timed_write(store: TelemetryRingStore, path: Path) -> tuple:
+    monitor = LoopLagMonitor(interval_s=0.005, window=100_000)
+    monitor.start()
+    await asyncio.sleep(0.02)
+    t0 = time.perf_counter()
+    await write_snapshot(store, path, {"total_events": len(store) * store.history})
+    elapsed = time.perf_counter() - t0
+    monitor.stop()
+    return elapsed, monitor.snapshot()["max_ms"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=1000)
+    parser.add_argument("--history", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    store = make_store(args.devices, args.history, args.seed)
+    readings = args.devices * args.history
+    print(f"Store: {args.devices} devices × {args.history} leituras = {readings:,}\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "memory.snap"
+        elapsed, lag_ms = asyncio.run(timed_write(store, path))
+        size_mb = os.path.getsize(path) / 1e6
+        print(f"gravação     {elapsed:8.3f} s   {size_mb:8.1f} MB   atraso máx. do loop {lag_ms:6.2f} ms")
+
+        device_id = store.device_ids[-1]
+        for mmap in (True, False):
+            t0 = time.perf_counter()
+            restored, _ = load_snapshot(path, mmap=mmap)
+            elapsed = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            assert restored.events(device_id) == store.events(device_id)
+            first_read = time.perf_counter() - t0
+            label = "load mmap" if mmap else "load leitura"
+            print(f"{label:<12} {elapsed:8.3f} s   1ª consulta {first_read * 1000:6.2f} ms")
+            del restored
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,551 @@
+"""
+Suíte de benchmarks: combustível, consultas do banco e ingestão
+Cada caso roda várias vezes (mediana) e informa ops/s e pico de memória
+(tracemalloc, numa execução à parte). Os resultados vão para um JSON que
+serve de baseline: comparações seguintes apontam regressões.
+
+Grupos:
+- fuel: cada função de fuel_economy (e os kernels em colunas) com 1k/10k/100k eventos
+- db: cada consulta do backend (SQLite em arquivo temporário ou Postgres
+  com DATABASE_URL) sobre uma frota semeada; no Postgres os dados usam
+  devices BENCH-* e são apagados no fim (use um banco de testes)
+- ingest: POST /ingest pelo app ASGI no próprio processo (main_simple e
+  main.py com SQLite)
+
+Baselines:
+- benchmarks/results/baseline.json é a referência versionada (execução
+  completa, padrões da CLI); o JSON registra commit, Python e máquina.
+  ops/s só é comparável na mesma máquina: a comparação avisa quando a
+  máquina do baseline é outra. Casos cujo conjunto de dados não está no
+  nome (grupo db: --db-devices, --db-hours, --db-interval-s; --seed em
+  todos) só são comparados se o baseline usou os mesmos valores
+- em CI, o runner grava um baseline do branch base e compara o do PR:
+      git checkout origin/main && python benchmarks/suite.py --save /tmp/base.json
+      git checkout - && python benchmarks/suite.py --compare /tmp/base.json --threshold 0.2
+  --compare termina com código 1 se algum caso regrediu além do limite
+- após uma mudança de desempenho intencional, regrave o baseline
+  versionado (--save) no mesmo commit
+
+Uso (dentro de backend/):
+    python benchmarks/suite.py --save benchmarks/results/baseline.json
+    python benchmarks/suite.py --compare benchmarks/results/baseline.json
+    python benchmarks/suite.py --groups db --backend postgres
+    python benchmarks/suite.py -k analyze_device --sizes 1000,10000
+"""
+
+import argparse
+import asyncio
+import importlib
+import inspect
+import json
+import logging
+import math
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import AsyncExitStack
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+GROUPS = ("fuel", "db", "ingest")
+DB_PREFIX = "BENCH-"
+MAX_RUNS = 1000
+MEMORY_FLOOR_KB = 64            # Diferenças de memória menores que isso são ruído
+
+# Argumentos que mudam os dados de cada grupo sem aparecer no nome do caso
+# (tamanhos do fuel e requisições/concorrência do ingest já estão no nome)
+DATASET_ARGS = {
+    "fuel": ("seed",),
+    "db": ("seed", "db_devices", "db_hours", "db_interval_s"),
+    "ingest": ("seed",),
+}
+
+
+@dataclass
+class Case:
+    name: str
+    group: str
+    unit: str                   # O que conta como 1 op (evento, chamada, consulta...)
+    ops: int                    # Ops por execução de fn
+    fn: Callable                # Síncrona ou coroutine function
+
+
+def _repeat(fn: Callable, times: int) -> Callable:
+    def run():
+        for _ in range(times):
+            fn()
+    return run
+
+
+async def _consume(agen) -> int:
+    count = 0
+    async for _ in agen:
+        count += 1
+    return count
+
+
+# ==================== DADOS SINTÉTICOS ====================
+
+def make_events(n: int, seed: int, device_id: str = "TRK-001",
+                end: Optional[datetime] = None, interval_s: float = 1.0) -> List[dict]:
+    """Trajeto com paradas e acelerações bruscas (linhas como o banco devolve)"""
+    rng = random.Random(seed)
+    lat, lon, speed = -23.5505, -46.6333, 40.0
+    end = end or datetime(2026, 1, 5, 18, 0, tzinfo=timezone.utc)
+    ts = end - timedelta(seconds=interval_s * n)
+    events = []
+    for _ in range(n):
+        phase = rng.random()
+        if phase < 0.15:
+            speed = rng.uniform(0, 4)
+        elif phase < 0.25:
+            speed = max(0.0, speed + rng.choice([-1, 1]) * rng.uniform(5, 20))
+        else:
+            speed = max(0.0, min(110.0, speed + rng.uniform(-1.5, 1.5)))
+        lat += rng.uniform(-0.0002, 0.0002)
+        lon += rng.uniform(-0.0002, 0.0002)
+        ts += timedelta(seconds=interval_s)
+        events.append({
+            "device_id": device_id,
+            "ts": ts,
+            "lat": lat,
+            "lon": lon,
+            "speed_kmh": round(speed, 2),
+            "engine_temp_c": round(rng.uniform(85, 100), 1),
+            "battery_v": round(rng.uniform(12.0, 12.8), 2),
+        })
+    return events
+
+
+# ==================== GRUPO: FUEL ====================
+
+def fuel_cases(sizes: List[int], seed: int) -> List[Case]:
+    import fuel_economy as fe
+    from fuel_kernels import analyze_device_columns, columns_from_events
+
+    config = fe.DEFAULT_FUEL_CONFIG
+    optimal_km = 10.0           # Com rota ótima informada as funções de rota fazem o cálculo
+    cases = []
+    for n in sizes:
+        events = make_events(n, seed)
+        cols = columns_from_events(events)
+        per_size = {
+            "calculate_total_distance": lambda e=events: fe.calculate_total_distance(e),
+            "calculate_idle_waste": lambda e=events: fe.calculate_idle_waste(e, config),
+            "calculate_aggressive_driving_waste": lambda e=events: fe.calculate_aggressive_driving_waste(e, config),
+            "calculate_route_waste": lambda e=events: fe.calculate_route_waste(e, config, optimal_km),
+            "calculate_waste_breakdown": lambda e=events: fe.calculate_waste_breakdown(e, config, optimal_km),
+            "calculate_driver_score": lambda e=events: fe.calculate_driver_score("TRK-001", e, config),
+            "analyze_device": lambda e=events: fe.analyze_device("TRK-001", e, config, optimal_km),
+        }
+        for name, fn in per_size.items():
+            cases.append(Case(f"fuel_economy.{name}[n={n}]", "fuel", "eventos", n, fn))
+        cases.append(Case(f"fuel_kernels.columns_from_events[n={n}]", "fuel", "eventos", n,
+                          lambda e=events: columns_from_events(e)))
+        cases.append(Case(f"fuel_kernels.analyze_device_columns[n={n}]", "fuel", "eventos", n,
+                          lambda c=cols: analyze_device_columns("TRK-001", c, config, optimal_km)))
+
+    # Funções sobre totais: custo fixo, 1000 chamadas por execução
+    idle = fe.idle_waste_from_hours(12.5, config)
+    aggressive = fe.aggressive_waste_from_events(40, config)
+    route = fe.route_waste_from_distance(520.0, config, 430.0)
+    profile = fe.profile_from_totals("TRK-001", 20000, 12.5, 40, 520.0, config, 430.0)
+    scalar = {
+        "haversine_distance": lambda: fe.haversine_distance(-23.55, -46.63, -23.56, -46.64),
+        "idle_waste_from_hours": lambda: fe.idle_waste_from_hours(12.5, config),
+        "aggressive_waste_from_events": lambda: fe.aggressive_waste_from_events(40, config),
+        "route_waste_from_distance": lambda: fe.route_waste_from_distance(520.0, config, 430.0),
+        "build_waste_breakdown": lambda: fe.build_waste_breakdown(idle, aggressive, route),
+        "build_driver_score": lambda: fe.build_driver_score("TRK-001", idle, aggressive, 520.0, config),
+        "profile_from_totals": lambda: fe.profile_from_totals("TRK-001", 20000, 12.5, 40, 520.0, config, 430.0),
+        "generate_critical_alerts": lambda: fe.generate_critical_alerts(profile),
+        "calculate_roi": lambda: fe.calculate_roi(5000.0, 1200.0),
+    }
+    for name, fn in scalar.items():
+        cases.append(Case(f"fuel_economy.{name}", "fuel", "chamadas", 1000, _repeat(fn, 1000)))
+    return cases
+
+
+# ==================== GRUPO: DB ====================
+
+async def open_db(backend: str, tmp: str, database_url: str):
+    if backend == "sqlite":
+        from database_sqlite import SQLiteDatabase
+        db = SQLiteDatabase(str(Path(tmp) / "bench.db"))
+    else:
+        from config import settings
+        from database import Database
+        settings.database_url = database_url
+        db = Database()
+    await db.connect()
+    return db
+
+
+async def cleanup_postgres(db):
+    async with db.pool.acquire() as conn:
+        for table in ("telemetry_events", "alerts", "geofence_events", "trips", "fuel_daily_summary"):
+            await conn.execute(f"DELETE FROM {table} WHERE device_id LIKE '{DB_PREFIX}%'")
+        await conn.execute(f"DELETE FROM geofences WHERE name LIKE '{DB_PREFIX}%'")
+
+
+async def seed_db(db, devices: int, hours: float, interval_s: float, seed: int) -> dict:
+    """Frota terminando agora (as consultas usam janelas relativas a NOW)"""
+    from models import Geofence, TelemetryEvent
+
+    end = datetime.now(timezone.utc)
+    points = int(hours * 3600 / interval_s)
+    device_ids = [f"{DB_PREFIX}{d + 1:04d}" for d in range(devices)]
+    fence = await db.create_geofence(Geofence(
+        name=f"{DB_PREFIX}DEPOT", kind="depot",
+        polygon=[(-23.56, -46.64), (-23.56, -46.62), (-23.54, -46.62), (-23.54, -46.64)]
+    ))
+    for d, device_id in enumerate(device_ids):
+        rows = make_events(points, seed + d, device_id, end, interval_s)
+        events = [TelemetryEvent(**row) for row in rows]
+        alerts = [
+            {"device_id": device_id, "ts": row["ts"], "alert_type": "overspeed",
+             "rule_id": "bench", "value": row["speed_kmh"], "message": "bench"}
+            for row in rows[::max(1, points // 20)]
+        ]
+        transitions = [
+            {"device_id": device_id, "geofence_id": fence.id, "transition": kind,
+             "ts": row["ts"], "lat": row["lat"], "lon": row["lon"]}
+            for row, kind in zip(rows[::max(1, points // 10)], ["enter", "exit"] * 10)
+        ]
+        trips = []
+        step = max(2, points // 12)
+        for i in range(0, points - step, step):
+            first, last = rows[i], rows[i + step - 1]
+            trips.append({
+                "device_id": device_id, "kind": "trip" if (i // step) % 2 == 0 else "stop",
+                "start_ts": first["ts"], "end_ts": last["ts"],
+                "duration_s": (last["ts"] - first["ts"]).total_seconds(),
+                "distance_km": 5.0, "idle_s": 60.0, "harsh_events": 1, "events": step,
+                "max_speed_kmh": 80.0, "start_lat": first["lat"], "start_lon": first["lon"],
+                "end_lat": last["lat"], "end_lon": last["lon"],
+            })
+        await db._insert_events(events, alerts, transitions, trips)
+    days = sorted({(end - timedelta(hours=h)).date() for h in range(0, int(hours) + 1)})
+    await db.upsert_daily_summaries(_daily_rows(device_ids, days))
+    return {"device_ids": device_ids, "end": end, "start": end - timedelta(hours=hours),
+            "days": days, "events": points * devices}
+
+
+def _daily_rows(device_ids: List[str], days: List[date]) -> List[dict]:
+    return [
+        {"device_id": device_id, "day": day, "events": 1000, "idle_hours": 1.5,
+         "harsh_events": 4, "distance_km": 120.0, "idle_cost": 10.0,
+         "aggressive_cost": 2.0, "estimated_waste": 12.0, "config_hash": "bench"}
+        for device_id in device_ids for day in days
+    ]
+
+
+def db_cases(db, seeded: dict, backend: str, seed: int) -> List[Case]:
+    from models import Geofence, TelemetryEvent
+
+    device_id = seeded["device_ids"][0]
+    start, end = seeded["start"], seeded["end"]
+    days = seeded["days"]
+    writes = make_events(1000, seed, f"{DB_PREFIX}W", end)
+    write_events = [TelemetryEvent(**row) for row in writes]
+    daily = _daily_rows(seeded["device_ids"], days[-1:])
+    fence = Geofence(name=f"{DB_PREFIX}SITE", polygon=[(-23.5, -46.6), (-23.5, -46.5), (-23.4, -46.5)])
+
+    queries = {
+        "get_devices": lambda: db.get_devices(),
+        "get_device_latest": lambda: db.get_device_latest(device_id),
+        "get_device_events": lambda: db.get_device_events(device_id, 60, 500),
+        "get_metrics_summary": lambda: db.get_metrics_summary(5),
+        "get_alerts": lambda: db.get_alerts(24 * 60),
+        "get_geofences": lambda: db.get_geofences(),
+        "get_geofence_events": lambda: db.get_geofence_events(24 * 60),
+        "get_trips": lambda: db.get_trips(limit=100),
+        "get_device_events_period": lambda: db.get_device_events_period(device_id, start, end),
+        "get_all_devices_events_period": lambda: _consume(db.get_all_devices_events_period(start, end)),
+        "iter_fleet_columns": lambda: _consume(db.iter_fleet_columns(start, end)),
+        "get_fleet_columns": lambda: db.get_fleet_columns(start, end),
+        "get_device_columns": lambda: db.get_device_columns(device_id, start, end),
+        "get_fuel_aggregates": lambda: db.get_fuel_aggregates(start, end),
+        "get_daily_summary_totals": lambda: db.get_daily_summary_totals(days[0], days[-1]),
+        "get_fuel_consumption_summary": lambda: db.get_fuel_consumption_summary(device_id, 30),
+        "create_geofence": lambda: db.create_geofence(fence),
+        "upsert_daily_summaries": lambda: db.upsert_daily_summaries(daily),
+    }
+    cases = [Case(f"db.{backend}.{name}", "db", "consultas", 1, fn) for name, fn in queries.items()]
+    cases.append(Case(f"db.{backend}.insert_events[batch=1000]", "db", "eventos", 1000,
+                      lambda: db._insert_events(write_events, [], [], [])))
+    return cases
+
+
+# ==================== GRUPO: INGEST ====================
+
+def _payloads(n: int, devices: int, seed: int) -> List[dict]:
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "device_id": f"{DB_PREFIX}{i % devices + 1:04d}",
+            "ts": (now + timedelta(milliseconds=i)).isoformat(),
+            "lat": -23.55 + rng.uniform(-0.05, 0.05),
+            "lon": -46.63 + rng.uniform(-0.05, 0.05),
+            "speed_kmh": round(rng.uniform(0, 110), 2),
+            "engine_temp_c": round(rng.uniform(85, 100), 1),
+            "battery_v": round(rng.uniform(12.0, 12.8), 2),
+        }
+        for i in range(n)
+    ]
+
+
+async def _post_all(client, payloads: List[dict], concurrency: int):
+    for i in range(0, len(payloads), concurrency):
+        responses = await asyncio.gather(*(
+            client.post("/ingest", json=p) for p in payloads[i:i + concurrency]
+        ))
+        for response in responses:
+            if response.status_code != 200:
+                raise RuntimeError(f"/ingest respondeu {response.status_code}: {response.text}")
+
+
+async def open_app(module: str, stack):
+    """App ASGI com lifespan rodando e cliente httpx em processo"""
+    import httpx
+
+    app = importlib.import_module(module).app
+    await stack.enter_async_context(app.router.lifespan_context(app))
+    transport = httpx.ASGITransport(app=app)
+    return await stack.enter_async_context(httpx.AsyncClient(transport=transport, base_url="http://bench"))
+
+
+def ingest_cases(clients: Dict[str, object], requests: int, concurrency: int, seed: int) -> List[Case]:
+    payloads = _payloads(requests, 100, seed)
+    return [
+        Case(f"ingest.{name}[n={requests},c={concurrency}]", "ingest", "requisições", requests,
+             lambda client=client: _post_all(client, payloads, concurrency))
+        for name, client in clients.items()
+    ]
+
+
+# ==================== EXECUÇÃO ====================
+
+def _call(loop, fn):
+    result = fn()
+    if inspect.isawaitable(result):
+        result = loop.run_until_complete(result)
+    return result
+
+
+def measure(loop, case: Case, min_time: float, min_runs: int) -> dict:
+    _call(loop, case.fn)        # Aquecimento (caches, statements preparados)
+    times = []
+    while len(times) < min_runs or (sum(times) < min_time and len(times) < MAX_RUNS):
+        t0 = time.perf_counter()
+        _call(loop, case.fn)
+        times.append(time.perf_counter() - t0)
+    median = statistics.median(times)
+
+    tracemalloc.start()
+    try:
+        _call(loop, case.fn)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "group": case.group,
+        "unit": case.unit,
+        "ops_per_call": case.ops,
+        "ops_per_s": case.ops / median if median > 0 else math.inf,
+        "median_ms": median * 1000,
+        "min_ms": min(times) * 1000,
+        "runs": len(times),
+        "peak_kb": peak / 1024,
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=Path(__file__).resolve().parent, timeout=5
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def _machine() -> str:
+    return f"{platform.node()} {platform.machine()} {os.cpu_count()} CPUs"
+
+
+def other_datasets(args: dict, baseline_args: dict) -> Dict[str, List[str]]:
+    """grupo -> argumentos de dados diferentes dos do baseline"""
+    return {
+        group: different
+        for group, keys in DATASET_ARGS.items()
+        if (different := [k for k in keys if args.get(k) != baseline_args.get(k)])
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float, args: dict) -> List[str]:
+    """
+    Imprime a comparação e devolve os casos que regrediram
+    Casos de grupos semeados com outros dados (args) não entram
+    """
+    regressions = []
+    base = baseline["results"]
+    print(f"\nComparação com {baseline.get('commit') or '?'} ({baseline.get('created_at', '')[:19]}), "
+          f"limite {threshold * 100:.0f}%")
+    if baseline.get("machine") != _machine():
+        print(f"⚠️  Baseline de outra máquina ({baseline.get('machine') or '?'}): ops/s não são comparáveis")
+    skipped = other_datasets(args, baseline.get("args", {}))
+    for group, keys in skipped.items():
+        values = ", ".join(f"{k}={args.get(k)} (baseline {baseline.get('args', {}).get(k)})" for k in keys)
+        print(f"⚠️  Grupo {group} com outros dados: {values}; casos não comparados")
+    print(f"{'caso':<58}{'ops/s':>10}{'Δ ops/s':>10}{'Δ memória':>11}")
+    for name, current in results.items():
+        if name not in base:
+            print(f"{name:<58}{current['ops_per_s']:>10,.0f}{'novo':>10}")
+            continue
+        if current["group"] in skipped:
+            print(f"{name:<58}{current['ops_per_s']:>10,.0f}{'outros dados':>14}")
+            continue
+        previous = base[name]
+        speed = current["ops_per_s"] / previous["ops_per_s"] - 1 if previous["ops_per_s"] else 0.0
+        memory = current["peak_kb"] / previous["peak_kb"] - 1 if previous["peak_kb"] else 0.0
+        flags = []
+        if speed < -threshold:
+            flags.append("⚠️  mais lento")
+        if memory > threshold and current["peak_kb"] - previous["peak_kb"] > MEMORY_FLOOR_KB:
+            flags.append("⚠️  mais memória")
+        if flags:
+            regressions.append(name)
+        print(f"{name:<58}{current['ops_per_s']:>10,.0f}{speed * 100:>+9.1f}%{memory * 100:>+10.1f}%  "
+              + " ".join(flags))
+    missing = sorted(set(base) - set(results))
+    if missing:
+        print(f"(fora desta execução: {len(missing)} casos do baseline)")
+    return regressions
+
+
+async def _open_ingest_apps(stack) -> Dict[str, object]:
+    clients = {"main_simple": await open_app("main_simple", stack)}
+    clients["main.sqlite"] = await open_app("main", stack)
+    return clients
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--groups", default=",".join(GROUPS), help="fuel,db,ingest")
+    parser.add_argument("-k", dest="keyword", default="", help="Só casos cujo nome contém o texto")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Eventos por caso no grupo fuel")
+    parser.add_argument("--backend", choices=("sqlite", "postgres"), default="sqlite")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", ""))
+    parser.add_argument("--db-devices", type=int, default=20)
+    parser.add_argument("--db-hours", type=float, default=24.0)
+    parser.add_argument("--db-interval-s", type=float, default=30.0)
+    parser.add_argument("--ingest-requests", type=int, default=2000)
+    parser.add_argument("--ingest-concurrency", type=int, default=50)
+    parser.add_argument("--min-time", type=float, default=1.0, help="Segundos mínimos por caso")
+    parser.add_argument("--min-runs", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save", default=None, help="Grava os resultados (baseline) neste JSON")
+    parser.add_argument("--compare", default=None, help="Baseline JSON para comparar")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Variação que conta como regressão")
+    args = parser.parse_args()
+
+    groups = [g for g in args.groups.split(",") if g]
+    unknown = set(groups) - set(GROUPS)
+    if unknown:
+        parser.error(f"grupos desconhecidos: {', '.join(sorted(unknown))}")
+    if "db" in groups and args.backend == "postgres" and not args.database_url:
+        parser.error("--backend postgres precisa de --database-url ou DATABASE_URL")
+
+    # Logs por evento (main_simple) e de flush distorcem a medição
+    logging.disable(logging.INFO)
+    tmp = tempfile.mkdtemp(prefix="monitora-bench-")
+    if "ingest" in groups:
+        # Antes de importar config/database: main.py usa o singleton db
+        os.environ.update({
+            "STORAGE_BACKEND": "sqlite",
+            "SQLITE_PATH": str(Path(tmp) / "ingest.db"),
+            "MEMORY_SNAPSHOT_PATH": "",
+            "TRACE_CAPTURE_PATH": "",
+            "SHARED_STATE_NAME": "",
+        })
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    stack = AsyncExitStack()
+    db = None
+    results: Dict[str, dict] = {}
+    try:
+        cases: List[Case] = []
+        if "fuel" in groups:
+            sizes = [int(s) for s in args.sizes.split(",") if s]
+            cases += fuel_cases(sizes, args.seed)
+        if "db" in groups:
+            db = loop.run_until_complete(open_db(args.backend, tmp, args.database_url))
+            if args.backend == "postgres":
+                loop.run_until_complete(cleanup_postgres(db))
+            t0 = time.perf_counter()
+            seeded = loop.run_until_complete(
+                seed_db(db, args.db_devices, args.db_hours, args.db_interval_s, args.seed)
+            )
+            print(f"Banco {args.backend}: {seeded['events']:,} eventos semeados "
+                  f"({args.db_devices} devices × {args.db_hours:g} h) em {time.perf_counter() - t0:.1f}s")
+            cases += db_cases(db, seeded, args.backend, args.seed)
+        if "ingest" in groups:
+            clients = loop.run_until_complete(_open_ingest_apps(stack))
+            cases += ingest_cases(clients, args.ingest_requests, args.ingest_concurrency, args.seed)
+        if args.keyword:
+            cases = [c for c in cases if args.keyword in c.name]
+
+        print(f"\n{'caso':<58}{'ops/s':>12}{'unidade':>13}{'mediana ms':>12}{'pico KB':>10}")
+        for case in cases:
+            result = measure(loop, case, args.min_time, args.min_runs)
+            results[case.name] = result
+            print(f"{case.name:<58}{result['ops_per_s']:>12,.0f}{case.unit:>13}"
+                  f"{result['median_ms']:>12.3f}{result['peak_kb']:>10,.0f}")
+    finally:
+        loop.run_until_complete(stack.aclose())
+        if db is not None:
+            if args.backend == "postgres":
+                loop.run_until_complete(cleanup_postgres(db))
+            loop.run_until_complete(db.disconnect())
+        loop.close()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "machine": _machine(),
+        "args": {k: v for k, v in vars(args).items() if k != "database_url"},   # Sem credenciais
+        "results": results,
+    }
+    if args.save:
+        Path(args.save).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResultados gravados em {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, report["args"])
+        if regressions:
+            print(f"\n❌ {len(regressions)} regressões")
+            sys.exit(1)
+        print("\n✅ Sem regressões")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,11 +7,32 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 ENV_FILE = BASE_DIR / ".env"
 
 class Settings(BaseSettings):
-    database_url: str
+    storage_backend: str = "postgres"
+    database_url: str = ""
+    sqlite_path: str = "monitora.db"
     cors_origins: str = "http://localhost:3000"
     backend_port: int = 8000
     batch_size: int = 100
     batch_timeout: float = 2.0
+    alert_rules_file: str = ""
+    fuel_price: float = 5.80
+    fuel_expected_kml: float = 8.5
+    fuel_idle_consumption_lh: float = 0.8
+    fuel_tracker_retention_hours: int = 720
+    fuel_tracker_warmup_hours: int = 720
+    daily_summary_interval_s: float = 300.0
+    trip_stop_dwell_s: float = 180.0
+    trip_start_dwell_s: float = 30.0
+    trip_max_gap_s: float = 900.0
+    track_tolerance_m: float = 5.0
+    analytics_executor: str = "process"
+    analytics_workers: int = 0
+    analytics_timeout_s: float = 30.0
+    shared_state_name: str = ""
+    shared_state_slots: int = 65536
+    trace_capture_path: str = ""
+    memory_snapshot_path: str = "memory_snapshot.bin"
+    memory_snapshot_interval_s: float = 30.0
     
     class Config:
         env_file = str(ENV_FILE)
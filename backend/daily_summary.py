@@ -0,0 +1,181 @@
+"""
+MÓDULO: Resumo diário de combustível
+Job periódico que recalcula só os dias afetados + CLI de backfill
+
+Uso (dentro de backend/):
+    python daily_summary.py backfill --start 2026-01-01 --end 2026-01-31
+"""
+
+import argparse
+import asyncio
+import contextlib
+import logging
+import math
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Optional, Set, Tuple
+
+from analytics_executor import AnalyticsExecutor
+from fuel_economy import DEFAULT_FUEL_CONFIG, config_hash
+from fuel_kernels import TelemetryColumns, analyze_device_columns
+from models import FuelConfig, TelemetryEvent
+
+logger = logging.getLogger(__name__)
+
+
+def day_bounds(day: date) -> Tuple[datetime, datetime]:
+    """Intervalo [início, fim) do dia em UTC"""
+    start = datetime.combine(day, time.min, tzinfo=timezone.utc)
+    return start, start + timedelta(days=1)
+
+
+def previous_period(end: datetime, hours: float) -> Tuple[date, date]:
+    """
+    Dias [início, fim] do período anterior à janela móvel (end - hours, end]
+    Mesmo número de dias inteiros, terminando no dia anterior ao início da
+    janela (sem sobreposição com o dia parcial em que ela começa)
+    """
+    days = max(1, math.ceil(hours / 24))
+    last = (end - timedelta(hours=hours)).astimezone(timezone.utc).date() - timedelta(days=1)
+    return last - timedelta(days=days - 1), last
+
+
+def summarize_day(device_id: str, cols: TelemetryColumns, day: date, config: FuelConfig) -> dict:
+    """Linha de fuel_daily_summary a partir das colunas (crescentes) do dia"""
+    profile = analyze_device_columns(device_id, cols, config)
+    return {
+        'device_id': device_id,
+        'day': day,
+        'events': profile.events,
+        'idle_hours': profile.idle_hours,
+        'harsh_events': profile.harsh_events,
+        'distance_km': profile.distance_km,
+        'idle_cost': profile.waste.idle_cost,
+        'aggressive_cost': profile.waste.aggressive_cost,
+        'estimated_waste': profile.score.estimated_waste,
+        'config_hash': config_hash(config),
+    }
+
+
+async def summarize_days(
+    db,
+    days: Dict[date, Set[str]],
+    config: FuelConfig,
+    executor: Optional[AnalyticsExecutor] = None
+) -> int:
+    """
+    Recalcula e grava os pares (dia, devices); retorna linhas gravadas
+    Com executor, a análise de cada device roda fora do event loop
+    """
+    written = 0
+    for day in sorted(days):
+        start, end = day_bounds(day)
+        device_ids = sorted(days[day]) if days[day] else None
+        devices = db.iter_fleet_columns(start, end, device_ids)
+        if executor is not None:
+            rows = await executor.map_devices(summarize_day, devices, day, config)
+        else:
+            rows = [summarize_day(device_id, cols, day, config) async for device_id, cols in devices]
+        await db.upsert_daily_summaries(rows)
+        written += len(rows)
+    return written
+
+
+class DailySummarizer:
+    """
+    Mantém fuel_daily_summary em dia
+
+    Cada evento ingerido marca (device, dia) como sujo; o job periódico
+    recalcula apenas esses pares. Eventos atrasados ou fora de ordem caem
+    no dia a que pertencem, que é recalculado por inteiro.
+    """
+
+    def __init__(self, db, config: FuelConfig, interval_s: float,
+                 executor: Optional[AnalyticsExecutor] = None):
+        self.db = db
+        self.config = config
+        self.interval_s = interval_s
+        self.executor = executor
+        self.dirty: Dict[date, Set[str]] = {}
+        self.task = None
+
+    def mark(self, event: TelemetryEvent):
+        """Marca o dia do evento como sujo"""
+        ts = event.ts if event.ts.tzinfo else event.ts.replace(tzinfo=timezone.utc)
+        day = ts.astimezone(timezone.utc).date()
+        devices = self.dirty.get(day)
+        if devices is None:
+            devices = self.dirty[day] = set()
+        devices.add(event.device_id)
+
+    async def run_once(self) -> int:
+        """Recalcula os dias sujos (após gravar o buffer de ingestão)"""
+        if not self.dirty:
+            return 0
+        dirty, self.dirty = self.dirty, {}
+        try:
+            await self.db.flush_buffer()
+            written = await summarize_days(self.db, dirty, self.config, self.executor)
+        except BaseException:
+            # Devolve os pares para a próxima rodada (inclusive se cancelado)
+            for day, devices in dirty.items():
+                self.dirty.setdefault(day, set()).update(devices)
+            raise
+        logger.info(f"Daily summaries updated: {written} device-days")
+        return written
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval_s)
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Daily summary error: {e}")
+
+    def start(self):
+        self.task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self.task:
+            # Espera a rodada em andamento devolver os pares antes da final
+            self.task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.task
+            self.task = None
+        try:
+            await self.run_once()
+        except Exception as e:
+            logger.error(f"Daily summary error: {e}")
+
+
+# ==================== CLI ====================
+
+async def backfill(start_day: date, end_day: date, config: FuelConfig):
+    """Recalcula todos os devices de cada dia em [start_day, end_day]"""
+    from database import db
+
+    await db.connect()
+    try:
+        day = start_day
+        while day <= end_day:
+            written = await summarize_days(db, {day: set()}, config)
+            print(f"{day.isoformat()}: {written} devices")
+            day += timedelta(days=1)
+    finally:
+        await db.disconnect()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resumo diário de combustível")
+    sub = parser.add_subparsers(dest="command", required=True)
+    bf = sub.add_parser("backfill", help="Recalcula resumos de um intervalo de dias")
+    bf.add_argument("--start", type=date.fromisoformat, required=True, help="YYYY-MM-DD")
+    bf.add_argument("--end", type=date.fromisoformat, default=None, help="YYYY-MM-DD (padrão: hoje)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    end_day = args.end or datetime.now(timezone.utc).date()
+    asyncio.run(backfill(args.start, end_day, DEFAULT_FUEL_CONFIG))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,29 @@
-import asyncio
 import asyncpg
-from datetime import datetime, timedelta
-from typing import List, Optional
+import json
+from datetime import date, datetime, timedelta
+from typing import AsyncIterator, List, Optional, Tuple
 from config import settings
-from models import TelemetryEvent, DeviceStatus, Alert
+from models import TelemetryEvent, DeviceStatus, Alert, Geofence
+from fuel_economy import IDLE_SPEED_THRESHOLD, HARSH_ACCEL_THRESHOLD
+from fuel_kernels import TelemetryColumns, columns_from_arrays
+from storage import STORAGE_BACKENDS, StorageBackend
 import logging
 
 logger = logging.getLogger(__name__)
 
-class Database:
+CURSOR_PREFETCH = 5000      # Linhas por ida ao servidor nos cursores de analytics
+
+class Database(StorageBackend):
+    """Backend Postgres (asyncpg): pool de conexões, cursores no servidor"""
+
     def __init__(self):
+        super().__init__()
         self.pool: Optional[asyncpg.Pool] = None
-        self.buffer: List[TelemetryEvent] = []
-        self.buffer_lock = asyncio.Lock()
-        self.flush_task = None
         
     async def connect(self):
         """Cria pool de conexões"""
+        if not settings.database_url:
+            raise RuntimeError("DATABASE_URL is required for the postgres storage backend")
         self.pool = await asyncpg.create_pool(
             settings.database_url,
             min_size=2,
@@ -24,68 +31,70 @@ class Database:
         )
         logger.info("Database pool created")
         
-    async def disconnect(self):
+    async def _close(self):
         """Fecha pool de conexões"""
-        if self.flush_task:
-            self.flush_task.cancel()
-        await self.flush_buffer()
         if self.pool:
             await self.pool.close()
         logger.info("Database pool closed")
     
-    async def start_flush_task(self):
-        """Inicia task de flush periódico"""
-        self.flush_task = asyncio.create_task(self._periodic_flush())
-        
-    async def _periodic_flush(self):
-        """Flush buffer a cada N segundos"""
-        while True:
-            await asyncio.sleep(settings.batch_timeout)
-            await self.flush_buffer()
-    
-    async def add_to_buffer(self, event: TelemetryEvent):
-        """Adiciona evento ao buffer"""
-        async with self.buffer_lock:
-            self.buffer.append(event)
-            if len(self.buffer) >= settings.batch_size:
-                await self.flush_buffer()
-    
-    async def flush_buffer(self):
-        """Flush buffer para banco com retry"""
-        async with self.buffer_lock:
-            if not self.buffer:
-                return
-            
-            events = self.buffer.copy()
-            self.buffer.clear()
-        
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                await self._insert_events(events)
-                logger.info(f"Flushed {len(events)} events to database")
-                return
-            except Exception as e:
-                logger.error(f"Flush attempt {attempt + 1} failed: {e}")
-                if attempt == max_retries - 1:
-                    logger.error(f"Lost {len(events)} events after {max_retries} retries")
-                await asyncio.sleep(0.5 * (attempt + 1))
-    
-    async def _insert_events(self, events: List[TelemetryEvent]):
-        """Insere eventos em batch"""
-        if not events:
+    async def _insert_events(
+        self,
+        events: List[TelemetryEvent],
+        alerts: List[dict],
+        transitions: List[dict],
+        trips: List[dict]
+    ):
+        """Insere eventos, alertas, transições e viagens em batch (mesma transação)"""
+        if not (events or alerts or transitions or trips):
             return
             
         async with self.pool.acquire() as conn:
-            await conn.executemany(
-                """
-                INSERT INTO telemetry_events 
-                (device_id, ts, lat, lon, speed_kmh, engine_temp_c, battery_v)
-                VALUES ($1, $2, $3, $4, $5, $6, $7)
-                """,
-                [(e.device_id, e.ts, e.lat, e.lon, e.speed_kmh, 
-                  e.engine_temp_c, e.battery_v) for e in events]
-            )
+            async with conn.transaction():
+                if events:
+                    await conn.executemany(
+                        """
+                        INSERT INTO telemetry_events 
+                        (device_id, ts, lat, lon, speed_kmh, engine_temp_c, battery_v)
+                        VALUES ($1, $2, $3, $4, $5, $6, $7)
+                        """,
+                        [(e.device_id, e.ts, e.lat, e.lon, e.speed_kmh, 
+                          e.engine_temp_c, e.battery_v) for e in events]
+                    )
+                if alerts:
+                    await conn.executemany(
+                        """
+                        INSERT INTO alerts
+                        (device_id, ts, alert_type, rule_id, value, message)
+                        VALUES ($1, $2, $3, $4, $5, $6)
+                        """,
+                        [(a['device_id'], a['ts'], a['alert_type'], a['rule_id'],
+                          a['value'], a['message']) for a in alerts]
+                    )
+                if transitions:
+                    await conn.executemany(
+                        """
+                        INSERT INTO geofence_events
+                        (device_id, geofence_id, transition, ts, lat, lon)
+                        VALUES ($1, $2, $3, $4, $5, $6)
+                        """,
+                        [(t['device_id'], t['geofence_id'], t['transition'],
+                          t['ts'], t['lat'], t['lon']) for t in transitions]
+                    )
+                if trips:
+                    await conn.executemany(
+                        """
+                        INSERT INTO trips
+                        (device_id, kind, start_ts, end_ts, duration_s, distance_km,
+                         idle_s, harsh_events, events, max_speed_kmh,
+                         start_lat, start_lon, end_lat, end_lon)
+                        VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14)
+                        """,
+                        [(t['device_id'], t['kind'], t['start_ts'], t['end_ts'],
+                          t['duration_s'], t['distance_km'], t['idle_s'],
+                          t['harsh_events'], t['events'], t['max_speed_kmh'],
+                          t['start_lat'], t['start_lon'], t['end_lat'], t['end_lon'])
+                         for t in trips]
+                    )
     
     async def get_devices(self) -> List[DeviceStatus]:
         """Lista todos devices com status"""
@@ -191,13 +200,12 @@ class Database:
                 minutes
             )
             
-            # Alertas (velocidade > 90)
+            # Devices com alertas (tabela alerts, índice por ts)
             alerts_count = await conn.fetchval(
                 """
                 SELECT COUNT(DISTINCT device_id)
-                FROM telemetry_events
+                FROM alerts
                 WHERE ts > NOW() - INTERVAL '10 minutes'
-                AND speed_kmh > 90
                 """
             )
             
@@ -209,36 +217,129 @@ class Database:
             }
     
     async def get_alerts(self, minutes: int = 10) -> List[dict]:
-        """Alertas recentes (velocidade > 90)"""
+        """Alertas recentes disparados pelo motor de regras"""
         async with self.pool.acquire() as conn:
             rows = await conn.fetch(
                 """
-                WITH speed_alerts AS (
-                    SELECT 
-                        id,
-                        device_id,
-                        ts,
-                        speed_kmh,
-                        'high_speed' as alert_type
-                    FROM telemetry_events
-                    WHERE ts > NOW() - INTERVAL '1 minute' * $1
-                    AND speed_kmh > 90
-                    ORDER BY ts DESC
-                )
                 SELECT 
                     id,
                     device_id,
                     ts,
                     alert_type,
-                    speed_kmh as value,
-                    'Velocidade acima de 90 km/h: ' || ROUND(speed_kmh::numeric, 1) || ' km/h' as message
-                FROM speed_alerts
+                    value,
+                    message
+                FROM alerts
+                WHERE ts > NOW() - INTERVAL '1 minute' * $1
+                ORDER BY ts DESC
                 LIMIT 50
                 """,
                 minutes
             )
             return [dict(row) for row in rows]
     
+    # ==================== GEOFENCE QUERIES ====================
+    
+    async def get_geofences(self) -> List[Geofence]:
+        """Todas as geofences cadastradas"""
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(
+                """
+                SELECT id, name, kind, polygon
+                FROM geofences
+                ORDER BY id
+                """
+            )
+            return [
+                Geofence(
+                    id=row['id'],
+                    name=row['name'],
+                    kind=row['kind'],
+                    polygon=json.loads(row['polygon'])
+                )
+                for row in rows
+            ]
+    
+    async def create_geofence(self, fence: Geofence) -> Geofence:
+        """Cadastra geofence e retorna com id"""
+        async with self.pool.acquire() as conn:
+            fence_id = await conn.fetchval(
+                """
+                INSERT INTO geofences (name, kind, polygon)
+                VALUES ($1, $2, $3::jsonb)
+                RETURNING id
+                """,
+                fence.name, fence.kind, json.dumps(fence.polygon)
+            )
+            return fence.model_copy(update={"id": fence_id})
+    
+    async def get_geofence_events(
+        self,
+        minutes: int = 60,
+        device_id: Optional[str] = None,
+        limit: int = 500
+    ) -> List[dict]:
+        """Transições de geofence recentes"""
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(
+                """
+                SELECT
+                    e.id,
+                    e.device_id,
+                    e.geofence_id,
+                    g.name as geofence_name,
+                    g.kind,
+                    e.transition,
+                    e.ts,
+                    e.lat,
+                    e.lon
+                FROM geofence_events e
+                JOIN geofences g ON g.id = e.geofence_id
+                WHERE e.ts > NOW() - INTERVAL '1 minute' * $1
+                AND ($2::text IS NULL OR e.device_id = $2)
+                ORDER BY e.ts DESC
+                LIMIT $3
+                """,
+                minutes, device_id, limit
+            )
+            return [dict(row) for row in rows]
+    
+    # ==================== VIAGENS ====================
+    
+    async def get_trips(
+        self,
+        device_id: Optional[str] = None,
+        kind: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        min_distance_km: Optional[float] = None,
+        min_duration_s: Optional[float] = None,
+        limit: int = 100
+    ) -> List[dict]:
+        """
+        Viagens/paradas que começam em [start_date, end_date), mais recentes primeiro
+        Lê só a tabela trips (índices por start_ts), sem varrer a telemetria
+        """
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(
+                """
+                SELECT
+                    id, device_id, kind, start_ts, end_ts, duration_s, distance_km,
+                    idle_s, harsh_events, events, max_speed_kmh,
+                    start_lat, start_lon, end_lat, end_lon
+                FROM trips
+                WHERE ($1::text IS NULL OR device_id = $1)
+                AND ($2::text IS NULL OR kind = $2)
+                AND ($3::timestamptz IS NULL OR start_ts >= $3)
+                AND ($4::timestamptz IS NULL OR start_ts < $4)
+                AND ($5::float8 IS NULL OR distance_km >= $5)
+                AND ($6::float8 IS NULL OR duration_s >= $6)
+                ORDER BY start_ts DESC
+                LIMIT $7
+                """,
+                device_id, kind, start_date, end_date, min_distance_km, min_duration_s, limit
+            )
+            return [dict(row) for row in rows]
+    
     # ==================== FUEL ECONOMY QUERIES ====================
     
     async def get_device_events_period(
@@ -264,29 +365,175 @@ class Database:
     async def get_all_devices_events_period(
         self,
         start_date: datetime,
-        end_date: datetime
-    ) -> dict:
-        """Eventos de TODOS devices em período (agrupado por device)"""
+        end_date: datetime,
+        device_ids: Optional[List[str]] = None
+    ) -> AsyncIterator[Tuple[str, List[dict]]]:
+        """
+        Eventos de TODOS devices em período [start, end), um device por vez
+        Gera (device_id, eventos em ordem crescente) via cursor no servidor:
+        a memória fica limitada à janela de um device
+        device_ids restringe a um subconjunto de devices
+        """
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                device_id, events = None, []
+                async for row in conn.cursor(
+                    """
+                    SELECT *
+                    FROM telemetry_events
+                    WHERE ts >= $1 AND ts < $2
+                    AND ($3::text[] IS NULL OR device_id = ANY($3))
+                    ORDER BY device_id, ts ASC, id ASC
+                    """,
+                    start_date, end_date, device_ids,
+                    prefetch=CURSOR_PREFETCH
+                ):
+                    if row['device_id'] != device_id:
+                        if events:
+                            yield device_id, events
+                        device_id, events = row['device_id'], []
+                    events.append(dict(row))
+                if events:
+                    yield device_id, events
+    
+    # ==================== ANALYTICS (COLUNAR) ====================
+    
+    _COLUMNS_QUERY = """
+        SELECT
+            device_id,
+            array_agg((EXTRACT(EPOCH FROM ts) * 1000000)::int8 ORDER BY ts, id) as ts_us,
+            array_agg(lat ORDER BY ts, id) as lat,
+            array_agg(lon ORDER BY ts, id) as lon,
+            array_agg(speed_kmh ORDER BY ts, id) as speed
+        FROM telemetry_events
+        WHERE ts >= $1 AND ts < $2
+        AND ($3::text[] IS NULL OR device_id = ANY($3))
+        GROUP BY device_id
+        ORDER BY device_id
+    """
+    
+    async def iter_fleet_columns(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        device_ids: Optional[List[str]] = None
+    ) -> AsyncIterator[Tuple[str, TelemetryColumns]]:
+        """
+        Telemetria em colunas por device, em ordem crescente de ts
+        Uma linha por device (arrays do Postgres), lida por cursor: só a
+        janela de um device fica em memória por vez
+        """
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                async for row in conn.cursor(
+                    self._COLUMNS_QUERY, start_date, end_date, device_ids, prefetch=1
+                ):
+                    yield row['device_id'], columns_from_arrays(
+                        row['ts_us'], row['lat'], row['lon'], row['speed']
+                    )
+    
+    async def get_fuel_aggregates(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        device_id: Optional[str] = None
+    ) -> List[dict]:
+        """
+        Totais de combustível por device calculados no Postgres
+        LAG() sobre (device_id ORDER BY ts) com os mesmos critérios de fuel_economy.py
+        Retorna uma linha por device: events, idle_hours, harsh_events, distance_km
+        """
         async with self.pool.acquire() as conn:
             rows = await conn.fetch(
                 """
-                SELECT *
-                FROM telemetry_events
-                WHERE ts BETWEEN $1 AND $2
-                ORDER BY device_id, ts ASC
+                WITH pairs AS (
+                    SELECT
+                        device_id,
+                        lat,
+                        lon,
+                        COALESCE(speed_kmh, 0) as speed,
+                        LAG(lat) OVER w as prev_lat,
+                        LAG(lon) OVER w as prev_lon,
+                        LAG(COALESCE(speed_kmh, 0)) OVER w as prev_speed,
+                        EXTRACT(EPOCH FROM ts - LAG(ts) OVER w)::float8 as dt
+                    FROM telemetry_events
+                    WHERE ts >= $1 AND ts < $2
+                    AND ($3::text IS NULL OR device_id = $3)
+                    WINDOW w AS (PARTITION BY device_id ORDER BY ts, id)
+                ),
+                segments AS (
+                    SELECT
+                        *,
+                        CASE
+                            WHEN lat <> 0 AND lon <> 0 AND prev_lat <> 0 AND prev_lon <> 0 THEN
+                                sin(radians(lat - prev_lat) / 2) ^ 2 +
+                                cos(radians(prev_lat)) * cos(radians(lat)) *
+                                sin(radians(lon - prev_lon) / 2) ^ 2
+                        END as hav
+                    FROM pairs
+                )
+                SELECT
+                    device_id,
+                    COUNT(*) as events,
+                    COALESCE(SUM(dt) FILTER (WHERE prev_speed < $4), 0) / 3600 as idle_hours,
+                    COUNT(*) FILTER (WHERE dt > 0 AND abs(speed - prev_speed) / dt > $5) as harsh_events,
+                    COALESCE(SUM(6371 * 2 * atan2(sqrt(hav), sqrt(1 - hav))), 0) as distance_km
+                FROM segments
+                GROUP BY device_id
+                ORDER BY device_id
                 """,
-                start_date, end_date
+                start_date, end_date, device_id,
+                IDLE_SPEED_THRESHOLD, HARSH_ACCEL_THRESHOLD
             )
-            
-            # Agrupar por device_id
-            events_by_device = {}
-            for row in rows:
-                device_id = row['device_id']
-                if device_id not in events_by_device:
-                    events_by_device[device_id] = []
-                events_by_device[device_id].append(dict(row))
-            
-            return events_by_device
+            return [dict(row) for row in rows]
+    
+    async def upsert_daily_summaries(self, rows: List[dict]):
+        """Grava (ou substitui) resumos diários por device"""
+        if not rows:
+            return
+        async with self.pool.acquire() as conn:
+            await conn.executemany(
+                """
+                INSERT INTO fuel_daily_summary
+                (device_id, day, events, idle_hours, harsh_events, distance_km,
+                 idle_cost, aggressive_cost, estimated_waste, config_hash, updated_at)
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, NOW())
+                ON CONFLICT (device_id, day) DO UPDATE SET
+                    events = EXCLUDED.events,
+                    idle_hours = EXCLUDED.idle_hours,
+                    harsh_events = EXCLUDED.harsh_events,
+                    distance_km = EXCLUDED.distance_km,
+                    idle_cost = EXCLUDED.idle_cost,
+                    aggressive_cost = EXCLUDED.aggressive_cost,
+                    estimated_waste = EXCLUDED.estimated_waste,
+                    config_hash = EXCLUDED.config_hash,
+                    updated_at = NOW()
+                """,
+                [(r['device_id'], r['day'], r['events'], r['idle_hours'],
+                  r['harsh_events'], r['distance_km'], r['idle_cost'],
+                  r['aggressive_cost'], r['estimated_waste'], r['config_hash']) for r in rows]
+            )
+    
+    async def get_daily_summary_totals(self, start_day: date, end_day: date) -> dict:
+        """Totais da frota nos resumos diários em [start_day, end_day]"""
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow(
+                """
+                SELECT
+                    COUNT(DISTINCT device_id) as devices,
+                    COUNT(*) as device_days,
+                    COALESCE(SUM(events), 0) as events,
+                    COALESCE(SUM(idle_hours), 0) as idle_hours,
+                    COALESCE(SUM(harsh_events), 0) as harsh_events,
+                    COALESCE(SUM(distance_km), 0) as distance_km,
+                    COALESCE(SUM(estimated_waste), 0) as estimated_waste,
+                    COUNT(DISTINCT config_hash) as configs
+                FROM fuel_daily_summary
+                WHERE day BETWEEN $1 AND $2
+                """,
+                start_day, end_day
+            )
+            return dict(row)
     
     async def get_fuel_consumption_summary(
         self,
@@ -317,5 +564,14 @@ class Database:
             )
             return dict(row) if row else {}
 
+def create_database() -> StorageBackend:
+    """Backend escolhido em STORAGE_BACKEND"""
+    if settings.storage_backend not in STORAGE_BACKENDS:
+        raise ValueError(f"STORAGE_BACKEND must be one of: {', '.join(STORAGE_BACKENDS)}")
+    if settings.storage_backend == "sqlite":
+        from database_sqlite import SQLiteDatabase
+        return SQLiteDatabase(settings.sqlite_path)
+    return Database()
+
 # Singleton
-db = Database()
+db = create_database()
@@ -0,0 +1,744 @@
+"""
+MÓDULO: Backend SQLite (WAL) para instalações de um nó só
+Mesmas consultas do backend Postgres sobre um arquivo local, sem servidor
+
+- Uma conexão de escrita numa thread dedicada: cada flush é uma transação
+  com executemany (statements preparados ficam no cache da conexão)
+- Leituras em paralelo (WAL) em threads com conexão própria
+- ts em INTEGER (epoch µs): índices compactos e colunas prontas para os
+  kernels de combustível
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from typing import AsyncIterator, Callable, List, Optional, Tuple
+
+from fuel_kernels import (
+    TelemetryColumns,
+    columns_from_arrays,
+    harsh_events_columns,
+    idle_hours_columns,
+    total_distance_columns,
+)
+from models import DeviceStatus, Geofence, TelemetryEvent
+from storage import StorageBackend
+
+logger = logging.getLogger(__name__)
+
+READ_THREADS = 4
+FETCH_ROWS = 5000           # Linhas por lote nas leituras em streaming
+STATEMENT_CACHE = 256       # Statements preparados mantidos por conexão
+ONLINE_WINDOW_S = 30
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS telemetry_events (
+    id INTEGER PRIMARY KEY,
+    device_id TEXT NOT NULL,
+    ts INTEGER NOT NULL,                -- epoch µs (UTC)
+    lat REAL,
+    lon REAL,
+    speed_kmh REAL,
+    engine_temp_c REAL,
+    battery_v REAL,
+    created_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_telemetry_device_ts ON telemetry_events(device_id, ts);
+CREATE INDEX IF NOT EXISTS idx_telemetry_ts ON telemetry_events(ts);
+
+CREATE TABLE IF NOT EXISTS alerts (
+    id INTEGER PRIMARY KEY,
+    device_id TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    alert_type TEXT NOT NULL,
+    rule_id TEXT NOT NULL,
+    value REAL NOT NULL,
+    message TEXT NOT NULL,
+    created_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_alerts_ts_device ON alerts(ts, device_id);
+CREATE INDEX IF NOT EXISTS idx_alerts_device_ts ON alerts(device_id, ts);
+
+CREATE TABLE IF NOT EXISTS geofences (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    kind TEXT NOT NULL DEFAULT 'site',
+    polygon TEXT NOT NULL,              -- JSON [[lat, lon], ...]
+    created_at INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS geofence_events (
+    id INTEGER PRIMARY KEY,
+    device_id TEXT NOT NULL,
+    geofence_id INTEGER NOT NULL REFERENCES geofences(id) ON DELETE CASCADE,
+    transition TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    lat REAL,
+    lon REAL
+);
+CREATE INDEX IF NOT EXISTS idx_geofence_events_ts ON geofence_events(ts);
+CREATE INDEX IF NOT EXISTS idx_geofence_events_device_ts ON geofence_events(device_id, ts);
+
+CREATE TABLE IF NOT EXISTS fuel_daily_summary (
+    device_id TEXT NOT NULL,
+    day TEXT NOT NULL,                  -- YYYY-MM-DD
+    events INTEGER NOT NULL,
+    idle_hours REAL NOT NULL,
+    harsh_events INTEGER NOT NULL,
+    distance_km REAL NOT NULL,
+    idle_cost REAL NOT NULL,
+    aggressive_cost REAL NOT NULL,
+    estimated_waste REAL NOT NULL,
+    config_hash TEXT NOT NULL DEFAULT '',   -- fuel_economy.config_hash do FuelConfig usado
+    updated_at INTEGER NOT NULL,
+    PRIMARY KEY (device_id, day)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_fuel_daily_day ON fuel_daily_summary(day);
+
+CREATE TABLE IF NOT EXISTS trips (
+    id INTEGER PRIMARY KEY,
+    device_id TEXT NOT NULL,
+    kind TEXT NOT NULL,                 -- trip | stop
+    start_ts INTEGER NOT NULL,
+    end_ts INTEGER NOT NULL,
+    duration_s REAL NOT NULL,
+    distance_km REAL NOT NULL,
+    idle_s REAL NOT NULL,
+    harsh_events INTEGER NOT NULL,
+    events INTEGER NOT NULL,
+    max_speed_kmh REAL,
+    start_lat REAL,
+    start_lon REAL,
+    end_lat REAL,
+    end_lon REAL
+);
+CREATE INDEX IF NOT EXISTS idx_trips_start ON trips(start_ts);
+CREATE INDEX IF NOT EXISTS idx_trips_device_start ON trips(device_id, start_ts);
+"""
+
+_INSERT_EVENT = """
+    INSERT INTO telemetry_events
+    (device_id, ts, lat, lon, speed_kmh, engine_temp_c, battery_v, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_INSERT_ALERT = """
+    INSERT INTO alerts (device_id, ts, alert_type, rule_id, value, message, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+_INSERT_TRANSITION = """
+    INSERT INTO geofence_events (device_id, geofence_id, transition, ts, lat, lon)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+_INSERT_TRIP = """
+    INSERT INTO trips
+    (device_id, kind, start_ts, end_ts, duration_s, distance_km,
+     idle_s, harsh_events, events, max_speed_kmh,
+     start_lat, start_lon, end_lat, end_lon)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_UPSERT_SUMMARY = """
+    INSERT INTO fuel_daily_summary
+    (device_id, day, events, idle_hours, harsh_events, distance_km,
+     idle_cost, aggressive_cost, estimated_waste, config_hash, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (device_id, day) DO UPDATE SET
+        events = excluded.events,
+        idle_hours = excluded.idle_hours,
+        harsh_events = excluded.harsh_events,
+        distance_km = excluded.distance_km,
+        idle_cost = excluded.idle_cost,
+        aggressive_cost = excluded.aggressive_cost,
+        estimated_waste = excluded.estimated_waste,
+        config_hash = excluded.config_hash,
+        updated_at = excluded.updated_at
+"""
+
+
+def _to_us(ts: datetime) -> int:
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    delta = ts - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _from_us(us: Optional[int]) -> Optional[datetime]:
+    return None if us is None else _EPOCH + timedelta(microseconds=us)
+
+
+def _now_us() -> int:
+    return _to_us(datetime.now(timezone.utc))
+
+
+def _row(row: sqlite3.Row, *ts_keys: str) -> dict:
+    """sqlite3.Row -> dict com as colunas de tempo em datetime"""
+    result = dict(row)
+    for key in ts_keys:
+        result[key] = _from_us(result[key])
+    return result
+
+
+def _event_row(row: sqlite3.Row) -> dict:
+    return _row(row, "ts", "created_at")
+
+
+def _fuel_totals(device_id: str, cols: TelemetryColumns) -> dict:
+    return {
+        "device_id": device_id,
+        "events": len(cols),
+        "idle_hours": idle_hours_columns(cols),
+        "harsh_events": harsh_events_columns(cols),
+        "distance_km": total_distance_columns(cols),
+    }
+
+
+class SQLiteDatabase(StorageBackend):
+    """Backend SQLite em modo WAL (arquivo local)"""
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self.writer: Optional[sqlite3.Connection] = None
+        self.write_executor: Optional[ThreadPoolExecutor] = None
+        self.read_executor: Optional[ThreadPoolExecutor] = None
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+
+    # ==================== CONEXÃO ====================
+
+    def _open(self, readonly: bool = False, named_rows: bool = True) -> sqlite3.Connection:
+        # Autocommit: transações de escrita são abertas explicitamente (BEGIN)
+        conn = sqlite3.connect(
+            self.path,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE
+        )
+        conn.execute("PRAGMA busy_timeout = 5000")
+        conn.execute("PRAGMA synchronous = NORMAL")     # Seguro em WAL; fsync só no checkpoint
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.execute("PRAGMA cache_size = -65536")      # 64 MB
+        conn.execute("PRAGMA foreign_keys = ON")
+        if readonly:
+            conn.execute("PRAGMA query_only = ON")
+        if named_rows:
+            conn.row_factory = sqlite3.Row
+        return conn
+
+    def _open_writer(self):
+        self.writer = self._open()
+        self.writer.execute("PRAGMA journal_mode = WAL")
+        self.writer.executescript(SCHEMA)
+        # Arquivos criados antes da coluna config_hash
+        columns = {row[1] for row in self.writer.execute("PRAGMA table_info(fuel_daily_summary)")}
+        if "config_hash" not in columns:
+            self.writer.execute(
+                "ALTER TABLE fuel_daily_summary ADD COLUMN config_hash TEXT NOT NULL DEFAULT ''"
+            )
+
+    async def connect(self):
+        """Abre o arquivo (cria o schema) e as threads de escrita/leitura"""
+        self.write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-write")
+        self.read_executor = ThreadPoolExecutor(max_workers=READ_THREADS, thread_name_prefix="sqlite-read")
+        await self._write(self._open_writer)
+        logger.info(f"SQLite database opened: {self.path}")
+
+    async def _close(self):
+        """Fecha conexões e threads"""
+        if self.writer:
+            await self._write(self.writer.close)
+            self.writer = None
+        with self._readers_lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers.clear()
+        for executor in (self.write_executor, self.read_executor):
+            if executor:
+                executor.shutdown(wait=True)
+        logger.info("SQLite database closed")
+
+    async def _write(self, fn: Callable, *args):
+        """Executa fn na thread de escrita (uma transação por vez)"""
+        return await asyncio.get_running_loop().run_in_executor(self.write_executor, fn, *args)
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._open(readonly=True)
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn
+
+    async def _read(self, fn: Callable, *args):
+        """Executa fn(conexão de leitura, *args) numa thread de leitura"""
+        def call():
+            return fn(self._reader(), *args)
+        return await asyncio.get_running_loop().run_in_executor(self.read_executor, call)
+
+    async def _fetch(self, sql: str, params=()) -> List[sqlite3.Row]:
+        return await self._read(lambda conn: conn.execute(sql, params).fetchall())
+
+    async def _fetchone(self, sql: str, params=()) -> Optional[sqlite3.Row]:
+        return await self._read(lambda conn: conn.execute(sql, params).fetchone())
+
+    async def _stream(self, sql: str, params) -> AsyncIterator[List[tuple]]:
+        """
+        Linhas em lotes de FETCH_ROWS numa conexão própria: o snapshot do
+        WAL fica fixo durante a leitura e só um lote fica em memória
+        """
+        loop = asyncio.get_running_loop()
+        conn = await loop.run_in_executor(self.read_executor, self._open, True, False)
+        try:
+            cursor = await loop.run_in_executor(self.read_executor, conn.execute, sql, params)
+            while True:
+                rows = await loop.run_in_executor(self.read_executor, cursor.fetchmany, FETCH_ROWS)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            await loop.run_in_executor(self.read_executor, conn.close)
+
+    # ==================== ESCRITA ====================
+
+    def _insert_sync(
+        self,
+        events: List[TelemetryEvent],
+        alerts: List[dict],
+        transitions: List[dict],
+        trips: List[dict]
+    ):
+        conn = self.writer
+        now = _now_us()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if events:
+                conn.executemany(
+                    _INSERT_EVENT,
+                    [(e.device_id, _to_us(e.ts), e.lat, e.lon, e.speed_kmh,
+                      e.engine_temp_c, e.battery_v, now) for e in events]
+                )
+            if alerts:
+                conn.executemany(
+                    _INSERT_ALERT,
+                    [(a['device_id'], _to_us(a['ts']), a['alert_type'], a['rule_id'],
+                      a['value'], a['message'], now) for a in alerts]
+                )
+            if transitions:
+                conn.executemany(
+                    _INSERT_TRANSITION,
+                    [(t['device_id'], t['geofence_id'], t['transition'],
+                      _to_us(t['ts']), t['lat'], t['lon']) for t in transitions]
+                )
+            if trips:
+                conn.executemany(
+                    _INSERT_TRIP,
+                    [(t['device_id'], t['kind'], _to_us(t['start_ts']), _to_us(t['end_ts']),
+                      t['duration_s'], t['distance_km'], t['idle_s'],
+                      t['harsh_events'], t['events'], t['max_speed_kmh'],
+                      t['start_lat'], t['start_lon'], t['end_lat'], t['end_lon'])
+                     for t in trips]
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    async def _insert_events(
+        self,
+        events: List[TelemetryEvent],
+        alerts: List[dict],
+        transitions: List[dict],
+        trips: List[dict]
+    ):
+        """Insere eventos, alertas, transições e viagens em batch (mesma transação)"""
+        if not (events or alerts or transitions or trips):
+            return
+        await self._write(self._insert_sync, events, alerts, transitions, trips)
+
+    # ==================== CONSULTAS ====================
+
+    async def get_devices(self) -> List[DeviceStatus]:
+        """Lista todos devices com status"""
+        # Com MAX() as demais colunas vêm da linha do máximo (índice device_id, ts)
+        rows = await self._fetch(
+            """
+            SELECT
+                device_id,
+                MAX(ts) as last_seen,
+                lat as last_lat,
+                lon as last_lon,
+                speed_kmh as last_speed,
+                engine_temp_c as last_temp,
+                battery_v as last_battery
+            FROM telemetry_events
+            GROUP BY device_id
+            ORDER BY device_id
+            """
+        )
+        online_since = _now_us() - ONLINE_WINDOW_S * 1_000_000
+        return [
+            DeviceStatus(**_row(row, "last_seen"), online=row["last_seen"] > online_since)
+            for row in rows
+        ]
+
+    async def get_device_latest(self, device_id: str) -> Optional[dict]:
+        """Último evento de um device"""
+        row = await self._fetchone(
+            """
+            SELECT *
+            FROM telemetry_events
+            WHERE device_id = ?
+            ORDER BY ts DESC
+            LIMIT 1
+            """,
+            (device_id,)
+        )
+        return _event_row(row) if row else None
+
+    async def get_device_events(
+        self,
+        device_id: str,
+        minutes: int = 60,
+        limit: int = 500
+    ) -> List[dict]:
+        """Eventos de um device no período"""
+        rows = await self._fetch(
+            """
+            SELECT *
+            FROM telemetry_events
+            WHERE device_id = ?
+            AND ts > ?
+            ORDER BY ts DESC
+            LIMIT ?
+            """,
+            (device_id, _now_us() - minutes * 60_000_000, limit)
+        )
+        return [_event_row(row) for row in rows]
+
+    async def get_metrics_summary(self, minutes: int = 5) -> dict:
+        """Métricas agregadas"""
+        now = _now_us()
+
+        def query(conn: sqlite3.Connection) -> dict:
+            online_count = conn.execute(
+                "SELECT COUNT(DISTINCT device_id) FROM telemetry_events WHERE ts > ?",
+                (now - ONLINE_WINDOW_S * 1_000_000,)
+            ).fetchone()[0]
+            events_count = conn.execute(
+                "SELECT COUNT(*) FROM telemetry_events WHERE ts > ?",
+                (now - 60_000_000,)
+            ).fetchone()[0]
+            avg_speed = conn.execute(
+                """
+                SELECT COALESCE(AVG(speed_kmh), 0)
+                FROM telemetry_events
+                WHERE ts > ? AND speed_kmh IS NOT NULL
+                """,
+                (now - minutes * 60_000_000,)
+            ).fetchone()[0]
+            alerts_count = conn.execute(
+                "SELECT COUNT(DISTINCT device_id) FROM alerts WHERE ts > ?",
+                (now - 600_000_000,)
+            ).fetchone()[0]
+            return {
+                "devices_online": online_count or 0,
+                "events_last_minute": events_count or 0,
+                "avg_speed_5min": round(float(avg_speed or 0), 2),
+                "alerts_last_10min": alerts_count or 0
+            }
+
+        return await self._read(query)
+
+    async def get_alerts(self, minutes: int = 10) -> List[dict]:
+        """Alertas recentes disparados pelo motor de regras"""
+        rows = await self._fetch(
+            """
+            SELECT id, device_id, ts, alert_type, value, message
+            FROM alerts
+            WHERE ts > ?
+            ORDER BY ts DESC
+            LIMIT 50
+            """,
+            (_now_us() - minutes * 60_000_000,)
+        )
+        return [_row(row, "ts") for row in rows]
+
+    # ==================== GEOFENCE ====================
+
+    async def get_geofences(self) -> List[Geofence]:
+        """Todas as geofences cadastradas"""
+        rows = await self._fetch("SELECT id, name, kind, polygon FROM geofences ORDER BY id")
+        return [
+            Geofence(id=row['id'], name=row['name'], kind=row['kind'], polygon=json.loads(row['polygon']))
+            for row in rows
+        ]
+
+    async def create_geofence(self, fence: Geofence) -> Geofence:
+        """Cadastra geofence e retorna com id"""
+        def insert() -> int:
+            cursor = self.writer.execute(
+                "INSERT INTO geofences (name, kind, polygon, created_at) VALUES (?, ?, ?, ?)",
+                (fence.name, fence.kind, json.dumps(fence.polygon), _now_us())
+            )
+            return cursor.lastrowid
+
+        fence_id = await self._write(insert)
+        return fence.model_copy(update={"id": fence_id})
+
+    async def get_geofence_events(
+        self,
+        minutes: int = 60,
+        device_id: Optional[str] = None,
+        limit: int = 500
+    ) -> List[dict]:
+        """Transições de geofence recentes"""
+        # Filtro montado por parâmetro presente: "? IS NULL OR ..." impediria o uso do índice
+        device_filter = "AND e.device_id = ?" if device_id is not None else ""
+        params = [_now_us() - minutes * 60_000_000]
+        if device_id is not None:
+            params.append(device_id)
+        rows = await self._fetch(
+            f"""
+            SELECT
+                e.id, e.device_id, e.geofence_id, g.name as geofence_name, g.kind,
+                e.transition, e.ts, e.lat, e.lon
+            FROM geofence_events e
+            JOIN geofences g ON g.id = e.geofence_id
+            WHERE e.ts > ?
+            {device_filter}
+            ORDER BY e.ts DESC
+            LIMIT ?
+            """,
+            (*params, limit)
+        )
+        return [_row(row, "ts") for row in rows]
+
+    # ==================== VIAGENS ====================
+
+    async def get_trips(
+        self,
+        device_id: Optional[str] = None,
+        kind: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        min_distance_km: Optional[float] = None,
+        min_duration_s: Optional[float] = None,
+        limit: int = 100
+    ) -> List[dict]:
+        """Viagens/paradas que começam em [start_date, end_date), mais recentes primeiro"""
+        filters = [
+            ("device_id = ?", device_id),
+            ("kind = ?", kind),
+            ("start_ts >= ?", None if start_date is None else _to_us(start_date)),
+            ("start_ts < ?", None if end_date is None else _to_us(end_date)),
+            ("distance_km >= ?", min_distance_km),
+            ("duration_s >= ?", min_duration_s),
+        ]
+        clauses = [clause for clause, value in filters if value is not None]
+        params = [value for _, value in filters if value is not None]
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = await self._fetch(
+            f"""
+            SELECT
+                id, device_id, kind, start_ts, end_ts, duration_s, distance_km,
+                idle_s, harsh_events, events, max_speed_kmh,
+                start_lat, start_lon, end_lat, end_lon
+            FROM trips
+            {where}
+            ORDER BY start_ts DESC
+            LIMIT ?
+            """,
+            (*params, limit)
+        )
+        return [_row(row, "start_ts", "end_ts") for row in rows]
+
+    # ==================== FUEL ECONOMY ====================
+
+    async def get_device_events_period(
+        self,
+        device_id: str,
+        start_date: datetime,
+        end_date: datetime
+    ) -> List[dict]:
+        """Eventos de um device em período específico"""
+        rows = await self._fetch(
+            """
+            SELECT *
+            FROM telemetry_events
+            WHERE device_id = ?
+            AND ts BETWEEN ? AND ?
+            ORDER BY ts ASC
+            """,
+            (device_id, _to_us(start_date), _to_us(end_date))
+        )
+        return [_event_row(row) for row in rows]
+
+    @staticmethod
+    def _period_query(columns: str, device_ids: Optional[List[str]]) -> str:
+        device_filter = "AND device_id IN (SELECT value FROM json_each(?))" if device_ids is not None else ""
+        return f"""
+            SELECT {columns}
+            FROM telemetry_events
+            WHERE ts >= ? AND ts < ?
+            {device_filter}
+            ORDER BY device_id, ts, id
+        """
+
+    @staticmethod
+    def _period_params(start_date: datetime, end_date: datetime, device_ids: Optional[List[str]]) -> tuple:
+        params = (_to_us(start_date), _to_us(end_date))
+        if device_ids is not None:
+            params += (json.dumps(device_ids),)
+        return params
+
+    async def get_all_devices_events_period(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        device_ids: Optional[List[str]] = None
+    ) -> AsyncIterator[Tuple[str, List[dict]]]:
+        """
+        Eventos de TODOS devices em período [start, end), um device por vez
+        Gera (device_id, eventos em ordem crescente) lendo em lotes
+        """
+        columns = "id, device_id, ts, lat, lon, speed_kmh, engine_temp_c, battery_v, created_at"
+        names = [name.strip() for name in columns.split(",")]
+        device_id, events = None, []
+        async for rows in self._stream(
+            self._period_query(columns, device_ids),
+            self._period_params(start_date, end_date, device_ids)
+        ):
+            for row in rows:
+                if row[1] != device_id:
+                    if events:
+                        yield device_id, events
+                    device_id, events = row[1], []
+                event = dict(zip(names, row))
+                event["ts"] = _from_us(event["ts"])
+                event["created_at"] = _from_us(event["created_at"])
+                events.append(event)
+        if events:
+            yield device_id, events
+
+    async def iter_fleet_columns(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        device_ids: Optional[List[str]] = None
+    ) -> AsyncIterator[Tuple[str, TelemetryColumns]]:
+        """
+        Telemetria em colunas por device, em ordem crescente de ts
+        ts já vem em epoch µs; só a janela de um device fica em memória
+        """
+        device_id = None
+        ts, lat, lon, speed = [], [], [], []
+        async for rows in self._stream(
+            self._period_query("device_id, ts, lat, lon, speed_kmh", device_ids),
+            self._period_params(start_date, end_date, device_ids)
+        ):
+            for row in rows:
+                if row[0] != device_id:
+                    if ts:
+                        yield device_id, columns_from_arrays(ts, lat, lon, speed)
+                    device_id = row[0]
+                    ts, lat, lon, speed = [], [], [], []
+                ts.append(row[1])
+                lat.append(row[2])
+                lon.append(row[3])
+                speed.append(row[4])
+        if ts:
+            yield device_id, columns_from_arrays(ts, lat, lon, speed)
+
+    async def get_fuel_aggregates(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        device_id: Optional[str] = None
+    ) -> List[dict]:
+        """
+        Totais de combustível por device
+        O SQLite não garante funções trigonométricas: os totais saem dos
+        kernels colunares (mesmos critérios de fuel_economy.py)
+        """
+        device_ids = None if device_id is None else [device_id]
+        return [
+            await asyncio.to_thread(_fuel_totals, device, cols)
+            async for device, cols in self.iter_fleet_columns(start_date, end_date, device_ids)
+        ]
+
+    async def upsert_daily_summaries(self, rows: List[dict]):
+        """Grava (ou substitui) resumos diários por device"""
+        if not rows:
+            return
+
+        def upsert():
+            now = _now_us()
+            self.writer.execute("BEGIN IMMEDIATE")
+            try:
+                self.writer.executemany(
+                    _UPSERT_SUMMARY,
+                    [(r['device_id'], r['day'].isoformat(), r['events'], r['idle_hours'],
+                      r['harsh_events'], r['distance_km'], r['idle_cost'],
+                      r['aggressive_cost'], r['estimated_waste'], r['config_hash'], now)
+                     for r in rows]
+                )
+                self.writer.execute("COMMIT")
+            except BaseException:
+                self.writer.execute("ROLLBACK")
+                raise
+
+        await self._write(upsert)
+
+    async def get_daily_summary_totals(self, start_day: date, end_day: date) -> dict:
+        """Totais da frota nos resumos diários em [start_day, end_day]"""
+        row = await self._fetchone(
+            """
+            SELECT
+                COUNT(DISTINCT device_id) as devices,
+                COUNT(*) as device_days,
+                COALESCE(SUM(events), 0) as events,
+                COALESCE(SUM(idle_hours), 0.0) as idle_hours,
+                COALESCE(SUM(harsh_events), 0) as harsh_events,
+                COALESCE(SUM(distance_km), 0.0) as distance_km,
+                COALESCE(SUM(estimated_waste), 0.0) as estimated_waste,
+                COUNT(DISTINCT config_hash) as configs
+            FROM fuel_daily_summary
+            WHERE day BETWEEN ? AND ?
+            """,
+            (start_day.isoformat(), end_day.isoformat())
+        )
+        return dict(row)
+
+    async def get_fuel_consumption_summary(
+        self,
+        device_id: str,
+        days: int = 30
+    ) -> dict:
+        """Resumo de consumo dos últimos N dias"""
+        row = await self._fetchone(
+            """
+            WITH daily_stats AS (
+                SELECT
+                    date(ts / 1000000, 'unixepoch') as day,
+                    COUNT(*) as events,
+                    AVG(speed_kmh) as avg_speed
+                FROM telemetry_events
+                WHERE device_id = ?
+                AND ts > ?
+                GROUP BY day
+            )
+            SELECT
+                COUNT(*) as total_days,
+                SUM(events) as total_events,
+                AVG(avg_speed) as avg_speed
+            FROM daily_stats
+            """,
+            (device_id, _now_us() - days * 86_400_000_000)
+        )
+        return dict(row) if row else {}
@@ -0,0 +1,253 @@
+"""
+MÓDULO: Acumuladores incrementais de combustível
+Atualizados na ingestão, em baldes por hora (janela = soma de baldes)
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+
+from fuel_economy import (
+    IDLE_SPEED_THRESHOLD,
+    HARSH_ACCEL_THRESHOLD,
+    haversine_distance,
+    profile_from_totals,
+)
+from fuel_kernels import TelemetryColumns, pair_contributions
+from models import FuelConfig, DeviceProfile, TelemetryEvent
+
+logger = logging.getLogger(__name__)
+
+
+def _epoch_seconds(ts: datetime) -> float:
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+
+class DeviceAccumulator:
+    """
+    Estado de um device: última amostra + anel de baldes horários
+
+    A contribuição de cada par de amostras consecutivas (marcha lenta,
+    evento brusco, distância) vai para o balde da hora da primeira amostra,
+    com os mesmos critérios de fuel_economy.py
+    """
+
+    __slots__ = (
+        "retention", "hour", "idle_s", "harsh", "km", "events",
+        "last_ts", "last_lat", "last_lon", "last_speed", "late_events"
+    )
+
+    def __init__(self, retention_hours: int):
+        self.retention = retention_hours
+        self.hour = np.full(retention_hours, -1, dtype=np.int64)
+        self.idle_s = np.zeros(retention_hours, dtype=np.float64)
+        self.harsh = np.zeros(retention_hours, dtype=np.int64)
+        self.km = np.zeros(retention_hours, dtype=np.float64)
+        self.events = np.zeros(retention_hours, dtype=np.int64)
+        self.last_ts: Optional[float] = None
+        self.last_lat: Optional[float] = None
+        self.last_lon: Optional[float] = None
+        self.last_speed = 0.0
+        self.late_events = 0
+
+    def _slot(self, hour: int) -> int:
+        """Índice do balde da hora (-1 se já saiu da retenção)"""
+        i = hour % self.retention
+        current = self.hour[i]
+        if current == hour:
+            return i
+        if current > hour:
+            return -1
+        self.hour[i] = hour
+        self.idle_s[i] = 0.0
+        self.harsh[i] = 0
+        self.km[i] = 0.0
+        self.events[i] = 0
+        return i
+
+    def add(self, ts: float, lat: Optional[float], lon: Optional[float],
+            speed: Optional[float]) -> bool:
+        """Aplica uma amostra; retorna False se chegou fora de ordem"""
+        if self.last_ts is not None and ts < self.last_ts:
+            self.late_events += 1
+            return False
+
+        speed = speed or 0
+        i = self._slot(int(ts // 3600))
+        if i >= 0:
+            self.events[i] += 1
+
+        if self.last_ts is not None:
+            j = self._slot(int(self.last_ts // 3600))
+            if j >= 0:
+                dt = ts - self.last_ts
+                if self.last_speed < IDLE_SPEED_THRESHOLD:
+                    self.idle_s[j] += dt
+                if dt > 0 and abs(speed - self.last_speed) / dt > HARSH_ACCEL_THRESHOLD:
+                    self.harsh[j] += 1
+                if all([self.last_lat, self.last_lon, lat, lon]):
+                    self.km[j] += haversine_distance(self.last_lat, self.last_lon, lat, lon)
+
+        self.last_ts = ts
+        self.last_lat = lat
+        self.last_lon = lon
+        self.last_speed = speed
+        return True
+
+    def add_columns(self, cols: TelemetryColumns):
+        """Aplica um bloco de amostras em ordem crescente (vetorizado)"""
+        n = len(cols)
+        if n == 0:
+            return
+        if np.any(np.diff(cols.ts_us) < 0):
+            raise ValueError("add_columns requires ascending timestamps")
+        ts_s = cols.ts_us / 1e6
+        lat = [None if np.isnan(v) else float(v) for v in (cols.lat[0], cols.lat[-1])]
+        lon = [None if np.isnan(v) else float(v) for v in (cols.lon[0], cols.lon[-1])]
+        speed = [None if np.isnan(v) else float(v) for v in (cols.speed[0], cols.speed[-1])]
+
+        # Primeira amostra pelo caminho normal (pareia com a última já vista)
+        if not self.add(float(ts_s[0]), lat[0], lon[0], speed[0]):
+            return
+        if n == 1:
+            return
+
+        idle_s, harsh, km = pair_contributions(cols)
+        pair_hours, pair_idx = np.unique(cols.ts_us[:-1] // 3_600_000_000, return_inverse=True)
+        idle_by_hour = np.bincount(pair_idx, weights=idle_s)
+        harsh_by_hour = np.bincount(pair_idx, weights=harsh)
+        km_by_hour = np.bincount(pair_idx, weights=km)
+        for k, hour in enumerate(pair_hours.tolist()):
+            i = self._slot(hour)
+            if i >= 0:
+                self.idle_s[i] += idle_by_hour[k]
+                self.harsh[i] += int(harsh_by_hour[k])
+                self.km[i] += km_by_hour[k]
+
+        event_hours, counts = np.unique(cols.ts_us[1:] // 3_600_000_000, return_counts=True)
+        for hour, count in zip(event_hours.tolist(), counts.tolist()):
+            i = self._slot(hour)
+            if i >= 0:
+                self.events[i] += count
+
+        self.last_ts = float(ts_s[-1])
+        self.last_lat = lat[1]
+        self.last_lon = lon[1]
+        self.last_speed = speed[1] or 0
+
+    def totals(self, hours: int, now: float) -> tuple:
+        """(eventos, horas de marcha lenta, eventos bruscos, km) nas últimas N horas"""
+        current = int(now // 3600)
+        mask = (self.hour > current - hours) & (self.hour <= current)
+        return (
+            int(self.events[mask].sum()),
+            float(self.idle_s[mask].sum()) / 3600,
+            int(self.harsh[mask].sum()),
+            float(self.km[mask].sum())
+        )
+
+
+class FuelTracker:
+    """
+    Acumuladores de todos os devices
+
+    Enquanto o aquecimento (histórico do banco) roda, eventos ao vivo
+    ficam pendentes e são aplicados depois, preservando a ordem temporal
+    """
+
+    def __init__(self, retention_hours: int = 720):
+        self.retention_hours = retention_hours
+        self.devices: Dict[str, DeviceAccumulator] = {}
+        self.covered_since: Optional[float] = None   # Início dos dados acumulados
+        self.warming = False
+        self._pending: List[TelemetryEvent] = []
+        self._watchers: List[Set[str]] = []
+
+    def watch(self) -> Set[str]:
+        """Conjunto que passa a receber os device_ids alterados"""
+        changed: Set[str] = set()
+        self._watchers.append(changed)
+        return changed
+
+    def unwatch(self, changed: Set[str]):
+        self._watchers = [w for w in self._watchers if w is not changed]
+
+    def _touch(self, device_id: str):
+        for changed in self._watchers:
+            changed.add(device_id)
+
+    def _device(self, device_id: str) -> DeviceAccumulator:
+        acc = self.devices.get(device_id)
+        if acc is None:
+            acc = self.devices[device_id] = DeviceAccumulator(self.retention_hours)
+        return acc
+
+    def add_event(self, event: TelemetryEvent):
+        """Aplica evento ingerido"""
+        if self.warming:
+            self._pending.append(event)
+            return
+        if self._device(event.device_id).add(
+            _epoch_seconds(event.ts), event.lat, event.lon, event.speed_kmh
+        ):
+            self._touch(event.device_id)
+
+    def begin_warmup(self):
+        """Passa a segurar eventos ao vivo até o histórico ser carregado"""
+        self.warming = True
+
+    def load_history(self, device_id: str, cols: TelemetryColumns):
+        """Aplica histórico (colunas em ordem crescente de ts) de um device"""
+        self._device(device_id).add_columns(cols)
+        self._touch(device_id)
+
+    def finish_warmup(self, covered_since: datetime):
+        """Marca o início da cobertura e aplica os eventos pendentes"""
+        self.covered_since = _epoch_seconds(covered_since)
+        self.warming = False
+        pending = sorted(self._pending, key=lambda e: _epoch_seconds(e.ts))
+        self._pending = []
+        for event in pending:
+            self.add_event(event)
+        logger.info(
+            f"Fuel tracker warm: {len(self.devices)} devices, "
+            f"{len(pending)} pending events applied"
+        )
+
+    def covers(self, hours: int, now: Optional[float] = None) -> bool:
+        """True se os acumuladores respondem a janela inteira"""
+        if self.warming or self.covered_since is None or hours > self.retention_hours:
+            return False
+        now = now if now is not None else datetime.now(timezone.utc).timestamp()
+        return self.covered_since <= now - hours * 3600
+
+    def profile(
+        self,
+        device_id: str,
+        hours: int,
+        config: FuelConfig,
+        now: Optional[float] = None
+    ) -> Optional[DeviceProfile]:
+        """Perfil do device na janela (None se não houver dados)"""
+        acc = self.devices.get(device_id)
+        if acc is None:
+            return None
+        now = now if now is not None else datetime.now(timezone.utc).timestamp()
+        events, idle_hours, harsh, km = acc.totals(hours, now)
+        if not events:
+            return None
+        return profile_from_totals(device_id, events, idle_hours, harsh, km, config)
+
+    def profiles(self, hours: int, config: FuelConfig) -> List[DeviceProfile]:
+        """Perfis de todos os devices com dados na janela"""
+        now = datetime.now(timezone.utc).timestamp()
+        result = []
+        for device_id in sorted(self.devices):
+            profile = self.profile(device_id, hours, config, now)
+            if profile is not None:
+                result.append(profile)
+        return result
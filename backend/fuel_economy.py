@@ -5,8 +5,11 @@ Integrado ao MonitoraEngine
 
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
+import hashlib
+import json
 import math
-from models import FuelConfig, WasteBreakdown, DriverScore, CriticalAlert
+from config import settings
+from models import FuelConfig, WasteBreakdown, DriverScore, CriticalAlert, DeviceProfile
 
 
 # ==================== CONSTANTES ====================
@@ -15,6 +18,19 @@ IDLE_SPEED_THRESHOLD = 5.0          # km/h
 HARSH_ACCEL_THRESHOLD = 2.0         # km/h por segundo
 HARSH_EVENT_FUEL_ML = 50            # mL por evento
 
+# Config ativa da frota (FUEL_* no .env)
+DEFAULT_FUEL_CONFIG = FuelConfig(
+    fuel_price=settings.fuel_price,
+    expected_kml=settings.fuel_expected_kml,
+    idle_consumption_lh=settings.fuel_idle_consumption_lh
+)
+
+
+def config_hash(config: FuelConfig) -> str:
+    """Identificador curto do config (gravado junto de cada resumo diário)"""
+    data = json.dumps(config.model_dump(), sort_keys=True).encode()
+    return hashlib.sha1(data).hexdigest()[:12]
+
 
 # ==================== FUNÇÕES DE CÁLCULO ====================
 
@@ -86,7 +102,11 @@ def calculate_idle_waste(events: List[dict], config: FuelConfig) -> dict:
                 duration_seconds = (ts2 - ts1).total_seconds()
                 idle_time_hours += duration_seconds / 3600
     
-    # Custo
+    return idle_waste_from_hours(idle_time_hours, config)
+
+
+def idle_waste_from_hours(idle_time_hours: float, config: FuelConfig) -> dict:
+    """Custo da marcha lenta a partir das horas acumuladas"""
     idle_cost = idle_time_hours * config.idle_consumption_lh * config.fuel_price
     
     return {
@@ -129,6 +149,11 @@ def calculate_aggressive_driving_waste(events: List[dict], config: FuelConfig) -
                 if accel > HARSH_ACCEL_THRESHOLD:
                     harsh_events += 1
     
+    return aggressive_waste_from_events(harsh_events, config)
+
+
+def aggressive_waste_from_events(harsh_events: int, config: FuelConfig) -> dict:
+    """Custo da direção agressiva a partir do número de eventos"""
     # Custo (50ml por evento)
     extra_fuel_liters = (harsh_events * HARSH_EVENT_FUEL_ML) / 1000
     aggressive_cost = extra_fuel_liters * config.fuel_price
@@ -151,7 +176,18 @@ def calculate_route_waste(
     if not optimal_km:
         return {'extra_km': 0, 'cost': 0, 'percentage': 0}
     
-    actual_km = calculate_total_distance(events)
+    return route_waste_from_distance(calculate_total_distance(events), config, optimal_km)
+
+
+def route_waste_from_distance(
+    actual_km: float,
+    config: FuelConfig,
+    optimal_km: Optional[float] = None
+) -> dict:
+    """Custo de rota a partir da distância percorrida"""
+    if not optimal_km:
+        return {'extra_km': 0, 'cost': 0, 'percentage': 0}
+    
     extra_km = max(0, actual_km - optimal_km)
     
     route_cost = (extra_km / config.expected_kml) * config.fuel_price
@@ -175,6 +211,11 @@ def calculate_waste_breakdown(
     aggressive = calculate_aggressive_driving_waste(events, config)
     route = calculate_route_waste(events, config, optimal_route_km)
     
+    return build_waste_breakdown(idle, aggressive, route)
+
+
+def build_waste_breakdown(idle: dict, aggressive: dict, route: dict) -> WasteBreakdown:
+    """Monta o WasteBreakdown a partir dos resultados parciais"""
     total_waste = idle['cost'] + aggressive['cost'] + route['cost']
     
     # Calcular percentuais
@@ -218,9 +259,20 @@ def calculate_driver_score(
     # Cálculos
     idle_data = calculate_idle_waste(events, config)
     aggressive_data = calculate_aggressive_driving_waste(events, config)
+    total_km = calculate_total_distance(events)
     
+    return build_driver_score(device_id, idle_data, aggressive_data, total_km, config)
+
+
+def build_driver_score(
+    device_id: str,
+    idle_data: dict,
+    aggressive_data: dict,
+    total_km: float,
+    config: FuelConfig
+) -> DriverScore:
+    """Monta o DriverScore a partir dos resultados parciais"""
     # Distância e consumo
-    total_km = calculate_total_distance(events)
     estimated_fuel = (idle_data['hours'] * config.idle_consumption_lh +
                       (aggressive_data['events'] * HARSH_EVENT_FUEL_ML / 1000))
     
@@ -247,15 +299,112 @@ def calculate_driver_score(
     )
 
 
-def generate_critical_alerts(
+def _parse_ts(ts):
+    if isinstance(ts, str):
+        return datetime.fromisoformat(ts.replace('Z', '+00:00'))
+    return ts
+
+
+def analyze_device(
+    device_id: str,
+    events: List[dict],
+    config: FuelConfig,
+    optimal_route_km: Optional[float] = None
+) -> DeviceProfile:
+    """
+    Perfil completo do device numa única passada pelos eventos
+    Mesmos critérios (e mesma ordem de soma) das funções calculate_*
+    """
+    idle_time_hours = 0.0
+    harsh_events = 0
+    total_km = 0
+    
+    prev = None
+    prev_ts = None
+    prev_speed = 0
+    for event in events:
+        ts = event.get('ts')
+        if ts:
+            ts = _parse_ts(ts)
+        speed = event.get('speed_kmh', 0) or 0
+        
+        if prev is not None:
+            if prev_ts and ts:
+                duration_seconds = (ts - prev_ts).total_seconds()
+                
+                # Marcha lenta
+                if prev_speed < IDLE_SPEED_THRESHOLD:
+                    idle_time_hours += duration_seconds / 3600
+                
+                # Aceleração/frenagem brusca
+                if duration_seconds > 0:
+                    accel = abs(speed - prev_speed) / duration_seconds
+                    if accel > HARSH_ACCEL_THRESHOLD:
+                        harsh_events += 1
+            
+            # Distância GPS
+            lat1 = prev.get('lat')
+            lon1 = prev.get('lon')
+            lat2 = event.get('lat')
+            lon2 = event.get('lon')
+            if all([lat1, lon1, lat2, lon2]):
+                total_km += haversine_distance(lat1, lon1, lat2, lon2)
+        
+        prev = event
+        prev_ts = ts
+        prev_speed = speed
+    
+    return profile_from_totals(
+        device_id, len(events), idle_time_hours, harsh_events, total_km,
+        config, optimal_route_km
+    )
+
+
+def profile_from_totals(
     device_id: str,
-    waste_breakdown: WasteBreakdown,
-    driver_score: DriverScore
-) -> List[CriticalAlert]:
+    event_count: int,
+    idle_time_hours: float,
+    harsh_events: int,
+    total_km: float,
+    config: FuelConfig,
+    optimal_route_km: Optional[float] = None
+) -> DeviceProfile:
+    """Monta o DeviceProfile a partir dos totais acumulados"""
+    idle = idle_waste_from_hours(idle_time_hours, config)
+    aggressive = aggressive_waste_from_events(harsh_events, config)
+    route = route_waste_from_distance(total_km, config, optimal_route_km)
+    
+    if event_count:
+        score = build_driver_score(device_id, dict(idle), dict(aggressive), total_km, config)
+    else:
+        score = DriverScore(
+            driver_id=device_id,
+            score=0,
+            avg_consumption=0,
+            harsh_events=0,
+            idle_hours=0,
+            estimated_waste=0
+        )
+    
+    return DeviceProfile(
+        device_id=device_id,
+        events=event_count,
+        idle_hours=idle_time_hours,
+        harsh_events=harsh_events,
+        distance_km=total_km,
+        waste=build_waste_breakdown(idle, aggressive, route),
+        score=score
+    )
+
+
+def generate_critical_alerts(profile: DeviceProfile) -> List[CriticalAlert]:
     """
-    Gera alertas críticos baseado em desperdício
+    Gera alertas críticos baseado no perfil do device
     """
     alerts = []
+    device_id = profile.device_id
+    waste_breakdown = profile.waste
+    driver_score = profile.score
     
     # Alerta marcha lenta
     if waste_breakdown.idle_hours > 3:  # Mais de 3h parado
@@ -0,0 +1,231 @@
+"""
+MÓDULO: Kernels vetorizados (NumPy) de Economia de Combustível
+Mesmos resultados de fuel_economy.py sobre arrays colunares
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import List, Optional
+
+import numpy as np
+
+from fuel_economy import (
+    IDLE_SPEED_THRESHOLD,
+    HARSH_ACCEL_THRESHOLD,
+    idle_waste_from_hours,
+    aggressive_waste_from_events,
+    route_waste_from_distance,
+    build_waste_breakdown,
+    build_driver_score,
+    profile_from_totals,
+)
+from models import FuelConfig, WasteBreakdown, DriverScore, DeviceProfile
+
+
+# ==================== CONSTANTES ====================
+
+TS_MISSING = np.iinfo(np.int64).min     # Timestamp ausente
+EARTH_RADIUS_KM = 6371
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+# ==================== ESTRUTURA COLUNAR ====================
+
+@dataclass
+class TelemetryColumns:
+    """Eventos de um device em colunas (ordem original preservada)"""
+    ts_us: np.ndarray                   # int64, microssegundos desde epoch (UTC)
+    lat: np.ndarray                     # float64, NaN = ausente
+    lon: np.ndarray                     # float64, NaN = ausente
+    speed: np.ndarray                   # float64, NaN = ausente
+
+    def __len__(self) -> int:
+        return len(self.ts_us)
+
+
+def _to_epoch_us(ts) -> int:
+    """Converte datetime/ISO string em microssegundos desde epoch"""
+    if not ts:
+        return TS_MISSING
+    if isinstance(ts, str):
+        ts = datetime.fromisoformat(ts.replace('Z', '+00:00'))
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    delta = ts - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def columns_from_arrays(ts_us, lat, lon, speed) -> TelemetryColumns:
+    """Monta colunas a partir de sequências (None vira NaN)"""
+    return TelemetryColumns(
+        ts_us=np.asarray(ts_us, dtype=np.int64),
+        lat=np.array(lat, dtype=np.float64),
+        lon=np.array(lon, dtype=np.float64),
+        speed=np.array(speed, dtype=np.float64),
+    )
+
+
+def columns_from_events(events: List[dict]) -> TelemetryColumns:
+    """Converte lista de eventos (dicts) em colunas"""
+    n = len(events)
+    nan = float('nan')
+    return TelemetryColumns(
+        ts_us=np.fromiter((_to_epoch_us(e.get('ts')) for e in events), dtype=np.int64, count=n),
+        lat=np.fromiter((nan if e.get('lat') is None else e['lat'] for e in events), dtype=np.float64, count=n),
+        lon=np.fromiter((nan if e.get('lon') is None else e['lon'] for e in events), dtype=np.float64, count=n),
+        speed=np.fromiter((nan if e.get('speed_kmh') is None else e['speed_kmh'] for e in events), dtype=np.float64, count=n),
+    )
+
+
+# ==================== KERNELS ====================
+# Somas usam np.cumsum (acumulação sequencial) para reproduzir bit a bit
+# a ordem de soma dos loops Python em fuel_economy.py
+
+def _sequential_sum(values: np.ndarray) -> float:
+    if len(values) == 0:
+        return 0.0
+    return float(np.cumsum(values)[-1])
+
+
+def _pair_durations(cols: TelemetryColumns):
+    """Duração (s) entre eventos consecutivos e máscara de pares válidos"""
+    ts = cols.ts_us
+    valid = (ts[:-1] != TS_MISSING) & (ts[1:] != TS_MISSING)
+    dt = np.where(valid, ts[1:] - ts[:-1], 0).astype(np.float64) / 1e6
+    return dt, valid
+
+
+def _speeds(cols: TelemetryColumns) -> np.ndarray:
+    # Mesmo critério de `speed or 0`
+    return np.nan_to_num(cols.speed, nan=0.0)
+
+
+def idle_hours_columns(cols: TelemetryColumns) -> float:
+    """Horas em marcha lenta (velocidade < limiar até o próximo evento)"""
+    if len(cols) < 2:
+        return 0.0
+    dt, valid = _pair_durations(cols)
+    mask = valid & (_speeds(cols)[:-1] < IDLE_SPEED_THRESHOLD)
+    return _sequential_sum(dt[mask] / 3600)
+
+
+def harsh_events_columns(cols: TelemetryColumns) -> int:
+    """Número de acelerações/frenagens bruscas"""
+    if len(cols) < 2:
+        return 0
+    dt, valid = _pair_durations(cols)
+    mask = valid & (dt > 0)
+    speed = _speeds(cols)
+    accel = np.abs(speed[1:][mask] - speed[:-1][mask]) / dt[mask]
+    return int(np.count_nonzero(accel > HARSH_ACCEL_THRESHOLD))
+
+
+def haversine_columns(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Haversine vetorizado (km)"""
+    lat1_rad = np.radians(lat1)
+    lat2_rad = np.radians(lat2)
+    delta_lat = np.radians(lat2 - lat1)
+    delta_lon = np.radians(lon2 - lon1)
+
+    a = (np.sin(delta_lat / 2) ** 2 +
+         np.cos(lat1_rad) * np.cos(lat2_rad) *
+         np.sin(delta_lon / 2) ** 2)
+
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    return EARTH_RADIUS_KM * c
+
+
+def total_distance_columns(cols: TelemetryColumns) -> float:
+    """Distância total (km) entre pontos GPS consecutivos"""
+    if len(cols) < 2:
+        return 0.0
+    # Mesmo critério de `all([lat1, lon1, lat2, lon2])`: ausente ou zero não conta
+    present = ~np.isnan(cols.lat) & ~np.isnan(cols.lon) & (cols.lat != 0) & (cols.lon != 0)
+    mask = present[:-1] & present[1:]
+    segments = haversine_columns(
+        cols.lat[:-1][mask], cols.lon[:-1][mask],
+        cols.lat[1:][mask], cols.lon[1:][mask]
+    )
+    return _sequential_sum(segments)
+
+
+def pair_contributions(cols: TelemetryColumns):
+    """
+    Contribuição de cada par consecutivo (i, i+1), atribuída ao evento i:
+    segundos de marcha lenta, evento brusco (bool) e km
+    """
+    if len(cols) < 2:
+        return np.zeros(0), np.zeros(0, dtype=bool), np.zeros(0)
+    dt, valid = _pair_durations(cols)
+    speed = _speeds(cols)
+
+    idle_s = np.where(valid & (speed[:-1] < IDLE_SPEED_THRESHOLD), dt, 0.0)
+    moving = valid & (dt > 0)
+    accel = np.abs(np.diff(speed)) / np.where(moving, dt, 1.0)
+    harsh = moving & (accel > HARSH_ACCEL_THRESHOLD)
+
+    present = ~np.isnan(cols.lat) & ~np.isnan(cols.lon) & (cols.lat != 0) & (cols.lon != 0)
+    mask = present[:-1] & present[1:]
+    km = np.zeros(len(cols) - 1)
+    km[mask] = haversine_columns(
+        cols.lat[:-1][mask], cols.lon[:-1][mask],
+        cols.lat[1:][mask], cols.lon[1:][mask]
+    )
+    return idle_s, harsh, km
+
+
+# ==================== EQUIVALENTES DE fuel_economy ====================
+
+def analyze_device_columns(
+    device_id: str,
+    cols: TelemetryColumns,
+    config: FuelConfig,
+    optimal_route_km: Optional[float] = None
+) -> DeviceProfile:
+    """Equivalente colunar de analyze_device"""
+    return profile_from_totals(
+        device_id,
+        len(cols),
+        idle_hours_columns(cols),
+        harsh_events_columns(cols),
+        total_distance_columns(cols),
+        config,
+        optimal_route_km
+    )
+
+
+def calculate_waste_breakdown_columns(
+    cols: TelemetryColumns,
+    config: FuelConfig,
+    optimal_route_km: Optional[float] = None
+) -> WasteBreakdown:
+    """Equivalente colunar de calculate_waste_breakdown"""
+    idle = idle_waste_from_hours(idle_hours_columns(cols), config)
+    aggressive = aggressive_waste_from_events(harsh_events_columns(cols), config)
+    if optimal_route_km:
+        route = route_waste_from_distance(total_distance_columns(cols), config, optimal_route_km)
+    else:
+        route = route_waste_from_distance(0, config, None)
+    return build_waste_breakdown(idle, aggressive, route)
+
+
+def calculate_driver_score_columns(
+    device_id: str,
+    cols: TelemetryColumns,
+    config: FuelConfig
+) -> DriverScore:
+    """Equivalente colunar de calculate_driver_score"""
+    if len(cols) == 0:
+        return DriverScore(
+            driver_id=device_id,
+            score=0,
+            avg_consumption=0,
+            harsh_events=0,
+            idle_hours=0,
+            estimated_waste=0
+        )
+
+    idle_data = idle_waste_from_hours(idle_hours_columns(cols), config)
+    aggressive_data = aggressive_waste_from_events(harsh_events_columns(cols), config)
+    total_km = total_distance_columns(cols)
+    return build_driver_score(device_id, idle_data, aggressive_data, total_km, config)
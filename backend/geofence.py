@@ -0,0 +1,195 @@
+"""
+MÓDULO: Motor de Geofences
+Índice R-tree (STR-packed) em memória e detecção de entrada/saída por evento
+"""
+
+import math
+from typing import Dict, List, Optional, Set, Tuple
+
+from models import Geofence, TelemetryEvent
+
+
+# ==================== CONSTANTES ====================
+
+NODE_CAPACITY = 16                  # Entradas por nó da R-tree
+
+
+# ==================== GEOMETRIA ====================
+
+def polygon_bbox(polygon: List[Tuple[float, float]]) -> Tuple[float, float, float, float]:
+    """Retorna (min_lat, min_lon, max_lat, max_lon) do polígono"""
+    lats = [p[0] for p in polygon]
+    lons = [p[1] for p in polygon]
+    return min(lats), min(lons), max(lats), max(lons)
+
+
+def point_in_polygon(lat: float, lon: float, polygon: List[Tuple[float, float]]) -> bool:
+    """
+    Ray casting (lon = x, lat = y)
+    Polígono sem repetir o primeiro ponto no fim
+    """
+    inside = False
+    n = len(polygon)
+    j = n - 1
+    for i in range(n):
+        yi, xi = polygon[i]
+        yj, xj = polygon[j]
+        if (yi > lat) != (yj > lat):
+            x_cross = xi + (lat - yi) * (xj - xi) / (yj - yi)
+            if lon < x_cross:
+                inside = not inside
+        j = i
+    return inside
+
+
+# ==================== R-TREE (STR) ====================
+
+class _Node:
+    """Nó da R-tree: caixas dos filhos em listas paralelas"""
+    __slots__ = ("min_lat", "min_lon", "max_lat", "max_lon", "children", "leaf")
+
+    def __init__(self, boxes: list, children: list, leaf: bool):
+        self.min_lat = [b[0] for b in boxes]
+        self.min_lon = [b[1] for b in boxes]
+        self.max_lat = [b[2] for b in boxes]
+        self.max_lon = [b[3] for b in boxes]
+        self.children = children
+        self.leaf = leaf
+
+    def bbox(self) -> Tuple[float, float, float, float]:
+        return (min(self.min_lat), min(self.min_lon),
+                max(self.max_lat), max(self.max_lon))
+
+
+def _str_pack(items: list, capacity: int) -> List[list]:
+    """
+    Sort-Tile-Recursive: agrupa (bbox, payload) em grupos de `capacity`
+    ordenando por centro em lon (fatias verticais) e depois lat
+    """
+    n = len(items)
+    leaf_count = math.ceil(n / capacity)
+    slices = max(1, math.ceil(math.sqrt(leaf_count)))
+    per_slice = slices * capacity
+
+    items = sorted(items, key=lambda it: it[0][1] + it[0][3])
+    groups = []
+    for s in range(0, n, per_slice):
+        vertical = sorted(items[s:s + per_slice], key=lambda it: it[0][0] + it[0][2])
+        for g in range(0, len(vertical), capacity):
+            groups.append(vertical[g:g + capacity])
+    return groups
+
+
+class RTree:
+    """R-tree estática construída em bloco (STR), consulta por ponto"""
+
+    def __init__(self, entries: List[Tuple[Tuple[float, float, float, float], int]],
+                 capacity: int = NODE_CAPACITY):
+        self.size = len(entries)
+        self.root: Optional[_Node] = None
+        if not entries:
+            return
+
+        level = [
+            _Node([b for b, _ in group], [p for _, p in group], leaf=True)
+            for group in _str_pack(list(entries), capacity)
+        ]
+        while len(level) > 1:
+            items = [(node.bbox(), node) for node in level]
+            level = [
+                _Node([b for b, _ in group], [p for _, p in group], leaf=False)
+                for group in _str_pack(items, capacity)
+            ]
+        self.root = level[0]
+
+    def query_point(self, lat: float, lon: float) -> List[int]:
+        """Payloads cujas caixas contêm o ponto"""
+        if self.root is None:
+            return []
+
+        result = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            min_lat, min_lon = node.min_lat, node.min_lon
+            max_lat, max_lon = node.max_lat, node.max_lon
+            for i in range(len(node.children)):
+                if (min_lat[i] <= lat <= max_lat[i]
+                        and min_lon[i] <= lon <= max_lon[i]):
+                    if node.leaf:
+                        result.append(node.children[i])
+                    else:
+                        stack.append(node.children[i])
+        return result
+
+
+# ==================== MOTOR ====================
+
+class GeofenceEngine:
+    """
+    Avalia cada evento contra os polígonos candidatos da R-tree
+    e mantém o conjunto de geofences em que cada device está
+    """
+
+    def __init__(self, fences: Optional[List[Geofence]] = None):
+        self.fences: Dict[int, Geofence] = {}
+        self.inside: Dict[str, Set[int]] = {}
+        self.index = RTree([])
+        if fences:
+            self.load(fences)
+
+    def load(self, fences: List[Geofence]):
+        """Substitui todas as geofences e reconstrói o índice"""
+        self.fences = {f.id: f for f in fences}
+        self._rebuild()
+        # Descarta estado de geofences que deixaram de existir
+        for device_fences in self.inside.values():
+            device_fences.intersection_update(self.fences.keys())
+
+    def add(self, fence: Geofence):
+        """Adiciona (ou substitui) uma geofence"""
+        self.fences[fence.id] = fence
+        self._rebuild()
+
+    def _rebuild(self):
+        self.index = RTree([(polygon_bbox(f.polygon), f.id) for f in self.fences.values()])
+
+    def containing(self, lat: float, lon: float) -> Set[int]:
+        """Geofences que contêm o ponto"""
+        return {
+            fence_id for fence_id in self.index.query_point(lat, lon)
+            if point_in_polygon(lat, lon, self.fences[fence_id].polygon)
+        }
+
+    def process(self, event: TelemetryEvent) -> List[dict]:
+        """Retorna as transições (enter/exit) causadas pelo evento"""
+        if event.lat is None or event.lon is None:
+            return []
+
+        current = self.containing(event.lat, event.lon)
+        previous = self.inside.get(event.device_id)
+        if previous is None:
+            previous = set()
+        if current == previous:
+            return []
+
+        self.inside[event.device_id] = current
+        transitions = []
+        for fence_id, transition in (
+            [(fid, "enter") for fid in current - previous] +
+            [(fid, "exit") for fid in previous - current]
+        ):
+            fence = self.fences.get(fence_id)
+            if fence is None:
+                continue
+            transitions.append({
+                "device_id": event.device_id,
+                "geofence_id": fence_id,
+                "geofence_name": fence.name,
+                "kind": fence.kind,
+                "transition": transition,
+                "ts": event.ts,
+                "lat": event.lat,
+                "lon": event.lon
+            })
+        return transitions
@@ -0,0 +1,111 @@
+"""
+MÓDULO: Ranking de motoristas incremental
+Lista ordenada mantida a partir dos acumuladores; só devices alterados
+são recalculados
+"""
+
+from bisect import bisect_left, insort
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from fuel_accumulators import FuelTracker
+from models import DriverScore, FuelConfig
+
+
+class Leaderboard:
+    """
+    Scores ordenados por (-score, device_id)
+
+    Top-K, faixas de posições e a posição de um device custam uma busca
+    binária; atualizar um device custa remover e reinserir sua chave
+    """
+
+    def __init__(self):
+        self.keys: List[Tuple[int, str]] = []
+        self.scores: Dict[str, DriverScore] = {}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def update(self, device_id: str, score: Optional[DriverScore]):
+        """Insere, substitui ou (score None) remove o device"""
+        old = self.scores.pop(device_id, None)
+        if old is not None:
+            del self.keys[bisect_left(self.keys, (-old.score, device_id))]
+        if score is not None:
+            self.scores[device_id] = score
+            insort(self.keys, (-score.score, device_id))
+
+    def rank(self, device_id: str) -> Optional[int]:
+        """Posição (1 = melhor) ou None se o device não está no ranking"""
+        score = self.scores.get(device_id)
+        if score is None:
+            return None
+        return bisect_left(self.keys, (-score.score, device_id)) + 1
+
+    def page(self, offset: int = 0, limit: Optional[int] = None) -> List[DriverScore]:
+        """Scores das posições offset+1 .. offset+limit, com rank preenchido"""
+        end = None if limit is None else offset + limit
+        return [
+            self.scores[device_id].model_copy(update={"rank": offset + i + 1})
+            for i, (_, device_id) in enumerate(self.keys[offset:end])
+        ]
+
+
+class DriverLeaderboard:
+    """
+    Ranking de uma janela (N horas) alimentado pelo FuelTracker
+
+    O tracker avisa quais devices receberam eventos; esses são recalculados
+    na próxima leitura. Na virada da hora um balde sai da janela e todos
+    os devices são recalculados uma vez.
+    """
+
+    def __init__(self, tracker: FuelTracker, hours: int, config: FuelConfig):
+        self.tracker = tracker
+        self.hours = hours
+        self.config = config
+        self.board = Leaderboard()
+        self.dirty = tracker.watch()
+        self.hour: Optional[int] = None
+
+    def refresh(self, now: Optional[float] = None) -> int:
+        """Recalcula os devices pendentes; retorna quantos foram recalculados"""
+        now = now if now is not None else datetime.now(timezone.utc).timestamp()
+        hour = int(now // 3600)
+        if hour != self.hour:
+            self.hour = hour
+            self.dirty.update(self.tracker.devices)
+
+        count = len(self.dirty)
+        for device_id in self.dirty:
+            profile = self.tracker.profile(device_id, self.hours, self.config, now)
+            self.board.update(device_id, profile.score if profile else None)
+        self.dirty.clear()
+        return count
+
+    def close(self):
+        self.tracker.unwatch(self.dirty)
+
+
+class LeaderboardCache:
+    """Rankings por janela, criados sob demanda (no máximo max_windows)"""
+
+    def __init__(self, tracker: FuelTracker, config: FuelConfig, max_windows: int = 8):
+        self.tracker = tracker
+        self.config = config
+        self.max_windows = max_windows
+        self.windows: Dict[int, DriverLeaderboard] = {}
+
+    def get(self, hours: int) -> Leaderboard:
+        """Ranking atualizado da janela"""
+        board = self.windows.pop(hours, None)
+        if board is None:
+            board = DriverLeaderboard(self.tracker, hours, self.config)
+            if len(self.windows) >= self.max_windows:
+                oldest = next(iter(self.windows))
+                self.windows.pop(oldest).close()
+        # Reinsere no fim: ordem do dict = menos recentemente usado primeiro
+        self.windows[hours] = board
+        board.refresh()
+        return board.board
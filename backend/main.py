@@ -1,6 +1,8 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+import asyncio
 import logging
 from typing import List, Optional
 
@@ -8,21 +10,25 @@ from config import settings
 from database import db
 from models import (
     TelemetryEvent, DeviceStatus, MetricsSummary,
-    FuelConfig, WasteBreakdown, DriverScore, FuelEconomyDashboard
+    FuelConfig, WasteBreakdown, DriverScore, FuelEconomyDashboard, AlertRule,
+    Geofence, DeviceProfile
 )
 from fuel_economy import (
-    calculate_waste_breakdown,
-    calculate_driver_score,
+    DEFAULT_FUEL_CONFIG,
+    profile_from_totals,
     calculate_roi
 )
-from models import FuelConfig
-
-# Config padrão
-DEFAULT_FUEL_CONFIG = FuelConfig(
-    fuel_price=5.80,
-    expected_kml=8.5,
-    idle_consumption_lh=0.8
-)
+from fuel_kernels import analyze_device_columns
+from alert_engine import AlertEngine, load_rules
+from geofence import GeofenceEngine
+from fuel_accumulators import FuelTracker
+from leaderboard import Leaderboard, LeaderboardCache
+from daily_summary import DailySummarizer, previous_period
+from trips import TripSegmenter, TRIP, STOP
+from trajectory import simplify_track, track_points
+from analytics_executor import AnalyticsExecutor, AnalyticsTimeout, LoopLagMonitor
+from shared_state import SharedState, open_shared_state
+from traffic_trace import open_trace_writer
 
 # Logging
 logging.basicConfig(
@@ -31,20 +37,89 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Motor de alertas (avaliado na ingestão)
+alert_engine = AlertEngine(load_rules(settings.alert_rules_file))
+
+# Geofences (R-tree em memória, carregada no startup)
+geofence_engine = GeofenceEngine()
+
+# Acumuladores de combustível por hora (atualizados na ingestão)
+fuel_tracker = FuelTracker(settings.fuel_tracker_retention_hours)
+FUEL_SOURCES = ("live", "raw", "sql")
+leaderboards = LeaderboardCache(fuel_tracker, DEFAULT_FUEL_CONFIG)
+
+# Viagens e paradas (segmentadas na ingestão, gravadas ao fechar)
+trip_segmenter = TripSegmenter(
+    settings.trip_stop_dwell_s, settings.trip_start_dwell_s, settings.trip_max_gap_s
+)
+
+# Último estado e contadores compartilhados entre workers (aberto no startup)
+shared_state: Optional[SharedState] = None
+
+# Captura do tráfego de /ingest para replay (vazio = desligado)
+trace_writer = open_trace_writer(settings.trace_capture_path)
+
+# Análises CPU-bound fora do event loop + medição do atraso do loop
+analytics = AnalyticsExecutor(
+    settings.analytics_executor, settings.analytics_workers, settings.analytics_timeout_s
+)
+loop_lag = LoopLagMonitor()
+
+# Resumos diários persistidos (recalcula só os dias afetados)
+daily_summarizer = DailySummarizer(
+    db, DEFAULT_FUEL_CONFIG, settings.daily_summary_interval_s, analytics
+)
+
+
+async def warm_up_fuel_tracker():
+    """Carrega o histórico recente do banco nos acumuladores"""
+    end_date = datetime.now(timezone.utc)
+    try:
+        await db.flush_buffer()
+        start_date = end_date - timedelta(hours=settings.fuel_tracker_warmup_hours)
+        async for device_id, cols in db.iter_fleet_columns(start_date, end_date):
+            await asyncio.to_thread(fuel_tracker.load_history, device_id, cols)
+        fuel_tracker.finish_warmup(start_date)
+    except Exception as e:
+        logger.error(f"Fuel tracker warm-up error: {e}")
+        fuel_tracker.finish_warmup(end_date)
+
 # Lifespan para startup/shutdown
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
+    global shared_state
     logger.info("Starting MonitoraEngine Backend...")
+    shared_state = open_shared_state(settings.shared_state_name, settings.shared_state_slots)
+    analytics.start()
+    loop_lag.start()
+    if trace_writer:
+        trace_writer.start()
     await db.connect()
     await db.start_flush_task()
+    if shared_state:
+        # Devices sem eventos desde a criação do segmento também aparecem em /devices
+        shared_state.seed(await db.get_devices())
+    geofence_engine.load(await db.get_geofences())
+    logger.info(f"Loaded {len(geofence_engine.fences)} geofences")
+    fuel_tracker.begin_warmup()
+    warmup_task = asyncio.create_task(warm_up_fuel_tracker())
+    daily_summarizer.start()
     logger.info("Backend ready!")
     
     yield
     
     # Shutdown
     logger.info("Shutting down...")
+    warmup_task.cancel()
+    await daily_summarizer.stop()
     await db.disconnect()
+    if trace_writer:
+        await trace_writer.stop()
+    loop_lag.stop()
+    analytics.shutdown()
+    if shared_state:
+        shared_state.close()
     logger.info("Backend stopped.")
 
 # App
@@ -80,7 +155,24 @@ async def health_check():
 async def ingest_telemetry(event: TelemetryEvent):
     """Recebe evento de telemetria"""
     try:
+        if trace_writer:
+            trace_writer.record(event)
         await db.add_to_buffer(event)
+        if shared_state:
+            shared_state.update(event)
+        fired = alert_engine.process(event)
+        if fired:
+            await db.add_alerts(fired)
+            if shared_state:
+                shared_state.mark_alerts(fired)
+        transitions = geofence_engine.process(event)
+        if transitions:
+            await db.add_geofence_events(transitions)
+        closed = trip_segmenter.process(event)
+        if closed:
+            await db.add_trips(closed)
+        fuel_tracker.add_event(event)
+        daily_summarizer.mark(event)
         return {"status": "accepted"}
     except Exception as e:
         logger.error(f"Ingest error: {e}")
@@ -90,6 +182,10 @@ async def ingest_telemetry(event: TelemetryEvent):
 async def get_devices():
     """Lista devices com status online/offline"""
     try:
+        if shared_state:
+            # Igual em todos os workers, com eventos ainda no buffer e os
+            # devices do banco carregados na subida (seed)
+            return shared_state.statuses()
         devices = await db.get_devices()
         return devices
     except Exception as e:
@@ -124,16 +220,61 @@ async def get_device_events(
         logger.error(f"Get events error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/devices/{device_id}/track")
+async def get_device_track(
+    device_id: str,
+    hours: int = 24,
+    tolerance_m: Optional[float] = None
+):
+    """Trilha do device (simplificada, com distância exata por trecho)"""
+    tolerance = settings.track_tolerance_m if tolerance_m is None else tolerance_m
+    try:
+        end_date = datetime.now(timezone.utc)
+        cols = await db.get_device_columns(device_id, end_date - timedelta(hours=hours), end_date)
+        track = await run_analytics(analytics.run(simplify_track, cols, tolerance))
+        return {
+            "device_id": device_id,
+            "period_hours": hours,
+            "tolerance_m": tolerance,
+            "raw_points": track["raw_points"],
+            "distance_km": track["distance_km"],
+            "points": track_points(track)
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Get track error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/metrics/summary", response_model=MetricsSummary)
 async def get_metrics_summary(minutes: int = 5):
     """Métricas agregadas para dashboard"""
     try:
+        if shared_state and minutes * 60 < shared_state.horizon_s:
+            stats = shared_state.window_stats(minutes * 60)
+            avg_speed = stats["speed_sum"] / stats["speed_n"] if stats["speed_n"] else 0.0
+            return {
+                "devices_online": shared_state.count_online(30),
+                "events_last_minute": shared_state.window_stats(60)["events"],
+                "avg_speed_5min": round(avg_speed, 2),
+                "alerts_last_10min": shared_state.count_alert_devices(600)
+            }
         metrics = await db.get_metrics_summary(minutes)
         return metrics
     except Exception as e:
         logger.error(f"Get metrics error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/metrics/loop-lag")
+async def get_loop_lag():
+    """Atraso do event loop (trabalho síncrono bloqueando a ingestão)"""
+    return {
+        **loop_lag.snapshot(),
+        "executor": analytics.kind,
+        "workers": analytics.workers,
+        "timeout_s": analytics.timeout_s
+    }
+
 @app.get("/alerts")
 async def get_alerts(minutes: int = 10):
     """Alertas recentes"""
@@ -144,21 +285,110 @@ async def get_alerts(minutes: int = 10):
         logger.error(f"Get alerts error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/alerts/rules", response_model=List[AlertRule])
+async def get_alert_rules():
+    """Regras de alerta ativas"""
+    return alert_engine.rules
+
+@app.get("/geofences", response_model=List[Geofence])
+async def get_geofences():
+    """Geofences carregadas no índice"""
+    return list(geofence_engine.fences.values())
+
+@app.post("/geofences", response_model=Geofence)
+async def create_geofence(fence: Geofence):
+    """Cadastra geofence e atualiza o índice em memória"""
+    if len(fence.polygon) < 3:
+        raise HTTPException(status_code=422, detail="Polygon needs at least 3 points")
+    try:
+        created = await db.create_geofence(fence)
+        geofence_engine.add(created)
+        return created
+    except Exception as e:
+        logger.error(f"Create geofence error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/geofences/events")
+async def get_geofence_events(
+    minutes: int = 60,
+    device_id: Optional[str] = None,
+    limit: int = 500
+):
+    """Transições enter/exit recentes"""
+    try:
+        return await db.get_geofence_events(minutes, device_id, limit)
+    except Exception as e:
+        logger.error(f"Get geofence events error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/trips")
+async def get_trips(
+    device_id: Optional[str] = None,
+    kind: Optional[str] = None,
+    hours: int = 24,
+    min_distance_km: Optional[float] = None,
+    min_duration_s: Optional[float] = None,
+    limit: int = 100
+):
+    """Viagens/paradas fechadas que começaram nas últimas N horas"""
+    if kind is not None and kind not in (TRIP, STOP):
+        raise HTTPException(status_code=422, detail=f"kind must be one of: {TRIP}, {STOP}")
+    try:
+        end_date = datetime.now(timezone.utc)
+        return await db.get_trips(
+            device_id, kind, end_date - timedelta(hours=hours), None,
+            min_distance_km, min_duration_s, limit
+        )
+    except Exception as e:
+        logger.error(f"Get trips error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/devices/{device_id}/trips")
+async def get_device_trips(
+    device_id: str,
+    kind: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = 100,
+    include_open: bool = True
+):
+    """Viagens/paradas do device no intervalo (+ segmento em andamento)"""
+    if kind is not None and kind not in (TRIP, STOP):
+        raise HTTPException(status_code=422, detail=f"kind must be one of: {TRIP}, {STOP}")
+    try:
+        trips = await db.get_trips(device_id, kind, start, end, None, None, limit)
+        current = trip_segmenter.open_segments(device_id) if include_open and end is None else []
+        return {
+            "device_id": device_id,
+            "open": [t for t in current if kind in (None, t["kind"])],
+            "trips": trips
+        }
+    except Exception as e:
+        logger.error(f"Get device trips error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 
 # ==================== FUEL ECONOMY ENDPOINTS ====================
 
 @app.get("/fuel-analysis/calculate/{device_id}")
 async def calculate_fuel_waste(
     device_id: str,
-    hours: int = 24
+    hours: int = 24,
+    source: str = "live"
 ):
     """Calcula desperdício de combustível de um veículo"""
+    check_fuel_source(source)
     try:
-        # Buscar telemetria das últimas N horas
-        minutes = hours * 60
-        telemetry_data = await db.get_device_events(device_id, minutes, limit=10000)
+        if source == "live" and fuel_tracker.covers(hours):
+            # Soma dos baldes horários, sem tocar a telemetria bruta
+            profile = fuel_tracker.profile(device_id, hours, DEFAULT_FUEL_CONFIG)
+        elif source == "sql":
+            profiles = await sql_profiles(hours, device_id)
+            profile = profiles[0] if profiles else None
+        else:
+            profile = await run_analytics(analyze_device_window(device_id, hours))
         
-        if not telemetry_data:
+        if profile is None:
             return {
                 "device_id": device_id,
                 "period_hours": hours,
@@ -166,74 +396,128 @@ async def calculate_fuel_waste(
                 "waste_breakdown": None
             }
         
-        # Calcular desperdício
-        waste = calculate_waste_breakdown(telemetry_data, DEFAULT_FUEL_CONFIG)
-        
         return {
             "device_id": device_id,
             "period_hours": hours,
-            "waste_breakdown": waste,
+            "waste_breakdown": profile.waste,
             "config": DEFAULT_FUEL_CONFIG
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Calculate fuel waste error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def run_analytics(coro):
+    """Aguarda uma análise; 504 (e cancelamento) se exceder o timeout"""
+    try:
+        return await analytics.with_timeout(coro)
+    except AnalyticsTimeout as e:
+        logger.error(f"Analytics timeout: {e}")
+        raise HTTPException(status_code=504, detail=str(e))
+
+
+async def analyze_device_window(device_id: str, hours: int) -> Optional[DeviceProfile]:
+    """Telemetria das últimas N horas (colunas, ordem crescente) analisada no executor"""
+    end_date = datetime.now(timezone.utc)
+    cols = await db.get_device_columns(device_id, end_date - timedelta(hours=hours), end_date)
+    if not len(cols):
+        return None
+    return await analytics.run(analyze_device_columns, device_id, cols, DEFAULT_FUEL_CONFIG)
+
+
+def check_fuel_source(source: str):
+    """
+    Valida a origem dos dados de combustível
+    live = acumuladores, raw = eventos analisados em Python, sql = agregação no Postgres
+    """
+    if source not in FUEL_SOURCES:
+        raise HTTPException(
+            status_code=422,
+            detail=f"source must be one of: {', '.join(FUEL_SOURCES)}"
+        )
+
+
+async def fleet_profiles(hours: int, source: str) -> List[DeviceProfile]:
+    """Perfis da frota: acumuladores quando cobrem a janela, senão telemetria bruta"""
+    if source == "live" and fuel_tracker.covers(hours):
+        return fuel_tracker.profiles(hours, DEFAULT_FUEL_CONFIG)
+    if source == "sql":
+        return await sql_profiles(hours)
+    return await run_analytics(analyze_fleet(hours))
+
+
+async def sql_profiles(hours: int, device_id: Optional[str] = None) -> List[DeviceProfile]:
+    """Perfis a partir dos totais calculados no Postgres (uma linha por device)"""
+    end_date = datetime.now(timezone.utc)
+    start_date = end_date - timedelta(hours=hours)
+    rows = await db.get_fuel_aggregates(start_date, end_date, device_id)
+    return [
+        profile_from_totals(
+            row['device_id'], row['events'], row['idle_hours'],
+            row['harsh_events'], row['distance_km'], DEFAULT_FUEL_CONFIG
+        )
+        for row in rows
+    ]
+
+
+async def analyze_fleet(hours: int) -> List[DeviceProfile]:
+    """
+    Perfis de todos os devices com dados no período
+    Telemetria lida device a device (cursor) e analisada em paralelo no executor
+    """
+    end_date = datetime.now(timezone.utc)
+    start_date = end_date - timedelta(hours=hours)
+    return await analytics.map_devices(
+        analyze_device_columns,
+        db.iter_fleet_columns(start_date, end_date),
+        DEFAULT_FUEL_CONFIG
+    )
+
+
 @app.get("/fuel-analysis/dashboard")
 async def get_fuel_economy_dashboard(
     hours: int = 24,  # 24 horas padrão (era 30 dias)
-    system_cost: float = 70000.0
+    system_cost: float = 70000.0,
+    source: str = "live"
 ):
     """Dashboard completo de economia de combustível"""
+    check_fuel_source(source)
     try:
-        # Buscar todos os devices
-        devices = await db.get_devices()
-        
-        if not devices:
+        # Perfis de todos os devices
+        profiles = await fleet_profiles(hours, source)
+
+        # 404 só sem devices cadastrados; frota parada na janela = dashboard zerado
+        if not profiles and not await db.get_devices():
             raise HTTPException(status_code=404, detail="No devices found")
         
-        minutes = hours * 60
         total_waste_current = 0
         all_drivers = []
         critical_alerts_list = []
         
         # Processar cada device
-        for device in devices:
-            telemetry_data = await db.get_device_events(
-                device.device_id,
-                minutes,
-                limit=10000
-            )
+        for profile in profiles:
+            waste = profile.waste
+            total_waste_current += waste.total_waste
+            all_drivers.append(profile.score)
+            
+            # Alertas críticos (top 3 problemas)
+            if waste.idle_cost > 100:
+                critical_alerts_list.append({
+                    "device_id": profile.device_id,
+                    "type": "idle",
+                    "message": f"Marcha lenta {waste.idle_hours:.1f}h",
+                    "cost": waste.idle_cost
+                })
             
-            if telemetry_data:
-                waste = calculate_waste_breakdown(telemetry_data, DEFAULT_FUEL_CONFIG)
-                total_waste_current += waste.total_waste
-                
-                # Driver score
-                driver_score = calculate_driver_score(
-                    device.device_id,
-                    telemetry_data,
-                    DEFAULT_FUEL_CONFIG
-                )
-                all_drivers.append(driver_score)
-                
-                # Alertas críticos (top 3 problemas)
-                if waste.idle_cost > 100:
-                    critical_alerts_list.append({
-                        "device_id": device.device_id,
-                        "type": "idle",
-                        "message": f"Marcha lenta {waste.idle_hours:.1f}h",
-                        "cost": waste.idle_cost
-                    })
-                
-                if waste.aggressive_events > 20:
-                    critical_alerts_list.append({
-                        "device_id": device.device_id,
-                        "type": "aggressive",
-                        "message": f"Direção agressiva {waste.aggressive_events}× eventos",
-                        "cost": waste.aggressive_cost
-                    })
+            if waste.aggressive_events > 20:
+                critical_alerts_list.append({
+                    "device_id": profile.device_id,
+                    "type": "aggressive",
+                    "message": f"Direção agressiva {waste.aggressive_events}× eventos",
+                    "cost": waste.aggressive_cost
+                })
         
         # Ordenar drivers por score
         all_drivers.sort(key=lambda x: x.score, reverse=True)
@@ -247,10 +531,19 @@ async def get_fuel_economy_dashboard(
         critical_alerts_list.sort(key=lambda x: x['cost'], reverse=True)
         critical_alerts = critical_alerts_list[:3]
         
-        # Simular mês anterior (10% pior)
-        previous_month_cost = total_waste_current * 1.10
-        savings = previous_month_cost - total_waste_current
-        savings_percent = (savings / previous_month_cost * 100) if previous_month_cost > 0 else 0
+        # Período anterior de mesmo tamanho (em dias) dos resumos diários
+        previous = await db.get_daily_summary_totals(
+            *previous_period(datetime.now(timezone.utc), hours)
+        )
+        previous_month_cost = float(previous['estimated_waste'])
+        if previous['configs'] > 1:
+            logger.warning("Daily summaries mix fuel configs; run recompute.py with the active FUEL_* values")
+        if previous_month_cost > 0:
+            savings = previous_month_cost - total_waste_current
+            savings_percent = savings / previous_month_cost * 100
+        else:
+            savings = 0
+            savings_percent = 0
         
         # Calcular ROI
         monthly_savings = savings
@@ -289,45 +582,56 @@ async def get_fuel_economy_dashboard(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/fuel-analysis/driver-ranking")
-async def get_driver_ranking(hours: int = 720):
-    """Ranking de motoristas por economia"""
+async def driver_leaderboard(hours: int, source: str) -> Leaderboard:
+    """Ranking incremental quando os acumuladores cobrem a janela, senão montado na hora"""
+    if source == "live" and fuel_tracker.covers(hours):
+        return leaderboards.get(hours)
+    board = Leaderboard()
+    for profile in await fleet_profiles(hours, source):
+        board.update(profile.device_id, profile.score)
+    return board
+
+
+@app.get("/fuel-analysis/driver-ranking", response_model=List[DriverScore])
+async def get_driver_ranking(
+    response: Response,
+    hours: int = 720,
+    source: str = "live",
+    offset: int = 0,
+    limit: int = 100
+):
+    """Ranking de motoristas por economia (paginado; total em X-Total-Count)"""
+    check_fuel_source(source)
+    if offset < 0 or limit < 1:
+        raise HTTPException(status_code=422, detail="offset must be >= 0 and limit >= 1")
     try:
-        devices = await db.get_devices()
-        
-        if not devices:
-            return []
-        
-        minutes = hours * 60
-        drivers = []
-        
-        for device in devices:
-            telemetry_data = await db.get_device_events(
-                device.device_id,
-                minutes,
-                limit=10000
-            )
-            
-            if telemetry_data:
-                driver_score = calculate_driver_score(
-                    device.device_id,
-                    telemetry_data,
-                    DEFAULT_FUEL_CONFIG
-                )
-                drivers.append(driver_score)
-        
-        # Ordenar por score
-        drivers.sort(key=lambda x: x.score, reverse=True)
-        for idx, driver in enumerate(drivers):
-            driver.rank = idx + 1
-        
-        return drivers
+        board = await driver_leaderboard(hours, source)
+        response.headers["X-Total-Count"] = str(len(board))
+        return board.page(offset, limit)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Get driver ranking error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/fuel-analysis/driver-ranking/{device_id}", response_model=DriverScore)
+async def get_driver_rank(device_id: str, hours: int = 720, source: str = "live"):
+    """Posição e score de um motorista"""
+    check_fuel_source(source)
+    try:
+        board = await driver_leaderboard(hours, source)
+        rank = board.rank(device_id)
+        if rank is None:
+            raise HTTPException(status_code=404, detail="Driver not ranked in this period")
+        return board.page(rank - 1, 1)[0]
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Get driver rank error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -4,12 +4,20 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import logging
-from typing import List, Dict
-from datetime import datetime, timezone
-from collections import defaultdict, deque
+from pathlib import Path
+from typing import List, Optional
+from datetime import datetime, timedelta, timezone
+from collections import deque
 
+from config import settings
 from models import TelemetryEvent, DeviceStatus, MetricsSummary
+from alert_engine import AlertEngine
+from telemetry_store import TelemetryRingStore
+from store_snapshot import load_snapshot, write_snapshot
+from shared_state import SharedState, open_shared_state
+from traffic_trace import open_trace_writer
 
 # Logging
 logging.basicConfig(
@@ -18,74 +26,181 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Captura do tráfego de /ingest para replay no simulador (vazio = desligado)
+trace_writer = open_trace_writer(settings.trace_capture_path)
+
 # Armazenamento em memória
 class InMemoryStorage:
     def __init__(self):
-        # Últimos 1000 eventos por device
-        self.telemetry: Dict[str, deque] = defaultdict(lambda: deque(maxlen=1000))
-        # Status atual de cada device
-        self.device_status: Dict[str, DeviceStatus] = {}
+        # Últimos 1000 eventos por device (anéis colunares; status vem da última posição)
+        self.telemetry = TelemetryRingStore()
+        # Alertas disparados (mais recentes no fim)
+        self.alert_engine = AlertEngine()
+        self.alerts: deque = deque(maxlen=1000)
         # Contadores
         self.total_events = 0
+        self.total_alerts = 0
+        # Último estado e contadores de todos os workers (None = só este worker)
+        self.shared: Optional[SharedState] = None
         
     def add_event(self, event: TelemetryEvent):
         """Adiciona evento"""
-        self.telemetry[event.device_id].append(event)
+        self.telemetry.append(event)
         self.total_events += 1
         
-        # Atualiza status do device
-        self.device_status[event.device_id] = DeviceStatus(
-            device_id=event.device_id,
-            online=True,
-            last_seen=event.ts,
-            last_lat=event.lat,
-            last_lon=event.lon,
-            last_speed=event.speed_kmh,
-            last_temp=event.engine_temp_c,
-            last_battery=event.battery_v
-        )
+        fired = self.alert_engine.process(event)
+        for alert in fired:
+            self.total_alerts += 1
+            alert["id"] = self.total_alerts
+            self.alerts.append(alert)
+        if self.shared:
+            self.shared.update(event)
+            if fired:
+                self.shared.mark_alerts(fired)
         
     def get_device_status(self) -> List[DeviceStatus]:
         """Retorna status de todos os devices"""
-        return list(self.device_status.values())
+        if self.shared:
+            return self.shared.statuses(online_window_s=None)
+        return self.telemetry.statuses()
+    
+    def count_online(self) -> int:
+        """Devices com status (todos online no modo memória)"""
+        if self.shared:
+            return self.shared.count_devices()
+        return len(self.telemetry)
+    
+    def window_stats(self, seconds: float) -> dict:
+        """Leituras e velocidades dos últimos N segundos"""
+        if self.shared and seconds < self.shared.horizon_s:
+            return self.shared.window_stats(seconds)
+        return self.telemetry.window_stats(seconds)
     
     def get_metrics(self) -> MetricsSummary:
         """Calcula métricas agregadas"""
-        total_devices = len(self.device_status)
-        online_devices = sum(1 for d in self.device_status.values() if d.online)
+        # Eventos no último minuto
+        events_last_minute = self.window_stats(60)["events"]
         
-        # Calcula eventos no último minuto
-        now = datetime.now(timezone.utc)
-        events_last_minute = 0
-        for events in self.telemetry.values():
-            for e in events:
-                if (now - e.ts).total_seconds() <= 60:
-                    events_last_minute += 1
-        
-        # Calcula velocidade média dos últimos 5 minutos
-        speeds = []
-        for events in self.telemetry.values():
-            for e in events:
-                if (now - e.ts).total_seconds() <= 300 and e.speed_kmh:
-                    speeds.append(e.speed_kmh)
-        
-        avg_speed = sum(speeds) / len(speeds) if speeds else 0.0
+        # Velocidade média dos últimos 5 minutos
+        stats = self.window_stats(300)
+        avg_speed = stats["speed_sum"] / stats["speed_n"] if stats["speed_n"] else 0.0
         
         return MetricsSummary(
-            devices_online=online_devices,
+            devices_online=self.count_online(),
             events_last_minute=events_last_minute,
             avg_speed_5min=round(avg_speed, 2),
-            alerts_last_10min=0  # Não implementado nesta versão
+            alerts_last_10min=self.count_alert_devices(600)
         )
+    
+    def get_alerts(self, minutes: int) -> List[dict]:
+        """Alertas dos últimos N minutos (mais recentes primeiro)"""
+        now = datetime.now(timezone.utc)
+        result = []
+        for alert in reversed(self.alerts):
+            if (now - alert["ts"]).total_seconds() > minutes * 60:
+                break
+            result.append(alert)
+            if len(result) >= 50:
+                break
+        return result
+    
+    def count_alert_devices(self, seconds: int) -> int:
+        """Devices distintos com alerta nos últimos N segundos"""
+        if self.shared:
+            return self.shared.count_alert_devices(seconds)
+        now = datetime.now(timezone.utc)
+        devices = set()
+        for alert in reversed(self.alerts):
+            if (now - alert["ts"]).total_seconds() > seconds:
+                break
+            devices.add(alert["device_id"])
+        return len(devices)
+
+    def snapshot_extra(self) -> dict:
+        """Contadores e alertas recentes (vão no cabeçalho do snapshot)"""
+        return {
+            "total_events": self.total_events,
+            "total_alerts": self.total_alerts,
+            "alerts": [{**alert, "ts": alert["ts"].isoformat()} for alert in self.alerts],
+        }
+
+    def restore(self, telemetry: TelemetryRingStore, extra: dict):
+        """Substitui o estado pelo carregado do snapshot"""
+        self.telemetry = telemetry
+        self.total_events = extra.get("total_events", 0)
+        self.total_alerts = extra.get("total_alerts", 0)
+        self.alerts.clear()
+        for alert in extra.get("alerts", []):
+            self.alerts.append({**alert, "ts": datetime.fromisoformat(alert["ts"])})
 
 # Storage global
 storage = InMemoryStorage()
 
+# Snapshot
+def snapshot_path(shared: Optional[SharedState] = None) -> Optional[Path]:
+    """
+    Caminho do snapshot deste worker (None = desligado)
+    Com vários workers (estado compartilhado) cada um grava
+    "<nome>.<índice>.bin", com o índice travado no segmento: o worker que
+    substitui um que reiniciou fica com o mesmo índice e restaura o arquivo
+    """
+    path = settings.memory_snapshot_path
+    if not path:
+        return None
+    path = Path(path)
+    if shared:
+        index = shared.claim_worker_index()
+        path = path.with_name(f"{path.stem}.{index}{path.suffix}")
+    return path
+
+def restore_snapshot(path: Path):
+    """Carrega o snapshot (mapeado em memória), se existir"""
+    if not path.exists():
+        return
+    try:
+        telemetry, extra = load_snapshot(path)
+        storage.restore(telemetry, extra)
+        logger.info(f"💾 Snapshot restaurado: {len(telemetry)} devices, {storage.total_events} eventos")
+    except Exception as e:
+        logger.error(f"Erro ao restaurar snapshot {path}: {e}")
+
+async def save_snapshot(path: Path):
+    try:
+        await write_snapshot(storage.telemetry, path, storage.snapshot_extra())
+    except Exception as e:
+        logger.error(f"Erro ao gravar snapshot {path}: {e}")
+
+async def snapshot_loop(path: Path, interval_s: float):
+    """Grava o snapshot periodicamente (só se chegaram eventos)"""
+    saved_events = storage.total_events
+    while True:
+        await asyncio.sleep(interval_s)
+        if storage.total_events != saved_events:
+            saved_events = storage.total_events
+            await save_snapshot(path)
+
 # Lifespan
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    snapshot_task = None
+    storage.shared = open_shared_state(
+        settings.shared_state_name, settings.shared_state_slots, zero_speeds=False
+    )
+    path = snapshot_path(storage.shared)
+    if path:
+        restore_snapshot(path)
+        snapshot_task = asyncio.create_task(snapshot_loop(path, settings.memory_snapshot_interval_s))
+    if trace_writer:
+        trace_writer.start()
     logger.info("🚀 Backend iniciado (modo memória)")
     yield
+    if trace_writer:
+        await trace_writer.stop()
+    if snapshot_task:
+        snapshot_task.cancel()
+        await save_snapshot(path)
+    if storage.shared:
+        storage.shared.close()
     logger.info("⏹️  Backend encerrado")
 
 # App
@@ -121,7 +236,7 @@ def health():
         "status": "healthy",
         "timestamp": datetime.now(timezone.utc).isoformat(),
         "storage": "memory",
-        "devices": len(storage.device_status),
+        "devices": storage.count_online(),
         "events": storage.total_events
     }
 
@@ -129,6 +244,8 @@ def health():
 async def ingest_telemetry(event: TelemetryEvent):
     """Recebe evento de telemetria"""
     try:
+        if trace_writer:
+            trace_writer.record(event)
         storage.add_event(event)
         logger.info(f"✅ {event.device_id} @ {event.speed_kmh:.1f} km/h")
         return {"status": "ok", "device_id": event.device_id}
@@ -149,20 +266,13 @@ async def get_metrics():
 @app.get("/telemetry/{device_id}")
 async def get_device_telemetry(device_id: str, limit: int = 100):
     """Histórico de telemetria de um device"""
-    events = list(storage.telemetry.get(device_id, []))
+    events = storage.telemetry.events(device_id, limit=limit)
     return {
         "device_id": device_id,
-        "total_events": len(events),
+        "total_events": storage.telemetry.count(device_id),
         "events": [
-            {
-                "ts": e.ts.isoformat(),
-                "lat": e.lat,
-                "lon": e.lon,
-                "speed_kmh": e.speed_kmh,
-                "engine_temp_c": e.engine_temp_c,
-                "battery_v": e.battery_v
-            }
-            for e in list(events)[-limit:]
+            {**e, "ts": e["ts"].isoformat()}
+            for e in events
         ]
     }
 
@@ -171,78 +281,54 @@ async def get_device_telemetry(device_id: str, limit: int = 100):
 @app.get("/devices/{device_id}/latest")
 async def get_device_latest(device_id: str):
     """Último evento de um device"""
-    events = list(storage.telemetry.get(device_id, []))
-    if not events:
+    latest = storage.telemetry.latest(device_id)
+    if latest is None:
         raise HTTPException(status_code=404, detail="Device not found")
     
-    latest = events[-1]
     return {
         "device_id": device_id,
-        "ts": latest.ts.isoformat(),
-        "lat": latest.lat,
-        "lon": latest.lon,
-        "speed_kmh": latest.speed_kmh,
-        "engine_temp_c": latest.engine_temp_c,
-        "battery_v": latest.battery_v
+        **latest,
+        "ts": latest["ts"].isoformat()
     }
 
 @app.get("/devices/{device_id}/events")
 async def get_device_events(device_id: str, minutes: int = 60, limit: int = 500):
     """Eventos de um device nos últimos N minutos"""
-    events = list(storage.telemetry.get(device_id, []))
-    now = datetime.now(timezone.utc)
-    
-    # Filtra por tempo
-    filtered = [
-        e for e in events 
-        if (now - e.ts).total_seconds() <= (minutes * 60)
-    ]
-    
-    # Aplica limite
-    filtered = filtered[-limit:] if len(filtered) > limit else filtered
+    since = datetime.now(timezone.utc) - timedelta(minutes=minutes)
+    events = storage.telemetry.events(device_id, limit=limit, since=since)
     
     return [
-        {
-            "device_id": e.device_id,
-            "ts": e.ts.isoformat(),
-            "lat": e.lat,
-            "lon": e.lon,
-            "speed_kmh": e.speed_kmh,
-            "engine_temp_c": e.engine_temp_c,
-            "battery_v": e.battery_v
-        }
-        for e in filtered
+        {"device_id": device_id, **e, "ts": e["ts"].isoformat()}
+        for e in events
     ]
 
 @app.get("/metrics/summary")
 async def get_metrics_summary(minutes: int = 5):
     """Métricas dos últimos N minutos"""
-    now = datetime.now(timezone.utc)
-    
-    # Conta eventos no período
-    events_count = 0
-    speeds = []
-    
-    for events in storage.telemetry.values():
-        for e in events:
-            if (now - e.ts).total_seconds() <= (minutes * 60):
-                events_count += 1
-                if e.speed_kmh:
-                    speeds.append(e.speed_kmh)
-    
-    avg_speed = sum(speeds) / len(speeds) if speeds else 0.0
+    stats = storage.window_stats(minutes * 60)
+    avg_speed = stats["speed_sum"] / stats["speed_n"] if stats["speed_n"] else 0.0
     
     return {
-        "devices_online": sum(1 for d in storage.device_status.values() if d.online),
-        "events_last_minute": events_count,
+        "devices_online": storage.count_online(),
+        "events_last_minute": stats["events"],
         "avg_speed_5min": round(avg_speed, 2),
-        "alerts_last_10min": 0
+        "alerts_last_10min": storage.count_alert_devices(600)
     }
 
 @app.get("/alerts")
 async def get_alerts(minutes: int = 10):
-    """Lista de alertas (não implementado)"""
-    return []
+    """Alertas recentes disparados na ingestão"""
+    return [
+        {
+            "id": a["id"],
+            "device_id": a["device_id"],
+            "ts": a["ts"].isoformat(),
+            "alert_type": a["alert_type"],
+            "value": a["value"],
+            "message": a["message"]
+        }
+        for a in storage.get_alerts(minutes)
+    ]
 
 # FUEL ECONOMY ENDPOINTS
 
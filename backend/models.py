@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional, Tuple
 from pydantic import BaseModel, Field
 
 class TelemetryEvent(BaseModel):
@@ -35,6 +35,25 @@ class Alert(BaseModel):
     value: float
     message: str
 
+class AlertRule(BaseModel):
+    """Regra de alerta avaliada na ingestão"""
+    rule_id: str
+    alert_type: str
+    metric: str                        # speed_kmh | engine_temp_c | battery_v
+    operator: str = "gt"               # gt | lt
+    threshold: float
+    duration_s: float = 0.0            # Condição sustentada por N segundos
+    cooldown_s: float = 300.0          # Debounce entre disparos
+    device_id: Optional[str] = None    # None = regra da frota
+    message: str                       # Template com {value} e {threshold}
+
+class Geofence(BaseModel):
+    """Cerca virtual (polígono em graus decimais)"""
+    id: Optional[int] = None
+    name: str
+    kind: str = "site"                 # depot | customer | restricted | site
+    polygon: List[Tuple[float, float]] # [(lat, lon), ...] sem repetir o primeiro ponto
+
 # ==================== FUEL ECONOMY MODELS ====================
 
 class FuelConfig(BaseModel):
@@ -67,6 +86,16 @@ class DriverScore(BaseModel):
     estimated_waste: float             # R$
     rank: Optional[int] = None
 
+class DeviceProfile(BaseModel):
+    """Perfil completo de um device (uma passada sobre os eventos)"""
+    device_id: str
+    events: int
+    idle_hours: float                  # Horas em marcha lenta (sem arredondar)
+    harsh_events: int
+    distance_km: float
+    waste: WasteBreakdown
+    score: DriverScore
+
 class FuelEconomyDashboard(BaseModel):
     """Dashboard completo de economia"""
     current_month_cost: float
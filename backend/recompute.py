@@ -0,0 +1,190 @@
+"""
+MÓDULO: Recalculo em lote da frota
+Regrava fuel_daily_summary de um intervalo de dias após mudar o FuelConfig,
+com devices distribuídos entre todos os núcleos e checkpoint por dia
+
+O config vem dos FUEL_* do .env, os mesmos do backend: o job de resumos
+diários recalcula dias com dados atrasados usando o config ativo, então
+um recalculo com outro config seria desfeito aos poucos (e o dashboard
+somaria dias de configs diferentes). Atualize o .env (e reinicie o
+backend) antes de recalcular; --fuel-price & cia. diferentes do ativo
+só com --force. Cada linha grava o config_hash do config usado.
+
+Uso (dentro de backend/):
+    FUEL_PRICE=6.10 python recompute.py --start 2026-01-01 --end 2026-03-31
+    python recompute.py --start 2026-01-01 --end 2026-03-31 --resume
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+
+from analytics_executor import AnalyticsExecutor
+from daily_summary import day_bounds, summarize_day
+from fuel_economy import DEFAULT_FUEL_CONFIG
+from models import FuelConfig
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT = "recompute.checkpoint.json"
+
+
+# ==================== CHECKPOINT ====================
+
+def load_checkpoint(path: Path) -> Optional[dict]:
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def save_checkpoint(path: Path, state: dict):
+    """Grava em arquivo temporário e renomeia (nunca fica pela metade)"""
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(state, indent=2))
+    os.replace(tmp, path)
+
+
+def resume_day(checkpoint: Optional[dict], start_day: date, end_day: date, config: FuelConfig) -> date:
+    """Primeiro dia ainda não gravado para este intervalo e config"""
+    if checkpoint is None:
+        return start_day
+    same_run = (
+        checkpoint.get("start") == start_day.isoformat() and
+        checkpoint.get("end") == end_day.isoformat() and
+        checkpoint.get("config") == config.model_dump()
+    )
+    if not same_run:
+        raise SystemExit(
+            "Checkpoint belongs to another interval or config; "
+            "use --restart to discard it"
+        )
+    return date.fromisoformat(checkpoint["done_through"]) + timedelta(days=1)
+
+
+def interval_end(end_day: Optional[date], checkpoint: Optional[dict]) -> date:
+    """--end informado; senão o do checkpoint (--resume em outro dia) ou hoje"""
+    if end_day is not None:
+        return end_day
+    if checkpoint is not None:
+        return date.fromisoformat(checkpoint["end"])
+    return datetime.now(timezone.utc).date()
+
+
+# ==================== RECALCULO ====================
+
+async def recompute(
+    start_day: date,
+    end_day: date,
+    config: FuelConfig,
+    workers: int,
+    checkpoint_path: Path,
+    resume: bool
+):
+    """Recalcula dia a dia; cada dia vira checkpoint depois de gravado"""
+    from database import db
+
+    checkpoint = load_checkpoint(checkpoint_path) if resume else None
+    first_day = resume_day(checkpoint, start_day, end_day, config)
+    state = checkpoint or {
+        "start": start_day.isoformat(),
+        "end": end_day.isoformat(),
+        "config": config.model_dump(),
+        "rows": 0,
+        "events": 0,
+    }
+    total_days = (end_day - start_day).days + 1
+    if first_day > end_day:
+        print("Nothing to do: checkpoint already covers the interval")
+        return
+    if first_day > start_day:
+        print(f"Resuming at {first_day.isoformat()} ({(first_day - start_day).days}/{total_days} days done)")
+
+    executor = AnalyticsExecutor("process", workers)
+    executor.start()
+    await db.connect()
+    t0 = time.perf_counter()
+    rows_run = events_run = 0
+    try:
+        day = first_day
+        while day <= end_day:
+            t_day = time.perf_counter()
+            start, end = day_bounds(day)
+            rows = await executor.map_devices(
+                summarize_day, db.iter_fleet_columns(start, end), day, config
+            )
+            await db.upsert_daily_summaries(rows)
+
+            day_events = sum(row["events"] for row in rows)
+            rows_run += len(rows)
+            events_run += day_events
+            state["rows"] += len(rows)
+            state["events"] += day_events
+            state["done_through"] = day.isoformat()
+            save_checkpoint(checkpoint_path, state)
+
+            elapsed = time.perf_counter() - t0
+            done = (day - start_day).days + 1
+            days_run = (day - first_day).days + 1
+            eta = elapsed / days_run * (total_days - done)
+            print(
+                f"{day.isoformat()}: {len(rows):>6} devices {day_events:>10,} events "
+                f"in {time.perf_counter() - t_day:6.1f}s | {done}/{total_days} days, "
+                f"{events_run / elapsed:,.0f} events/s, "
+                f"{rows_run / elapsed:,.1f} devices/s, ETA {eta / 60:.1f} min"
+            )
+            day += timedelta(days=1)
+    finally:
+        await db.disconnect()
+        executor.shutdown()
+
+    elapsed = time.perf_counter() - t0
+    print(
+        f"\nDone: {rows_run} device-days, {events_run:,} events in {elapsed:.1f}s "
+        f"({executor.workers} workers)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--start", type=date.fromisoformat, required=True, help="YYYY-MM-DD")
+    parser.add_argument("--end", type=date.fromisoformat, default=None,
+                        help="YYYY-MM-DD (padrão: o do checkpoint com --resume, senão hoje)")
+    parser.add_argument("--workers", type=int, default=0, help="Processos (0 = nº de CPUs)")
+    parser.add_argument("--fuel-price", type=float, default=DEFAULT_FUEL_CONFIG.fuel_price)
+    parser.add_argument("--expected-kml", type=float, default=DEFAULT_FUEL_CONFIG.expected_kml)
+    parser.add_argument("--idle-consumption-lh", type=float, default=DEFAULT_FUEL_CONFIG.idle_consumption_lh)
+    parser.add_argument("--checkpoint", type=Path, default=Path(DEFAULT_CHECKPOINT))
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--resume", action="store_true", help="Continua do checkpoint")
+    group.add_argument("--restart", action="store_true", help="Descarta o checkpoint")
+    parser.add_argument("--force", action="store_true", help="Aceita config diferente do ativo (FUEL_*)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    end_day = interval_end(args.end, load_checkpoint(args.checkpoint) if args.resume else None)
+    if end_day < args.start:
+        parser.error("--end must not be before --start")
+    if args.restart and args.checkpoint.exists():
+        args.checkpoint.unlink()
+
+    config = FuelConfig(
+        fuel_price=args.fuel_price,
+        expected_kml=args.expected_kml,
+        idle_consumption_lh=args.idle_consumption_lh
+    )
+    if config != DEFAULT_FUEL_CONFIG and not args.force:
+        parser.error(
+            f"config differs from the active one ({DEFAULT_FUEL_CONFIG}); the live daily "
+            "summary job would revert recomputed days. Set FUEL_* in .env or pass --force"
+        )
+    asyncio.run(recompute(args.start, end_day, config, args.workers, args.checkpoint, args.resume))
+
+
+if __name__ == "__main__":
+    main()
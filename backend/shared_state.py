@@ -0,0 +1,413 @@
+"""
+MÓDULO: Estado compartilhado entre workers do uvicorn
+Último estado por device e contadores por segundo num segmento de
+memória compartilhada, iguais para todos os workers
+
+- Escrita: lock por slot (fcntl.lockf num byte do arquivo de lock) e
+  seqlock (seq ímpar = escrita em andamento)
+- Leitura: sem lock; releitura do slot se o seq mudou durante a cópia
+- Devices ficam numa tabela hash (sondagem linear) de capacidade fixa
+
+fcntl não existe no Windows: lá o estado compartilhado fica desligado.
+Locks fcntl são por processo, então cada worker escreve só da thread do
+event loop (como a ingestão já faz).
+"""
+
+import logging
+import os
+import tempfile
+import zlib
+from datetime import datetime, timedelta, timezone
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from models import DeviceStatus, TelemetryEvent
+
+try:
+    import fcntl
+except ImportError:     # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = 0x4D4F4E5354415445      # "MONSTATE"
+VERSION = 1
+DEVICE_ID_BYTES = 64
+DEFAULT_SLOTS = 65536
+DEFAULT_HORIZON_S = 3600
+READ_RETRIES = 100
+MAX_WORKERS = 1024
+TS_EMPTY = np.iinfo(np.int64).min
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Colunas float64 do último estado (ts fica à parte em int64)
+VALUE_FIELDS = ("lat", "lon", "speed_kmh", "engine_temp_c", "battery_v")
+
+
+def _epoch_us(ts: datetime) -> int:
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    delta = ts - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _optional(value: float) -> Optional[float]:
+    return None if value != value else float(value)
+
+
+def supported() -> bool:
+    return fcntl is not None
+
+
+def _layout(slots: int, horizon_s: int) -> Dict[str, tuple]:
+    """nome -> (offset, dtype, shape) de cada array no segmento"""
+    arrays = {
+        "header": (np.int64, (8,)),
+        "ids": (f"S{DEVICE_ID_BYTES}", (slots,)),
+        "seq": (np.uint64, (slots,)),
+        "ts": (np.int64, (slots,)),
+        "values": (np.float64, (slots, len(VALUE_FIELDS))),
+        "alert_ts": (np.int64, (slots,)),
+        "bucket_seq": (np.uint64, (horizon_s,)),
+        "bucket_second": (np.int64, (horizon_s,)),
+        "bucket_events": (np.int64, (horizon_s,)),
+        "bucket_speed_sum": (np.float64, (horizon_s,)),
+        "bucket_speed_n": (np.int64, (horizon_s,)),
+    }
+    layout, offset = {}, 0
+    for name, (dtype, shape) in arrays.items():
+        layout[name] = (offset, dtype, shape)
+        offset += (int(np.prod(shape)) * np.dtype(dtype).itemsize + 63) // 64 * 64
+    layout["_size"] = (offset, None, None)
+    return layout
+
+
+class SharedState:
+    """
+    Tabela de último estado + contadores por segundo compartilhados
+
+    O primeiro worker cria o segmento; os demais se conectam a ele. O
+    segmento sobrevive aos workers (reinício mantém o estado); unlink()
+    remove. zero_speeds=False ignora velocidade 0 na média (modo memória).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        slots: int = DEFAULT_SLOTS,
+        horizon_s: int = DEFAULT_HORIZON_S,
+        zero_speeds: bool = True
+    ):
+        self.name = name
+        self.slots = slots
+        self.horizon_s = horizon_s
+        self.zero_speeds = zero_speeds
+        self.shm: Optional[shared_memory.SharedMemory] = None
+        self.lock_fd: Optional[int] = None
+        self.cache: Dict[str, int] = {}      # device_id -> slot (deste worker)
+
+    # ==================== SEGMENTO ====================
+
+    def _lock(self, index: int):
+        fcntl.lockf(self.lock_fd, fcntl.LOCK_EX, 1, index)
+
+    def _unlock(self, index: int):
+        fcntl.lockf(self.lock_fd, fcntl.LOCK_UN, 1, index)
+
+    # Byte 0 = registro de devices; depois um byte por slot e por segundo
+    def _slot_lock(self, slot: int) -> int:
+        return 1 + slot
+
+    def _bucket_lock(self, bucket: int) -> int:
+        return 1 + self.slots + bucket
+
+    def _worker_lock(self, index: int) -> int:
+        return 1 + self.slots + self.horizon_s + index
+
+    def open(self):
+        """Cria o segmento ou se conecta ao existente"""
+        if not supported():
+            raise RuntimeError("Shared state requires fcntl (not available on Windows)")
+        layout = _layout(self.slots, self.horizon_s)
+        size = layout["_size"][0]
+        lock_path = os.path.join(tempfile.gettempdir(), f"{self.name}.lock")
+        self.lock_fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+
+        self._lock(0)
+        try:
+            try:
+                self.shm = shared_memory.SharedMemory(self.name, create=True, size=size)
+                created = True
+            except FileExistsError:
+                self.shm = shared_memory.SharedMemory(self.name)
+                created = False
+            # O resource_tracker apagaria o segmento quando este worker saísse
+            resource_tracker.unregister(self.shm._name, "shared_memory")
+
+            for name, (offset, dtype, shape) in layout.items():
+                if name != "_size":
+                    count = int(np.prod(shape))
+                    view = np.frombuffer(self.shm.buf, dtype=dtype, count=count, offset=offset)
+                    setattr(self, name, view.reshape(shape))
+
+            if created:
+                self.ts[:] = TS_EMPTY
+                self.alert_ts[:] = TS_EMPTY
+                self.bucket_second[:] = -1
+                self.header[:4] = (MAGIC, VERSION, self.slots, self.horizon_s)
+            elif tuple(self.header[:4]) != (MAGIC, VERSION, self.slots, self.horizon_s):
+                raise RuntimeError(
+                    f"Shared state '{self.name}' has another layout; remove it with unlink() "
+                    f"or use another name"
+                )
+        finally:
+            self._unlock(0)
+        logger.info(f"Shared state '{self.name}' {'created' if created else 'attached'} ({size / 1e6:.1f} MB)")
+
+    def close(self):
+        # Views numpy precisam sair antes de fechar o buffer
+        for name in _layout(self.slots, self.horizon_s):
+            self.__dict__.pop(name, None)
+        if self.shm:
+            self.shm.close()
+            self.shm = None
+        if self.lock_fd is not None:
+            os.close(self.lock_fd)
+            self.lock_fd = None
+
+    def unlink(self):
+        """Remove o segmento (depois que nenhum worker o usa mais)"""
+        shm = shared_memory.SharedMemory(self.name)
+        shm.close()
+        shm.unlink()
+
+    def claim_worker_index(self) -> int:
+        """
+        Menor índice de worker livre, travado até close() ou o fim do processo
+
+        Estável entre reinícios: o lock de um worker que morreu é liberado
+        pelo kernel e o substituto fica com o mesmo índice (ex.: para o
+        arquivo de snapshot). Dois workers vivos nunca têm o mesmo índice.
+        """
+        for index in range(MAX_WORKERS):
+            try:
+                fcntl.lockf(self.lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, self._worker_lock(index))
+                return index
+            except OSError:
+                continue
+        raise RuntimeError(f"Shared state '{self.name}': more than {MAX_WORKERS} workers")
+
+    # ==================== TABELA DE DEVICES ====================
+
+    def _probe(self, key: bytes) -> int:
+        """Slot do device ou primeiro slot vazio da sequência de sondagem"""
+        slot = zlib.crc32(key) % self.slots
+        for _ in range(self.slots):
+            current = self.ids[slot]
+            if current == key or current == b"":
+                return slot
+            slot = (slot + 1) % self.slots
+        raise RuntimeError(f"Shared state '{self.name}' is full ({self.slots} devices)")
+
+    def _key(self, device_id: str) -> bytes:
+        key = device_id.encode()
+        if len(key) > DEVICE_ID_BYTES:
+            raise ValueError(f"device_id longer than {DEVICE_ID_BYTES} bytes")
+        return key
+
+    def _find(self, device_id: str) -> Optional[int]:
+        slot = self.cache.get(device_id)
+        if slot is None:
+            key = self._key(device_id)
+            slot = self._probe(key)
+            if self.ids[slot] != key:
+                return None
+            self.cache[device_id] = slot
+        return slot
+
+    def _claim(self, device_id: str) -> int:
+        slot = self._find(device_id)
+        if slot is not None:
+            return slot
+        key = self._key(device_id)
+        self._lock(0)
+        try:
+            slot = self._probe(key)         # Outro worker pode ter registrado
+            if self.ids[slot] == b"":
+                self.ids[slot] = key
+        finally:
+            self._unlock(0)
+        self.cache[device_id] = slot
+        return slot
+
+    # ==================== ESCRITA ====================
+
+    def _write_latest(self, device_id: str, ts_us: int, values: tuple):
+        """Grava o último estado se ts_us não for mais antigo que o atual"""
+        slot = self._claim(device_id)
+        self._lock(self._slot_lock(slot))
+        try:
+            if ts_us >= self.ts[slot]:
+                self.seq[slot] += 1
+                self.ts[slot] = ts_us
+                self.values[slot] = [float("nan") if value is None else value for value in values]
+                self.seq[slot] += 1
+        finally:
+            self._unlock(self._slot_lock(slot))
+
+    def seed(self, statuses: List[DeviceStatus]):
+        """
+        Carrega o último estado já gravado no banco (ex.: na subida do worker)
+
+        Sem isso devices que não enviaram nada desde a criação do segmento
+        somem de statuses(). Não mexe nos contadores por segundo, e estado
+        mais novo já no segmento prevalece.
+        """
+        for status in statuses:
+            self._write_latest(
+                status.device_id, _epoch_us(status.last_seen),
+                (status.last_lat, status.last_lon, status.last_speed,
+                 status.last_temp, status.last_battery)
+            )
+
+    def update(self, event: TelemetryEvent):
+        """Atualiza o último estado (se o evento for o mais novo) e os contadores"""
+        ts_us = _epoch_us(event.ts)
+        self._write_latest(
+            event.device_id, ts_us,
+            (event.lat, event.lon, event.speed_kmh, event.engine_temp_c, event.battery_v)
+        )
+
+        second = ts_us // 1_000_000
+        i = second % self.horizon_s
+        self._lock(self._bucket_lock(i))
+        try:
+            current = self.bucket_second[i]
+            if current > second:
+                return          # Mais antigo que o horizonte
+            self.bucket_seq[i] += 1
+            if current != second:
+                self.bucket_second[i] = second
+                self.bucket_events[i] = 0
+                self.bucket_speed_sum[i] = 0.0
+                self.bucket_speed_n[i] = 0
+            self.bucket_events[i] += 1
+            speed = event.speed_kmh
+            if speed is not None and (speed or self.zero_speeds):
+                self.bucket_speed_sum[i] += speed
+                self.bucket_speed_n[i] += 1
+            self.bucket_seq[i] += 1
+        finally:
+            self._unlock(self._bucket_lock(i))
+
+    def mark_alerts(self, alerts: List[dict]):
+        """Guarda o ts do alerta mais recente de cada device"""
+        for alert in alerts:
+            ts_us = _epoch_us(alert["ts"])
+            slot = self._claim(alert["device_id"])
+            self._lock(self._slot_lock(slot))
+            try:
+                if ts_us > self.alert_ts[slot]:
+                    self.alert_ts[slot] = ts_us
+            finally:
+                self._unlock(self._slot_lock(slot))
+
+    # ==================== LEITURA ====================
+
+    def _consistent(self, seq: np.ndarray, index: np.ndarray, arrays: List[np.ndarray]) -> List[np.ndarray]:
+        """Cópia de arrays[index] sem escrita no meio (seqlock, sem lock)"""
+        copies = [array[index] for array in arrays]
+        pending = np.arange(len(index))
+        for _ in range(READ_RETRIES):
+            positions = index[pending]
+            before = seq[positions]
+            values = [array[positions] for array in arrays]
+            after = seq[positions]
+            # Só as posições com escrita no meio (seq ímpar ou alterado) são relidas
+            ok = (before == after) & (before % 2 == 0)
+            for copy, value in zip(copies, values):
+                copy[pending[ok]] = value[ok]
+            pending = pending[~ok]
+            if not len(pending):
+                break
+        return copies
+
+    def _occupied(self) -> np.ndarray:
+        """Slots com device e ao menos um evento gravado"""
+        return np.flatnonzero((self.ids != b"") & (self.ts != TS_EMPTY))
+
+    def latest_table(self):
+        """(device_ids, ts_us, values) de todos os devices, em ordem de device_id"""
+        index = self._occupied()
+        ids = [device_id.decode() for device_id in self.ids[index]]
+        order = np.argsort(ids, kind="stable")
+        index = index[order]
+        ts, values = self._consistent(self.seq, index, [self.ts, self.values])
+        return [ids[i] for i in order], ts, values
+
+    def statuses(self, online_window_s: Optional[float] = 30) -> List[DeviceStatus]:
+        """DeviceStatus de todos os devices; online_window_s=None = todos online"""
+        device_ids, ts, values = self.latest_table()
+        cutoff = None
+        if online_window_s is not None:
+            cutoff = _epoch_us(datetime.now(timezone.utc)) - int(online_window_s * 1_000_000)
+        return [
+            DeviceStatus(
+                device_id=device_id,
+                online=True if cutoff is None else bool(ts_us > cutoff),
+                last_seen=_EPOCH + timedelta(microseconds=int(ts_us)),
+                last_lat=_optional(row[0]),
+                last_lon=_optional(row[1]),
+                last_speed=_optional(row[2]),
+                last_temp=_optional(row[3]),
+                last_battery=_optional(row[4])
+            )
+            for device_id, ts_us, row in zip(device_ids, ts, values)
+        ]
+
+    def count_devices(self) -> int:
+        return len(self._occupied())
+
+    def count_online(self, seconds: float) -> int:
+        """Devices com último evento nos últimos N segundos"""
+        cutoff = _epoch_us(datetime.now(timezone.utc)) - int(seconds * 1_000_000)
+        return int(np.count_nonzero(self.ts[self._occupied()] > cutoff))
+
+    def count_alert_devices(self, seconds: float) -> int:
+        """Devices com alerta nos últimos N segundos"""
+        cutoff = _epoch_us(datetime.now(timezone.utc)) - int(seconds * 1_000_000)
+        return int(np.count_nonzero(self.alert_ts > cutoff))
+
+    def window_stats(self, seconds: float, now: Optional[datetime] = None) -> dict:
+        """Soma dos contadores a partir de now - seconds (precisão de 1 s)"""
+        if seconds >= self.horizon_s:
+            raise ValueError(f"Window must be shorter than {self.horizon_s}s")
+        now_us = _epoch_us(now or datetime.now(timezone.utc))
+        start = (now_us - int(seconds * 1_000_000)) // 1_000_000
+        end = now_us // 1_000_000
+        span = np.arange(start, end + 1) % self.horizon_s
+        second, events, speed_sum, speed_n = self._consistent(
+            self.bucket_seq, span,
+            [self.bucket_second, self.bucket_events, self.bucket_speed_sum, self.bucket_speed_n]
+        )
+        valid = second >= start
+        return {
+            "events": int(events[valid].sum()),
+            "speed_sum": float(speed_sum[valid].sum()),
+            "speed_n": int(speed_n[valid].sum()),
+        }
+
+
+def open_shared_state(name: str, slots: int = DEFAULT_SLOTS, zero_speeds: bool = True) -> Optional[SharedState]:
+    """SharedState aberto, ou None se desligado (nome vazio) ou sem suporte"""
+    if not name:
+        return None
+    if not supported():
+        logger.warning("Shared state disabled: fcntl is not available on this platform")
+        return None
+    state = SharedState(name, slots, zero_speeds=zero_speeds)
+    state.open()
+    return state
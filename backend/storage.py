@@ -0,0 +1,260 @@
+"""
+MÓDULO: Interface de armazenamento
+Buffer de ingestão (flush em lote com retry) comum a todos os backends e
+as consultas que cada backend implementa (Postgres, SQLite)
+"""
+
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from datetime import date, datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from config import settings
+from fuel_kernels import TelemetryColumns, columns_from_arrays
+from models import DeviceStatus, Geofence, TelemetryEvent
+
+logger = logging.getLogger(__name__)
+
+STORAGE_BACKENDS = ("postgres", "sqlite")
+
+
+class StorageBackend(ABC):
+    """
+    Backend de armazenamento do main.py
+
+    Eventos, alertas, transições de geofence e viagens entram num buffer
+    e são gravados juntos (mesma transação) a cada batch_size eventos ou
+    batch_timeout segundos. Linhas são devolvidas como dicts com ts em
+    datetime UTC, iguais entre backends.
+    """
+
+    def __init__(self):
+        self.buffer: List[TelemetryEvent] = []
+        self.alert_buffer: List[dict] = []
+        self.geofence_buffer: List[dict] = []
+        self.trip_buffer: List[dict] = []
+        self.buffer_lock = asyncio.Lock()
+        self.flush_task = None
+
+    # ==================== CONEXÃO ====================
+
+    @abstractmethod
+    async def connect(self):
+        """Abre conexões (e cria o schema, se o backend fizer isso)"""
+
+    @abstractmethod
+    async def _close(self):
+        """Fecha conexões"""
+
+    async def disconnect(self):
+        """Grava o que ficou no buffer e fecha conexões"""
+        if self.flush_task:
+            self.flush_task.cancel()
+        await self.flush_buffer()
+        await self._close()
+
+    # ==================== BUFFER DE INGESTÃO ====================
+
+    async def start_flush_task(self):
+        """Inicia task de flush periódico"""
+        self.flush_task = asyncio.create_task(self._periodic_flush())
+
+    async def _periodic_flush(self):
+        """Flush buffer a cada N segundos"""
+        while True:
+            await asyncio.sleep(settings.batch_timeout)
+            await self.flush_buffer()
+
+    async def add_to_buffer(self, event: TelemetryEvent):
+        """Adiciona evento ao buffer"""
+        async with self.buffer_lock:
+            self.buffer.append(event)
+            should_flush = len(self.buffer) >= settings.batch_size
+        # Flush fora do lock (asyncio.Lock não é reentrante)
+        if should_flush:
+            await self.flush_buffer()
+
+    async def add_alerts(self, alerts: List[dict]):
+        """Adiciona alertas disparados ao buffer (gravados no próximo flush)"""
+        async with self.buffer_lock:
+            self.alert_buffer.extend(alerts)
+
+    async def add_geofence_events(self, transitions: List[dict]):
+        """Adiciona transições de geofence ao buffer"""
+        async with self.buffer_lock:
+            self.geofence_buffer.extend(transitions)
+
+    async def add_trips(self, trips: List[dict]):
+        """Adiciona viagens/paradas fechadas ao buffer"""
+        async with self.buffer_lock:
+            self.trip_buffer.extend(trips)
+
+    async def flush_buffer(self):
+        """Flush buffer para banco com retry"""
+        async with self.buffer_lock:
+            if not (self.buffer or self.alert_buffer or self.geofence_buffer or self.trip_buffer):
+                return
+
+            events = self.buffer.copy()
+            self.buffer.clear()
+            alerts = self.alert_buffer.copy()
+            self.alert_buffer.clear()
+            transitions = self.geofence_buffer.copy()
+            self.geofence_buffer.clear()
+            trips = self.trip_buffer.copy()
+            self.trip_buffer.clear()
+
+        max_retries = 3
+        for attempt in range(max_retries):
+            try:
+                await self._insert_events(events, alerts, transitions, trips)
+                logger.info(
+                    f"Flushed {len(events)} events, {len(alerts)} alerts, "
+                    f"{len(transitions)} geofence transitions, {len(trips)} trips to database"
+                )
+                return
+            except Exception as e:
+                logger.error(f"Flush attempt {attempt + 1} failed: {e}")
+                if attempt == max_retries - 1:
+                    logger.error(f"Lost {len(events)} events after {max_retries} retries")
+                await asyncio.sleep(0.5 * (attempt + 1))
+
+    @abstractmethod
+    async def _insert_events(
+        self,
+        events: List[TelemetryEvent],
+        alerts: List[dict],
+        transitions: List[dict],
+        trips: List[dict]
+    ):
+        """Insere eventos, alertas, transições e viagens em batch (mesma transação)"""
+
+    # ==================== CONSULTAS ====================
+
+    @abstractmethod
+    async def get_devices(self) -> List[DeviceStatus]:
+        """Lista todos devices com status"""
+
+    @abstractmethod
+    async def get_device_latest(self, device_id: str) -> Optional[dict]:
+        """Último evento de um device"""
+
+    @abstractmethod
+    async def get_device_events(self, device_id: str, minutes: int = 60, limit: int = 500) -> List[dict]:
+        """Eventos de um device no período (mais recentes primeiro)"""
+
+    @abstractmethod
+    async def get_metrics_summary(self, minutes: int = 5) -> dict:
+        """Métricas agregadas"""
+
+    @abstractmethod
+    async def get_alerts(self, minutes: int = 10) -> List[dict]:
+        """Alertas recentes disparados pelo motor de regras"""
+
+    @abstractmethod
+    async def get_geofences(self) -> List[Geofence]:
+        """Todas as geofences cadastradas"""
+
+    @abstractmethod
+    async def create_geofence(self, fence: Geofence) -> Geofence:
+        """Cadastra geofence e retorna com id"""
+
+    @abstractmethod
+    async def get_geofence_events(
+        self,
+        minutes: int = 60,
+        device_id: Optional[str] = None,
+        limit: int = 500
+    ) -> List[dict]:
+        """Transições de geofence recentes"""
+
+    @abstractmethod
+    async def get_trips(
+        self,
+        device_id: Optional[str] = None,
+        kind: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        min_distance_km: Optional[float] = None,
+        min_duration_s: Optional[float] = None,
+        limit: int = 100
+    ) -> List[dict]:
+        """Viagens/paradas que começam em [start_date, end_date), mais recentes primeiro"""
+
+    # ==================== FUEL ECONOMY ====================
+
+    @abstractmethod
+    async def get_device_events_period(
+        self,
+        device_id: str,
+        start_date: datetime,
+        end_date: datetime
+    ) -> List[dict]:
+        """Eventos de um device em período específico"""
+
+    @abstractmethod
+    def get_all_devices_events_period(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        device_ids: Optional[List[str]] = None
+    ) -> AsyncIterator[Tuple[str, List[dict]]]:
+        """Eventos de todos devices em [start, end), um device por vez"""
+
+    @abstractmethod
+    def iter_fleet_columns(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        device_ids: Optional[List[str]] = None
+    ) -> AsyncIterator[Tuple[str, TelemetryColumns]]:
+        """Telemetria em colunas por device, em ordem crescente de ts, um device por vez"""
+
+    async def get_fleet_columns(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        device_ids: Optional[List[str]] = None
+    ) -> Dict[str, TelemetryColumns]:
+        """Telemetria em colunas de vários devices de uma vez (poucos devices)"""
+        return {
+            device_id: cols
+            async for device_id, cols in self.iter_fleet_columns(start_date, end_date, device_ids)
+        }
+
+    async def get_device_columns(
+        self,
+        device_id: str,
+        start_date: datetime,
+        end_date: datetime
+    ) -> TelemetryColumns:
+        """Telemetria em colunas de um device (vazia se não houver dados)"""
+        columns = await self.get_fleet_columns(start_date, end_date, [device_id])
+        if device_id in columns:
+            return columns[device_id]
+        return columns_from_arrays([], [], [], [])
+
+    @abstractmethod
+    async def get_fuel_aggregates(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        device_id: Optional[str] = None
+    ) -> List[dict]:
+        """Uma linha por device: events, idle_hours, harsh_events, distance_km"""
+
+    @abstractmethod
+    async def upsert_daily_summaries(self, rows: List[dict]):
+        """Grava (ou substitui) resumos diários por device"""
+
+    @abstractmethod
+    async def get_daily_summary_totals(self, start_day: date, end_day: date) -> dict:
+        """
+        Totais da frota nos resumos diários em [start_day, end_day]
+        (configs = nº de FuelConfigs distintos entre as linhas somadas)
+        """
+
+    @abstractmethod
+    async def get_fuel_consumption_summary(self, device_id: str, days: int = 30) -> dict:
+        """Resumo de consumo dos últimos N dias"""
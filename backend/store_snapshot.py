@@ -0,0 +1,195 @@
+"""
+MÓDULO: Snapshot do armazenamento em memória (modo sem banco)
+Arquivo binário único com os anéis colunares; restaurado via memmap
+
+Formato:
+    MAGIC (8 bytes) | tamanho do cabeçalho (uint64 LE) | cabeçalho JSON
+    | blocos (ts, lat, lon, speed, temp, battery por bloco)
+    | heads | ordered | agregados por segundo
+    Cada seção começa alinhada em 64 bytes.
+"""
+
+import asyncio
+import json
+import os
+import struct
+import tempfile
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from telemetry_store import BLOCK_DEVICES, SecondBuckets, TelemetryRingStore, _Block
+
+MAGIC = b"MESNAP01"
+ALIGN = 64
+BLOCK_FIELDS = (
+    ("ts", np.int64),
+    ("lat", np.float64),
+    ("lon", np.float64),
+    ("speed_kmh", np.float32),
+    ("engine_temp_c", np.float32),
+    ("battery_v", np.float32),
+)
+BUCKET_FIELDS = (
+    ("second", np.int64),
+    ("events", np.int64),
+    ("speed_sum", np.float64),
+    ("speed_n", np.int64),
+)
+
+
+def _aligned(n: int) -> int:
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def _layout(n_devices: int, history: int, horizon_s: int) -> Tuple[List[Tuple[int, int]], dict, int]:
+    """(offset, linhas) de cada bloco, offsets das seções finais e tamanho dos dados"""
+    offset = 0
+    blocks = []
+    for first in range(0, n_devices, BLOCK_DEVICES):
+        rows = min(BLOCK_DEVICES, n_devices - first)
+        blocks.append((offset, rows))
+        for _, dtype in BLOCK_FIELDS:
+            offset += _aligned(rows * history * np.dtype(dtype).itemsize)
+    tail = {"heads": offset}
+    offset += _aligned(n_devices * 8)
+    tail["ordered"] = offset
+    offset += _aligned(n_devices)
+    tail["buckets"] = offset
+    offset += sum(_aligned(horizon_s * np.dtype(dtype).itemsize) for _, dtype in BUCKET_FIELDS)
+    return blocks, tail, offset
+
+
+def _padding(n: int) -> bytes:
+    return b"\0" * (_aligned(n) - n)
+
+
+def _padded(chunks: List[bytes]) -> List[bytes]:
+    return [part for chunk in chunks for part in (chunk, _padding(len(chunk)))]
+
+
+async def write_snapshot(store: TelemetryRingStore, path: Path, extra: Optional[dict] = None) -> int:
+    """
+    Grava o snapshot sem bloquear a ingestão
+
+    Cada bloco é copiado no event loop (um por vez, poucos ms) e escrito
+    no disco numa thread; devices criados durante a gravação ficam para o
+    próximo snapshot. Escreve num temporário único no mesmo diretório
+    (gravações simultâneas não se atropelam) e renomeia no fim (atômico).
+    Retorna o número de devices gravados.
+    """
+    path = Path(path)
+    n_devices = len(store.device_ids)
+    device_ids = list(store.device_ids)
+    history = store.history
+    horizon_s = store.buckets.horizon_s
+    blocks, _, _ = _layout(n_devices, history, horizon_s)
+
+    header = json.dumps({
+        "version": 1,
+        "history": history,
+        "block_devices": BLOCK_DEVICES,
+        "horizon_s": horizon_s,
+        "devices": device_ids,
+        "extra": extra or {},
+    }).encode()
+    prefix = MAGIC + struct.pack("<Q", len(header)) + header
+
+    fd, tmp = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp", dir=path.parent)
+    f = os.fdopen(fd, "wb")
+    try:
+        await asyncio.to_thread(f.write, prefix + _padding(len(prefix)))
+        heads = np.zeros(n_devices, dtype=np.int64)
+        ordered = np.zeros(n_devices, dtype=bool)
+        for b, (_, rows) in enumerate(blocks):
+            first = b * BLOCK_DEVICES
+            block = store.blocks[b]
+            # Cópia consistente do bloco (no loop: nenhum append no meio)
+            chunks = [getattr(block, name)[:rows].tobytes() for name, _ in BLOCK_FIELDS]
+            heads[first:first + rows] = store.heads[first:first + rows]
+            ordered[first:first + rows] = store.ordered[first:first + rows]
+            await asyncio.to_thread(f.writelines, _padded(chunks))
+
+        tail = [heads.tobytes(), ordered.tobytes()]
+        tail += [getattr(store.buckets, name).tobytes() for name, _ in BUCKET_FIELDS]
+        await asyncio.to_thread(f.writelines, _padded(tail))
+        await asyncio.to_thread(f.flush)
+        await asyncio.to_thread(os.fsync, f.fileno())
+    except BaseException:
+        await asyncio.to_thread(f.close)
+        os.unlink(tmp)
+        raise
+    await asyncio.to_thread(f.close)
+    os.replace(tmp, path)
+    return n_devices
+
+
+def load_snapshot(path: Path, mmap: Optional[bool] = None) -> Tuple[TelemetryRingStore, dict]:
+    """
+    Restaura o armazenamento (e o dict extra) a partir do snapshot
+
+    Com mmap (padrão fora do Windows) os blocos completos viram views
+    copy-on-write do arquivo: nada é lido até ser usado e as escritas não
+    tocam o arquivo. No Windows o mapeamento travaria o arquivo para a
+    próxima gravação, então os dados são lidos para a memória.
+    """
+    path = Path(path)
+    if mmap is None:
+        mmap = os.name != "nt"
+
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a telemetry snapshot")
+        (header_len,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_len))
+    if header["block_devices"] != BLOCK_DEVICES:
+        raise ValueError("Snapshot block size does not match this build")
+
+    data_start = _aligned(len(MAGIC) + 8 + header_len)
+    if mmap:
+        raw = np.memmap(path, dtype=np.uint8, mode="c")
+    else:
+        raw = np.fromfile(path, dtype=np.uint8)
+    data = raw[data_start:]
+
+    history = header["history"]
+    device_ids = header["devices"]
+    n_devices = len(device_ids)
+    blocks, tail, _ = _layout(n_devices, history, header["horizon_s"])
+
+    def section(offset: int, dtype, shape) -> np.ndarray:
+        count = int(np.prod(shape))
+        nbytes = count * np.dtype(dtype).itemsize
+        return data[offset:offset + nbytes].view(dtype).reshape(shape)
+
+    store = TelemetryRingStore(history)
+    store.device_ids = list(device_ids)
+    store.slots = {device_id: slot for slot, device_id in enumerate(device_ids)}
+    for offset, rows in blocks:
+        arrays = {}
+        for name, dtype in BLOCK_FIELDS:
+            arrays[name] = section(offset, dtype, (rows, history))
+            offset += _aligned(rows * history * np.dtype(dtype).itemsize)
+        if rows == BLOCK_DEVICES:
+            store.blocks.append(_Block.from_arrays(**arrays))
+        else:
+            # Último bloco incompleto: precisa de linhas livres para devices novos
+            block = _Block(history)
+            for name, array in arrays.items():
+                getattr(block, name)[:rows] = array
+            store.blocks.append(block)
+
+    slots = len(store.blocks) * BLOCK_DEVICES
+    store.heads = np.zeros(slots, dtype=np.int64)
+    store.heads[:n_devices] = section(tail["heads"], np.int64, (n_devices,))
+    store.ordered = np.ones(slots, dtype=bool)
+    store.ordered[:n_devices] = section(tail["ordered"], np.bool_, (n_devices,))
+
+    buckets = SecondBuckets(header["horizon_s"])
+    offset = tail["buckets"]
+    for name, dtype in BUCKET_FIELDS:
+        getattr(buckets, name)[:] = section(offset, dtype, (buckets.horizon_s,))
+        offset += _aligned(buckets.horizon_s * np.dtype(dtype).itemsize)
+    store.buckets = buckets
+    return store, header["extra"]
@@ -0,0 +1,310 @@
+"""
+MÓDULO: Armazenamento colunar em memória (modo sem banco)
+Anéis pré-alocados por device em blocos de arrays NumPy, sem um objeto
+por leitura
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from models import DeviceStatus, TelemetryEvent
+
+HISTORY_PER_DEVICE = 1000      # Leituras mantidas por device (como o deque anterior)
+BLOCK_DEVICES = 256            # Devices por bloco de arrays
+BUCKET_HORIZON_S = 3600        # Segundos cobertos pelos agregados por segundo
+TS_EMPTY = np.iinfo(np.int64).min
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _epoch_us(ts: datetime) -> int:
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    delta = ts - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _from_epoch_us(us: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=us)
+
+
+def _f64(value) -> Optional[float]:
+    return None if value != value else float(value)
+
+
+def _f32(value) -> Optional[float]:
+    # Menor decimal que identifica o float32: 72.3 volta como 72.3
+    return None if value != value else float(str(value))
+
+
+class _Block:
+    """Anéis de BLOCK_DEVICES devices: uma linha por device, uma coluna por posição"""
+
+    __slots__ = ("ts", "lat", "lon", "speed_kmh", "engine_temp_c", "battery_v")
+
+    def __init__(self, history: int):
+        shape = (BLOCK_DEVICES, history)
+        self.ts = np.full(shape, TS_EMPTY, dtype=np.int64)    # Epoch em microssegundos
+        self.lat = np.empty(shape, dtype=np.float64)
+        self.lon = np.empty(shape, dtype=np.float64)
+        self.speed_kmh = np.empty(shape, dtype=np.float32)
+        self.engine_temp_c = np.empty(shape, dtype=np.float32)
+        self.battery_v = np.empty(shape, dtype=np.float32)
+
+    @classmethod
+    def from_arrays(cls, **arrays: np.ndarray) -> "_Block":
+        """Bloco sobre arrays existentes (ex.: views de um snapshot mapeado)"""
+        block = cls.__new__(cls)
+        for name in cls.__slots__:
+            setattr(block, name, arrays[name])
+        return block
+
+
+class SecondBuckets:
+    """
+    Agregados por segundo (eventos, soma e contagem de velocidades)
+    em um anel de horizon_s segundos, atualizados na ingestão
+    """
+
+    def __init__(self, horizon_s: int = BUCKET_HORIZON_S):
+        self.horizon_s = horizon_s
+        self.second = np.full(horizon_s, -1, dtype=np.int64)
+        self.events = np.zeros(horizon_s, dtype=np.int64)
+        self.speed_sum = np.zeros(horizon_s, dtype=np.float64)
+        self.speed_n = np.zeros(horizon_s, dtype=np.int64)
+
+    def add(self, ts_us: int, speed: Optional[float]):
+        second = ts_us // 1_000_000
+        i = second % self.horizon_s
+        current = self.second[i]
+        if current != second:
+            if current > second:
+                return          # Mais antigo que o horizonte
+            self.second[i] = second
+            self.events[i] = 0
+            self.speed_sum[i] = 0.0
+            self.speed_n[i] = 0
+        self.events[i] += 1
+        if speed:
+            self.speed_sum[i] += speed
+            self.speed_n[i] += 1
+
+    def window(self, seconds: float, now_us: int) -> dict:
+        """Soma dos segundos a partir de now - seconds (precisão de 1 s)"""
+        start = (now_us - int(seconds * 1_000_000)) // 1_000_000
+        end = now_us // 1_000_000
+        if end - start >= self.horizon_s:
+            span = np.arange(self.horizon_s)
+        else:
+            span = np.arange(start, end + 1) % self.horizon_s
+        # Segundos já reciclados ou futuros além do horizonte ficam fora
+        valid = self.second[span] >= start
+        span = span[valid]
+        return {
+            "events": int(self.events[span].sum()),
+            "speed_sum": float(self.speed_sum[span].sum()),
+            "speed_n": int(self.speed_n[span].sum()),
+        }
+
+
+class TelemetryRingStore:
+    """
+    Últimas HISTORY_PER_DEVICE leituras de cada device
+
+    Timestamps em int64 (epoch µs, preserva o ts recebido), lat/lon em
+    float64 (float32 perderia ~1 m) e demais campos em float32; None vira
+    NaN. O estado mais recente é a última posição escrita do anel.
+
+    Métricas de janela vêm de SecondBuckets (O(segundos da janela));
+    buscas por tempo usam busca binária enquanto o anel do device estiver
+    em ordem de ts (um evento atrasado desliga a busca binária do device).
+    """
+
+    def __init__(self, history: int = HISTORY_PER_DEVICE):
+        self.history = history
+        self.slots: Dict[str, int] = {}
+        self.device_ids: List[str] = []
+        self.blocks: List[_Block] = []
+        self.heads = np.zeros(0, dtype=np.int64)       # Total escrito por slot
+        self.ordered = np.zeros(0, dtype=bool)         # Anel em ordem de ts
+        self.buckets = SecondBuckets()
+
+    def __len__(self) -> int:
+        return len(self.device_ids)
+
+    def _slot(self, device_id: str) -> int:
+        slot = self.slots.get(device_id)
+        if slot is None:
+            slot = self.slots[device_id] = len(self.device_ids)
+            self.device_ids.append(device_id)
+            if slot // BLOCK_DEVICES >= len(self.blocks):
+                self.blocks.append(_Block(self.history))
+                self.heads = np.concatenate((self.heads, np.zeros(BLOCK_DEVICES, dtype=np.int64)))
+                self.ordered = np.concatenate((self.ordered, np.ones(BLOCK_DEVICES, dtype=bool)))
+        return slot
+
+    def append(self, event: TelemetryEvent):
+        slot = self._slot(event.device_id)
+        block = self.blocks[slot // BLOCK_DEVICES]
+        row = slot % BLOCK_DEVICES
+        pos = self.heads[slot] % self.history
+        nan = float('nan')
+        ts_us = _epoch_us(event.ts)
+        head = self.heads[slot]
+        if head and ts_us < block.ts[row, (head - 1) % self.history]:
+            self.ordered[slot] = False
+
+        block.ts[row, pos] = ts_us
+        block.lat[row, pos] = nan if event.lat is None else event.lat
+        block.lon[row, pos] = nan if event.lon is None else event.lon
+        block.speed_kmh[row, pos] = nan if event.speed_kmh is None else event.speed_kmh
+        block.engine_temp_c[row, pos] = nan if event.engine_temp_c is None else event.engine_temp_c
+        block.battery_v[row, pos] = nan if event.battery_v is None else event.battery_v
+        self.heads[slot] += 1
+        self.buckets.add(ts_us, event.speed_kmh)
+
+    def _positions(self, slot: int) -> np.ndarray:
+        """Posições do anel em ordem cronológica de escrita"""
+        head = int(self.heads[slot])
+        if head <= self.history:
+            return np.arange(head)
+        start = head % self.history
+        return np.concatenate((np.arange(start, self.history), np.arange(start)))
+
+    def _positions_since(self, slot: int, since_us: int) -> np.ndarray:
+        """Posições com ts >= since, em ordem cronológica"""
+        block = self.blocks[slot // BLOCK_DEVICES]
+        row = slot % BLOCK_DEVICES
+        head = int(self.heads[slot])
+        if not self.ordered[slot]:
+            positions = self._positions(slot)
+            return positions[block.ts[row, positions] >= since_us]
+
+        ts = block.ts[row]
+        if head <= self.history:
+            k = int(np.searchsorted(ts[:head], since_us))
+            return np.arange(k, head)
+        # Anel cheio: [start, history) é o trecho mais antigo, [0, start) o mais novo
+        start = head % self.history
+        k_old = int(np.searchsorted(ts[start:], since_us)) + start
+        k_new = int(np.searchsorted(ts[:start], since_us))
+        return np.concatenate((np.arange(k_old, self.history), np.arange(k_new, start)))
+
+    def count(self, device_id: str) -> int:
+        slot = self.slots.get(device_id)
+        return 0 if slot is None else min(int(self.heads[slot]), self.history)
+
+    def events(
+        self,
+        device_id: str,
+        limit: Optional[int] = None,
+        since: Optional[datetime] = None
+    ) -> List[dict]:
+        """Leituras do device (mais antigas primeiro), opcionalmente a partir de since"""
+        slot = self.slots.get(device_id)
+        if slot is None:
+            return []
+        block = self.blocks[slot // BLOCK_DEVICES]
+        row = slot % BLOCK_DEVICES
+        if since is not None:
+            positions = self._positions_since(slot, _epoch_us(since))
+        else:
+            positions = self._positions(slot)
+        if limit is not None:
+            positions = positions[-limit:]
+
+        return [
+            {
+                "ts": _from_epoch_us(ts),
+                "lat": _f64(lat),
+                "lon": _f64(lon),
+                "speed_kmh": _f32(speed),
+                "engine_temp_c": _f32(temp),
+                "battery_v": _f32(battery),
+            }
+            for ts, lat, lon, speed, temp, battery in zip(
+                block.ts[row, positions].tolist(),
+                block.lat[row, positions].tolist(),
+                block.lon[row, positions].tolist(),
+                block.speed_kmh[row, positions],
+                block.engine_temp_c[row, positions],
+                block.battery_v[row, positions],
+            )
+        ]
+
+    def latest(self, device_id: str) -> Optional[dict]:
+        """Última leitura do device (lida direto da última posição escrita)"""
+        slot = self.slots.get(device_id)
+        if slot is None or self.heads[slot] == 0:
+            return None
+        block = self.blocks[slot // BLOCK_DEVICES]
+        row = slot % BLOCK_DEVICES
+        pos = int(self.heads[slot] - 1) % self.history
+        return {
+            "ts": _from_epoch_us(int(block.ts[row, pos])),
+            "lat": _f64(block.lat[row, pos]),
+            "lon": _f64(block.lon[row, pos]),
+            "speed_kmh": _f32(block.speed_kmh[row, pos]),
+            "engine_temp_c": _f32(block.engine_temp_c[row, pos]),
+            "battery_v": _f32(block.battery_v[row, pos]),
+        }
+
+    def statuses(self) -> List[DeviceStatus]:
+        """
+        DeviceStatus de todos os devices (montado na leitura, não na escrita)
+        Uma leitura por device: a última posição de cada linha do bloco
+        """
+        result = []
+        for b, block in enumerate(self.blocks):
+            first = b * BLOCK_DEVICES
+            device_ids = self.device_ids[first:first + BLOCK_DEVICES]
+            rows = np.arange(len(device_ids))
+            heads = self.heads[first:first + len(device_ids)]
+            pos = (heads - 1) % self.history
+            for device_id, head, ts, lat, lon, speed, temp, battery in zip(
+                device_ids, heads.tolist(),
+                block.ts[rows, pos].tolist(),
+                block.lat[rows, pos].tolist(),
+                block.lon[rows, pos].tolist(),
+                block.speed_kmh[rows, pos],
+                block.engine_temp_c[rows, pos],
+                block.battery_v[rows, pos],
+            ):
+                if not head:
+                    continue
+                result.append(DeviceStatus(
+                    device_id=device_id,
+                    online=True,
+                    last_seen=_from_epoch_us(ts),
+                    last_lat=_f64(lat),
+                    last_lon=_f64(lon),
+                    last_speed=_f32(speed),
+                    last_temp=_f32(temp),
+                    last_battery=_f32(battery)
+                ))
+        return result
+
+    def window_stats(self, seconds: float, now: Optional[datetime] = None) -> dict:
+        """Leituras dos últimos N segundos e soma/contagem de velocidades (ignora 0/ausente)"""
+        now = now or datetime.now(timezone.utc)
+        now_us = _epoch_us(now)
+        if seconds < self.buckets.horizon_s:
+            return self.buckets.window(seconds, now_us)
+
+        # Além do horizonte dos agregados: varre os anéis
+        cutoff = now_us - int(seconds * 1_000_000)
+        events = 0
+        speed_sum = 0.0
+        speed_n = 0
+        used = len(self.device_ids)
+        for b, block in enumerate(self.blocks):
+            rows = min(BLOCK_DEVICES, used - b * BLOCK_DEVICES)
+            recent = block.ts[:rows] >= cutoff
+            events += int(np.count_nonzero(recent))
+            speeds = block.speed_kmh[:rows][recent]
+            moving = speeds[~np.isnan(speeds) & (speeds != 0)]
+            speed_sum += float(moving.astype(np.float64).sum())
+            speed_n += len(moving)
+        return {"events": events, "speed_sum": speed_sum, "speed_n": speed_n}
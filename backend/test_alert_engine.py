@@ -0,0 +1,115 @@
+"""
+Motor de alertas (alert_engine.py) e gravação dos alertas no flush
+
+Uso (dentro de backend/):
+    python -m pytest -q test_alert_engine.py
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from alert_engine import AlertEngine
+from config import settings
+from database_sqlite import SQLiteDatabase
+from models import AlertRule, TelemetryEvent
+
+T0 = datetime(2026, 1, 5, 8, 0, tzinfo=timezone.utc)
+
+HOT = AlertRule(
+    rule_id="hot", alert_type="engine_temp", metric="engine_temp_c", operator="gt",
+    threshold=105.0, duration_s=30.0, cooldown_s=300.0,
+    message="{value:.0f} > {threshold:.0f}"
+)
+FAST = AlertRule(
+    rule_id="fast", alert_type="high_speed", metric="speed_kmh", operator="gt",
+    threshold=90.0, cooldown_s=60.0, message="{value:.0f} km/h"
+)
+
+
+def _event(seconds: float, device_id: str = "AL-1", temp: float = None, speed: float = None,
+           now: datetime = T0) -> TelemetryEvent:
+    return TelemetryEvent(
+        device_id=device_id, ts=now + timedelta(seconds=seconds),
+        engine_temp_c=temp, speed_kmh=speed
+    )
+
+
+def _run(engine: AlertEngine, events) -> list:
+    fired = []
+    for event in events:
+        fired.extend(engine.process(event))
+    return fired
+
+
+def test_debounce_fires_once_sustained():
+    engine = AlertEngine([HOT])
+    fired = _run(engine, [_event(s, temp=110) for s in (0, 10, 20, 30, 40, 50)])
+    assert len(fired) == 1
+    assert fired[0]["ts"] == T0 + timedelta(seconds=30)
+    assert fired[0]["rule_id"] == "hot" and fired[0]["message"] == "110 > 105"
+
+
+def test_debounce_not_reached():
+    engine = AlertEngine([HOT])
+    # Condição interrompida antes de 30 s: o episódio recomeça
+    events = [_event(0, temp=110), _event(20, temp=110), _event(25, temp=100),
+              _event(30, temp=110), _event(50, temp=110)]
+    assert _run(engine, events) == []
+
+
+def test_cooldown_suppresses_new_episode():
+    engine = AlertEngine([FAST])
+    events = [
+        _event(0, speed=100),       # dispara
+        _event(10, speed=80),       # fim do episódio
+        _event(20, speed=100),      # novo episódio dentro do cooldown: suprimido
+        _event(30, speed=80),
+        _event(70, speed=100),      # após 60 s: dispara
+    ]
+    fired = _run(engine, events)
+    assert [a["ts"] for a in fired] == [T0, T0 + timedelta(seconds=70)]
+
+
+def test_devices_have_separate_state():
+    engine = AlertEngine([HOT, FAST])
+    events = [
+        _event(0, "AL-1", temp=110), _event(0, "AL-2", speed=120),
+        _event(20, "AL-1", temp=110), _event(20, "AL-2", speed=120),
+        _event(30, "AL-2", temp=110),    # AL-2 só começou agora: sem disparo
+        _event(35, "AL-1", temp=110),    # AL-1 sustentado por 35 s: dispara
+    ]
+    fired = _run(engine, events)
+    assert [(a["device_id"], a["rule_id"]) for a in fired] == [("AL-2", "fast"), ("AL-1", "hot")]
+
+
+def test_device_rule_overrides_fleet_rule():
+    strict = FAST.model_copy(update={"device_id": "AL-2", "threshold": 50.0})
+    engine = AlertEngine([FAST, strict])
+    assert _run(engine, [_event(0, "AL-1", speed=60)]) == []
+    assert len(_run(engine, [_event(0, "AL-2", speed=60)])) == 1
+
+
+def test_alerts_written_with_flush_and_counted(tmp_path, monkeypatch):
+    # batch_size pequeno: add_to_buffer dispara o flush (sem deadlock no lock do buffer)
+    monkeypatch.setattr(settings, "batch_size", 3)
+    now = datetime.now(timezone.utc) - timedelta(minutes=2)
+    engine = AlertEngine([FAST])
+
+    async def run():
+        db = SQLiteDatabase(str(tmp_path / "alerts.db"))
+        await db.connect()
+        try:
+            for i, device_id in enumerate(["AL-1", "AL-2", "AL-1", "AL-3"]):
+                event = _event(i, device_id, speed=100 if device_id != "AL-3" else 50, now=now)
+                fired = engine.process(event)
+                if fired:
+                    await db.add_alerts(fired)
+                await asyncio.wait_for(db.add_to_buffer(event), timeout=5)
+            await db.flush_buffer()
+            return await db.get_alerts(), await db.get_metrics_summary()
+        finally:
+            await db.disconnect()
+
+    alerts, metrics = asyncio.run(run())
+    assert sorted(a["device_id"] for a in alerts) == ["AL-1", "AL-2"]
+    assert metrics["alerts_last_10min"] == 2
@@ -0,0 +1,206 @@
+"""
+Resumo diário de combustível (daily_summary.py): job, reparo de dias e backfill
+
+Uso (dentro de backend/):
+    python -m pytest -q test_daily_summary.py
+"""
+
+import asyncio
+import sys
+from datetime import date, datetime, timedelta, timezone
+
+import database
+from daily_summary import DailySummarizer, backfill, day_bounds, main, previous_period, summarize_day
+from database_sqlite import SQLiteDatabase
+from fuel_economy import DEFAULT_FUEL_CONFIG, analyze_device, config_hash
+from models import TelemetryEvent
+
+DAY = date(2026, 1, 5)
+NEXT_DAY = date(2026, 1, 6)
+
+
+class _SlowDb:
+    """flush_buffer bloqueia até ser liberado; conta os resumos gravados"""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.flushing = asyncio.Event()
+        self.upserts = []
+
+    async def flush_buffer(self):
+        self.flushing.set()
+        await self.release.wait()
+
+    async def iter_fleet_columns(self, start, end, device_ids=None):
+        return
+        yield
+
+    async def upsert_daily_summaries(self, rows):
+        self.upserts.append(rows)
+
+
+def _summarizer(db) -> DailySummarizer:
+    summarizer = DailySummarizer(db, DEFAULT_FUEL_CONFIG, interval_s=0.0)
+    summarizer.mark(TelemetryEvent(device_id="DS-1", ts=datetime(2026, 1, 5, 9, tzinfo=timezone.utc)))
+    return summarizer
+
+
+def test_cancelled_round_keeps_dirty():
+    async def run():
+        db = _SlowDb()
+        summarizer = _summarizer(db)
+        task = asyncio.create_task(summarizer.run_once())
+        await db.flushing.wait()
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return summarizer.dirty
+
+    assert asyncio.run(run()) == {DAY: {"DS-1"}}
+
+
+def test_stop_waits_for_loop_before_final_round():
+    async def run():
+        db = _SlowDb()
+        summarizer = _summarizer(db)
+        summarizer.start()
+        await db.flushing.wait()
+        db.release.set()
+        await summarizer.stop()
+        return summarizer, db
+
+    summarizer, db = asyncio.run(run())
+    assert summarizer.dirty == {} and summarizer.task is None
+    assert len(db.upserts) == 1
+
+
+def test_previous_period_does_not_overlap_window():
+    # Janela de 24 h às 00:30: começa ontem 00:30, então o anterior é anteontem
+    end = datetime(2026, 1, 5, 0, 30, tzinfo=timezone.utc)
+    assert previous_period(end, 24) == (date(2026, 1, 3), date(2026, 1, 3))
+    # Qualquer hora do dia: a janela sempre toca ontem, que fica de fora
+    end = datetime(2026, 1, 5, 23, 59, tzinfo=timezone.utc)
+    assert previous_period(end, 24) == (date(2026, 1, 3), date(2026, 1, 3))
+    end = datetime(2026, 1, 5, 0, 0, tzinfo=timezone.utc)
+    assert previous_period(end, 24) == (date(2026, 1, 3), date(2026, 1, 3))
+    # 7 dias: sete dias inteiros antes do dia em que a janela começa
+    end = datetime(2026, 1, 15, 12, 0, tzinfo=timezone.utc)
+    assert previous_period(end, 168) == (date(2026, 1, 1), date(2026, 1, 7))
+
+
+# ==================== COM SQLITE ====================
+
+def _trip(device_id: str, day: date, hour: int, speed: float = 50.0) -> list:
+    """20 min de leituras a cada 10 s: rodando, parado em marcha lenta e picos bruscos"""
+    start = day_bounds(day)[0] + timedelta(hours=hour)
+    events = []
+    for i in range(120):
+        v = 0.0 if 40 <= i < 70 else speed + (25.0 if i % 30 == 0 else 0.0)
+        events.append(TelemetryEvent(
+            device_id=device_id, ts=start + timedelta(seconds=10 * i),
+            lat=-23.55 + i * 2e-4, lon=-46.63, speed_kmh=v
+        ))
+    return events
+
+
+async def _seed(db, events):
+    for event in events:
+        await db.add_to_buffer(event)
+    await db.flush_buffer()
+
+
+async def _rows(db) -> dict:
+    rows = await db._fetch(
+        "SELECT device_id, day, events, idle_hours, harsh_events, distance_km, "
+        "estimated_waste, updated_at FROM fuel_daily_summary"
+    )
+    return {(r['device_id'], r['day']): dict(r) for r in rows}
+
+
+def _with_db(tmp_path, fn):
+    async def run():
+        db = SQLiteDatabase(str(tmp_path / "summary.db"))
+        await db.connect()
+        try:
+            return await fn(db)
+        finally:
+            await db.disconnect()
+    return asyncio.run(run())
+
+
+def test_summarize_day_matches_reference(tmp_path):
+    events = _trip("DS-1", DAY, 8)
+
+    async def fn(db):
+        await _seed(db, events)
+        start, end = day_bounds(DAY)
+        return [summarize_day(d, cols, DAY, DEFAULT_FUEL_CONFIG)
+                async for d, cols in db.iter_fleet_columns(start, end)]
+
+    (row,) = _with_db(tmp_path, fn)
+    reference = analyze_device("DS-1", [e.model_dump() for e in events], DEFAULT_FUEL_CONFIG)
+    assert row["device_id"] == "DS-1" and row["day"] == DAY
+    assert row["config_hash"] == config_hash(DEFAULT_FUEL_CONFIG)
+    assert row["events"] == 120 == reference.events
+    assert row["idle_hours"] > 0 and row["harsh_events"] > 0 and row["distance_km"] > 0
+    assert abs(row["idle_hours"] - reference.idle_hours) < 1e-9
+    assert row["harsh_events"] == reference.harsh_events
+    assert abs(row["distance_km"] - reference.distance_km) < 1e-6
+    assert abs(row["estimated_waste"] - reference.score.estimated_waste) < 1e-6
+
+
+def test_recomputes_only_dirty_pairs_and_repairs_late_day(tmp_path):
+    async def fn(db):
+        summarizer = DailySummarizer(db, DEFAULT_FUEL_CONFIG, interval_s=3600)
+        events = [e for d in ("DS-1", "DS-2") for day in (DAY, NEXT_DAY) for e in _trip(d, day, 8)]
+        await _seed(db, events)
+        for event in events:
+            summarizer.mark(event)
+        assert await summarizer.run_once() == 4
+        before = await _rows(db)
+
+        # Evento atrasado de DS-1 no primeiro dia, chegando depois dos do dia seguinte
+        late = _trip("DS-1", DAY, 15, speed=80.0)
+        await _seed(db, late)
+        for event in late:
+            summarizer.mark(event)
+        assert summarizer.dirty == {DAY: {"DS-1"}}
+        assert await summarizer.run_once() == 1
+        assert await summarizer.run_once() == 0
+        return before, await _rows(db)
+
+    before, after = _with_db(tmp_path, fn)
+    key = ("DS-1", DAY.isoformat())
+    assert after[key]["events"] == 240 and before[key]["events"] == 120
+    assert after[key]["distance_km"] > before[key]["distance_km"]
+    assert after[key]["updated_at"] > before[key]["updated_at"]
+    for other in (("DS-2", DAY.isoformat()), ("DS-1", NEXT_DAY.isoformat()), ("DS-2", NEXT_DAY.isoformat())):
+        assert after[other] == before[other]
+
+
+def test_backfill_cli(tmp_path, monkeypatch, capsys):
+    path = str(tmp_path / "summary.db")
+
+    async def seed():
+        db = SQLiteDatabase(path)
+        await db.connect()
+        try:
+            await _seed(db, _trip("DS-1", DAY, 8) + _trip("DS-2", NEXT_DAY, 9))
+        finally:
+            await db.disconnect()
+
+    asyncio.run(seed())
+    monkeypatch.setattr(database, "db", SQLiteDatabase(path))
+    monkeypatch.setattr(sys, "argv", [
+        "daily_summary.py", "backfill", "--start", "2026-01-04", "--end", "2026-01-06"
+    ])
+    main()
+    assert capsys.readouterr().out.splitlines() == [
+        "2026-01-04: 0 devices", "2026-01-05: 1 devices", "2026-01-06: 1 devices"
+    ]
+
+    # Recalcular de novo é idempotente (upsert)
+    monkeypatch.setattr(database, "db", SQLiteDatabase(path))
+    asyncio.run(backfill(DAY, NEXT_DAY, DEFAULT_FUEL_CONFIG))
+    rows = _with_db(tmp_path, _rows)
+    assert sorted(rows) == [("DS-1", "2026-01-05"), ("DS-2", "2026-01-06")]
+    assert rows[("DS-2", "2026-01-06")]["events"] == 120
@@ -0,0 +1,115 @@
+"""
+Backend SQLite (database_sqlite.py): gravação em lote e consultas
+
+Uso (dentro de backend/):
+    python -m pytest -q test_database_sqlite.py
+"""
+
+import asyncio
+import sqlite3
+from datetime import date, datetime, timedelta, timezone
+
+from database_sqlite import SQLiteDatabase
+from models import TelemetryEvent
+
+NOW = datetime.now(timezone.utc).replace(microsecond=123456)
+
+
+def _trip(device_id: str, start: datetime, kind: str, distance_km: float) -> dict:
+    return {
+        'device_id': device_id, 'kind': kind, 'start_ts': start, 'end_ts': start + timedelta(minutes=10),
+        'duration_s': 600.0, 'distance_km': distance_km, 'idle_s': 0.0, 'harsh_events': 0,
+        'events': 10, 'max_speed_kmh': 80.0, 'start_lat': -23.5, 'start_lon': -46.6,
+        'end_lat': -23.6, 'end_lon': -46.7,
+    }
+
+
+async def _run(path: str) -> dict:
+    db = SQLiteDatabase(path)
+    await db.connect()
+    try:
+        for i in range(5):
+            await db.add_to_buffer(TelemetryEvent(
+                device_id=f'SQ-{i % 2}', ts=NOW - timedelta(seconds=10 - i),
+                lat=-23.55, lon=-46.63, speed_kmh=40.0 + i, battery_v=None
+            ))
+        await db.add_alerts([{
+            'device_id': 'SQ-0', 'ts': NOW, 'alert_type': 'overheat', 'rule_id': 'temp',
+            'value': 110.0, 'message': 'hot'
+        }])
+        await db.add_trips([
+            _trip('SQ-0', NOW - timedelta(hours=2), 'trip', 12.5),
+            _trip('SQ-0', NOW - timedelta(hours=1), 'stop', 0.0),
+            _trip('SQ-1', NOW - timedelta(hours=1), 'trip', 3.0),
+        ])
+        await db.flush_buffer()
+        summary = {
+            'device_id': 'SQ-0', 'day': date(2026, 1, 5), 'events': 10, 'idle_hours': 0.5,
+            'harsh_events': 1, 'distance_km': 20.0, 'idle_cost': 2.0,
+            'aggressive_cost': 1.0, 'estimated_waste': 3.0, 'config_hash': 'test',
+        }
+        await db.upsert_daily_summaries([summary])
+        await db.upsert_daily_summaries([{**summary, 'events': 12}])
+        return {
+            'devices': await db.get_devices(),
+            'latest': await db.get_device_latest('SQ-0'),
+            'events': await db.get_device_events('SQ-1'),
+            'metrics': await db.get_metrics_summary(),
+            'alerts': await db.get_alerts(),
+            'trips': await db.get_trips(device_id='SQ-0'),
+            'long_trips': await db.get_trips(kind='trip', min_distance_km=5),
+            'totals': await db.get_daily_summary_totals(date(2026, 1, 1), date(2026, 1, 31)),
+        }
+    finally:
+        await db.disconnect()
+
+
+def test_sqlite_round_trip(tmp_path):
+    result = asyncio.run(_run(str(tmp_path / 'monitora.db')))
+
+    assert [d.device_id for d in result['devices']] == ['SQ-0', 'SQ-1']
+    assert all(d.online for d in result['devices'])
+    assert result['latest']['ts'] == NOW - timedelta(seconds=6)
+    assert result['latest']['speed_kmh'] == 44.0
+    assert result['latest']['battery_v'] is None
+    assert [e['speed_kmh'] for e in result['events']] == [43.0, 41.0]   # Mais recentes primeiro
+
+    assert result['metrics'] == {
+        'devices_online': 2, 'events_last_minute': 5, 'avg_speed_5min': 42.0, 'alerts_last_10min': 1
+    }
+    assert result['alerts'][0]['ts'] == NOW
+
+    assert [t['kind'] for t in result['trips']] == ['stop', 'trip']
+    assert result['trips'][1]['start_ts'] == NOW - timedelta(hours=2)
+    assert [(t['device_id'], t['distance_km']) for t in result['long_trips']] == [('SQ-0', 12.5)]
+
+    assert result['totals']['device_days'] == 1
+    assert result['totals']['events'] == 12
+    assert result['totals']['configs'] == 1
+
+
+def test_adds_config_hash_to_old_files(tmp_path):
+    path = str(tmp_path / 'old.db')
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE fuel_daily_summary (device_id TEXT NOT NULL, day TEXT NOT NULL, "
+        "events INTEGER NOT NULL, idle_hours REAL NOT NULL, harsh_events INTEGER NOT NULL, "
+        "distance_km REAL NOT NULL, idle_cost REAL NOT NULL, aggressive_cost REAL NOT NULL, "
+        "estimated_waste REAL NOT NULL, updated_at INTEGER NOT NULL, PRIMARY KEY (device_id, day))"
+    )
+    conn.close()
+
+    async def run():
+        db = SQLiteDatabase(path)
+        await db.connect()
+        try:
+            await db.upsert_daily_summaries([{
+                'device_id': 'SQ-0', 'day': date(2026, 1, 5), 'events': 1, 'idle_hours': 0.0,
+                'harsh_events': 0, 'distance_km': 1.0, 'idle_cost': 0.0,
+                'aggressive_cost': 0.0, 'estimated_waste': 0.0, 'config_hash': 'abc',
+            }])
+            return await db._fetchone("SELECT config_hash FROM fuel_daily_summary")
+        finally:
+            await db.disconnect()
+
+    assert asyncio.run(run())['config_hash'] == 'abc'
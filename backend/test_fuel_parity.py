@@ -0,0 +1,310 @@
+"""
+Paridade entre fuel_economy.py (loops Python), o analisador de passada
+única (analyze_device), fuel_kernels.py (NumPy), a agregação no Postgres
+e o backend SQLite
+
+Uso (dentro de backend/):
+    python -m pytest -q test_fuel_parity.py
+    DATABASE_URL=postgresql://... python -m pytest -q test_fuel_parity.py   # inclui SQL
+"""
+
+import asyncio
+import os
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from fuel_economy import (
+    analyze_device,
+    profile_from_totals,
+    calculate_idle_waste,
+    calculate_aggressive_driving_waste,
+    calculate_total_distance,
+    calculate_waste_breakdown,
+    calculate_driver_score,
+)
+from fuel_kernels import (
+    analyze_device_columns,
+    columns_from_events,
+    idle_hours_columns,
+    harsh_events_columns,
+    total_distance_columns,
+    calculate_waste_breakdown_columns,
+    calculate_driver_score_columns,
+)
+from fuel_accumulators import DeviceAccumulator
+from models import FuelConfig, TelemetryEvent
+
+CONFIG = FuelConfig(fuel_price=5.80, expected_kml=8.5, idle_consumption_lh=0.8)
+START = datetime(2026, 1, 5, 8, 0, tzinfo=timezone.utc)
+
+
+# ==================== FIXTURES COMPARTILHADAS ====================
+
+def _random_walk(n: int, seed: int, interval_s: float = 1.0) -> list:
+    """Trajeto com paradas, acelerações bruscas e jitter de intervalo"""
+    rng = random.Random(seed)
+    lat, lon, speed = -23.5505, -46.6333, 40.0
+    ts = START
+    events = []
+    for _ in range(n):
+        phase = rng.random()
+        if phase < 0.15:
+            speed = rng.uniform(0, 4)
+        elif phase < 0.25:
+            speed = max(0.0, speed + rng.choice([-1, 1]) * rng.uniform(5, 20))
+        else:
+            speed = max(0.0, min(110.0, speed + rng.uniform(-1.5, 1.5)))
+        lat += rng.uniform(-0.0002, 0.0002)
+        lon += rng.uniform(-0.0002, 0.0002)
+        ts += timedelta(seconds=interval_s * rng.choice([1, 1, 1, 2, 0.5]))
+        events.append({
+            'device_id': 'TRK-001',
+            'ts': ts,
+            'lat': lat,
+            'lon': lon,
+            'speed_kmh': round(speed, 2),
+        })
+    return events
+
+
+def _with_gaps(events: list) -> list:
+    """Valores ausentes, zeros e timestamps repetidos"""
+    events = [dict(e) for e in events]
+    for i, e in enumerate(events):
+        if i % 17 == 0:
+            e['speed_kmh'] = None
+        if i % 23 == 0:
+            e['lat'] = None
+        if i % 29 == 0:
+            e['lon'] = 0
+        if i % 31 == 0 and i > 0:
+            e['ts'] = events[i - 1]['ts']
+    return events
+
+
+def _as_iso_strings(events: list) -> list:
+    return [
+        {**e, 'ts': e['ts'].isoformat().replace('+00:00', 'Z')}
+        for e in events
+    ]
+
+
+FIXTURES = {
+    'empty': [],
+    'single': _random_walk(1, seed=1),
+    'ascending': _random_walk(2000, seed=2),
+    'descending': list(reversed(_random_walk(2000, seed=3))),
+    'gaps': _with_gaps(_random_walk(2000, seed=4)),
+    'iso_strings': _as_iso_strings(_random_walk(500, seed=5)),
+    'stopped': [
+        {**e, 'speed_kmh': 0.0, 'lat': -23.5, 'lon': -46.6}
+        for e in _random_walk(300, seed=6)
+    ],
+}
+
+
+@pytest.fixture(params=sorted(FIXTURES))
+def events(request):
+    return FIXTURES[request.param]
+
+
+# ==================== TESTES ====================
+
+def test_idle_hours_match(events):
+    expected = calculate_idle_waste(events, CONFIG)
+    cols = columns_from_events(events)
+    hours = idle_hours_columns(cols)
+    assert round(hours, 2) == expected['hours']
+    assert round(hours * CONFIG.idle_consumption_lh * CONFIG.fuel_price, 2) == expected['cost']
+
+
+def test_harsh_events_match(events):
+    expected = calculate_aggressive_driving_waste(events, CONFIG)
+    assert harsh_events_columns(columns_from_events(events)) == expected['events']
+
+
+def test_total_distance_match(events):
+    assert total_distance_columns(columns_from_events(events)) == calculate_total_distance(events)
+
+
+@pytest.mark.parametrize('optimal_km', [None, 1.0])
+def test_waste_breakdown_match(events, optimal_km):
+    expected = calculate_waste_breakdown(events, CONFIG, optimal_km)
+    actual = calculate_waste_breakdown_columns(columns_from_events(events), CONFIG, optimal_km)
+    assert actual == expected
+
+
+def test_driver_score_match(events):
+    expected = calculate_driver_score('TRK-001', events, CONFIG)
+    actual = calculate_driver_score_columns('TRK-001', columns_from_events(events), CONFIG)
+    assert actual == expected
+
+
+@pytest.mark.parametrize('optimal_km', [None, 1.0])
+def test_fused_profile_match(events, optimal_km):
+    profile = analyze_device('TRK-001', events, CONFIG, optimal_km)
+    assert profile.events == len(events)
+    assert profile.harsh_events == calculate_aggressive_driving_waste(events, CONFIG)['events']
+    assert profile.distance_km == calculate_total_distance(events)
+    assert profile.waste == calculate_waste_breakdown(events, CONFIG, optimal_km)
+    assert profile.score == calculate_driver_score('TRK-001', events, CONFIG)
+
+
+@pytest.mark.parametrize('optimal_km', [None, 1.0])
+def test_columnar_profile_match(events, optimal_km):
+    expected = analyze_device('TRK-001', events, CONFIG, optimal_km)
+    actual = analyze_device_columns('TRK-001', columns_from_events(events), CONFIG, optimal_km)
+    assert actual == expected
+
+
+@pytest.mark.parametrize('name', ['single', 'ascending', 'gaps', 'stopped'])
+def test_accumulator_columns_match(name):
+    events = FIXTURES[name]
+    per_event = DeviceAccumulator(72)
+    for e in events:
+        per_event.add(e['ts'].timestamp(), e['lat'], e['lon'], e['speed_kmh'])
+    vectorized = DeviceAccumulator(72)
+    half = len(events) // 2
+    vectorized.add_columns(columns_from_events(events[:half]))
+    vectorized.add_columns(columns_from_events(events[half:]))
+
+    now = START.timestamp() + 86400
+    expected = per_event.totals(72, now)
+    actual = vectorized.totals(72, now)
+    assert actual[0] == expected[0] and actual[2] == expected[2]
+    assert actual[1] == pytest.approx(expected[1], rel=1e-12)
+    assert actual[3] == pytest.approx(expected[3], rel=1e-12)
+
+
+# ==================== PARIDADE SQL (requer Postgres) ====================
+
+SQL_START = datetime(2001, 1, 1, tzinfo=timezone.utc)
+SQL_FIXTURES = {
+    f'PARITY-{name}': [{**e, 'ts': SQL_START + (e['ts'] - START)} for e in FIXTURES[name]]
+    for name in ('single', 'ascending', 'gaps', 'stopped')
+}
+
+
+async def _sql_totals() -> dict:
+    from database import db
+
+    await db.connect()
+    try:
+        async with db.pool.acquire() as conn:
+            await conn.execute("DELETE FROM telemetry_events WHERE device_id LIKE 'PARITY-%'")
+            await conn.executemany(
+                """
+                INSERT INTO telemetry_events (device_id, ts, lat, lon, speed_kmh)
+                VALUES ($1, $2, $3, $4, $5)
+                """,
+                [(device_id, e['ts'], e['lat'], e['lon'], e['speed_kmh'])
+                 for device_id, events in SQL_FIXTURES.items() for e in events]
+            )
+        end = SQL_START + timedelta(days=30)
+        try:
+            rows = await db.get_fuel_aggregates(SQL_START, end)
+            streamed = {
+                device_id: analyze_device(device_id, events, CONFIG)
+                async for device_id, events in db.get_all_devices_events_period(SQL_START, end)
+            }
+            columnar = {
+                device_id: analyze_device_columns(device_id, cols, CONFIG)
+                async for device_id, cols in db.iter_fleet_columns(SQL_START, end)
+            }
+        finally:
+            async with db.pool.acquire() as conn:
+                await conn.execute("DELETE FROM telemetry_events WHERE device_id LIKE 'PARITY-%'")
+        return {
+            row['device_id']: {
+                **dict(row),
+                'streamed': streamed[row['device_id']],
+                'columnar': columnar[row['device_id']],
+            }
+            for row in rows if row['device_id'].startswith('PARITY-')
+        }
+    finally:
+        await db.disconnect()
+
+
+@pytest.fixture(scope='module')
+def sql_totals():
+    if not os.getenv('DATABASE_URL'):
+        pytest.skip('DATABASE_URL não definido')
+    return asyncio.run(_sql_totals())
+
+
+@pytest.mark.parametrize('device_id', sorted(SQL_FIXTURES))
+def test_sql_aggregates_match(sql_totals, device_id):
+    events = SQL_FIXTURES[device_id]
+    expected = analyze_device(device_id, events, CONFIG)
+    row = sql_totals[device_id]
+
+    # Contagens idênticas; somas em float diferem só na ordem de soma do Postgres
+    assert row['events'] == expected.events
+    assert row['harsh_events'] == expected.harsh_events
+    assert row['idle_hours'] == pytest.approx(expected.idle_hours, rel=1e-9, abs=1e-12)
+    assert row['distance_km'] == pytest.approx(expected.distance_km, rel=1e-9, abs=1e-12)
+
+    profile = profile_from_totals(
+        device_id, row['events'], row['idle_hours'], row['harsh_events'],
+        row['distance_km'], CONFIG
+    )
+    assert profile.waste == expected.waste
+    assert profile.score == expected.score
+
+    # Leituras por cursor (eventos e colunas) reproduzem a análise em memória
+    assert row['streamed'] == expected
+    assert row['columnar'] == expected
+
+
+# ==================== PARIDADE SQLITE ====================
+
+async def _sqlite_totals(path: str) -> dict:
+    from database_sqlite import SQLiteDatabase
+
+    db = SQLiteDatabase(path)
+    await db.connect()
+    try:
+        await db._insert_events(
+            [TelemetryEvent(**{**e, 'device_id': device_id}) for device_id, events in SQL_FIXTURES.items() for e in events],
+            [], [], []
+        )
+        end = SQL_START + timedelta(days=30)
+        rows = await db.get_fuel_aggregates(SQL_START, end)
+        streamed = {
+            device_id: analyze_device(device_id, events, CONFIG)
+            async for device_id, events in db.get_all_devices_events_period(SQL_START, end)
+        }
+        columnar = {
+            device_id: analyze_device_columns(device_id, cols, CONFIG)
+            async for device_id, cols in db.iter_fleet_columns(SQL_START, end)
+        }
+        single = await db.get_fuel_aggregates(SQL_START, end, 'PARITY-gaps')
+    finally:
+        await db.disconnect()
+    assert single == [row for row in rows if row['device_id'] == 'PARITY-gaps']
+    return {
+        row['device_id']: {**row, 'streamed': streamed[row['device_id']], 'columnar': columnar[row['device_id']]}
+        for row in rows
+    }
+
+
+@pytest.fixture(scope='module')
+def sqlite_totals(tmp_path_factory):
+    return asyncio.run(_sqlite_totals(str(tmp_path_factory.mktemp('sqlite') / 'parity.db')))
+
+
+@pytest.mark.parametrize('device_id', sorted(SQL_FIXTURES))
+def test_sqlite_aggregates_match(sqlite_totals, device_id):
+    expected = analyze_device(device_id, SQL_FIXTURES[device_id], CONFIG)
+    row = sqlite_totals[device_id]
+
+    # Totais vêm dos kernels colunares: iguais à análise em memória
+    assert profile_from_totals(
+        device_id, row['events'], row['idle_hours'], row['harsh_events'],
+        row['distance_km'], CONFIG
+    ) == expected
+    assert row['streamed'] == expected
+    assert row['columnar'] == expected
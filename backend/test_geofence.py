@@ -0,0 +1,116 @@
+"""
+Motor de geofences (geofence.py): R-tree, point-in-polygon e transições
+
+Uso (dentro de backend/):
+    python -m pytest -q test_geofence.py
+"""
+
+import random
+from datetime import datetime, timedelta, timezone
+
+from geofence import GeofenceEngine, RTree, point_in_polygon, polygon_bbox
+from models import Geofence, TelemetryEvent
+
+T0 = datetime(2026, 1, 5, 8, 0, tzinfo=timezone.utc)
+SQUARE = [(0.0, 0.0), (0.0, 1.0), (1.0, 1.0), (1.0, 0.0)]
+
+
+def _square(fence_id: int, lat: float, lon: float, size: float = 1.0, name: str = None) -> Geofence:
+    return Geofence(
+        id=fence_id, name=name or f"F{fence_id}",
+        polygon=[(lat, lon), (lat, lon + size), (lat + size, lon + size), (lat + size, lon)]
+    )
+
+
+def _event(seconds: float, lat: float, lon: float, device_id: str = "GF-1") -> TelemetryEvent:
+    return TelemetryEvent(device_id=device_id, ts=T0 + timedelta(seconds=seconds), lat=lat, lon=lon)
+
+
+def test_rtree_matches_brute_force():
+    rng = random.Random(7)
+    boxes = []
+    for i in range(500):
+        lat, lon = rng.uniform(-24, -23), rng.uniform(-47, -46)
+        boxes.append(((lat, lon, lat + rng.uniform(0, 0.1), lon + rng.uniform(0, 0.1)), i))
+    tree = RTree(boxes, capacity=8)
+
+    points = [(rng.uniform(-24.05, -22.95), rng.uniform(-47.05, -45.95)) for _ in range(2000)]
+    # Cantos das caixas: limites são inclusivos
+    points += [(b[0], b[1]) for b, _ in boxes[:50]] + [(b[2], b[3]) for b, _ in boxes[:50]]
+    for lat, lon in points:
+        expected = {p for b, p in boxes if b[0] <= lat <= b[2] and b[1] <= lon <= b[3]}
+        assert set(tree.query_point(lat, lon)) == expected
+
+
+def test_rtree_empty_and_single():
+    assert RTree([]).query_point(0.0, 0.0) == []
+    tree = RTree([(polygon_bbox(SQUARE), 1)])
+    assert tree.query_point(0.5, 0.5) == [1]
+    assert tree.query_point(1.5, 0.5) == []
+
+
+def test_polygon_edges_and_vertices():
+    # Ray casting semiaberto: bordas inferior/esquerda dentro, superior/direita fora
+    assert point_in_polygon(0.5, 0.5, SQUARE)
+    assert point_in_polygon(0.0, 0.5, SQUARE)
+    assert point_in_polygon(0.5, 0.0, SQUARE)
+    assert not point_in_polygon(1.0, 0.5, SQUARE)
+    assert not point_in_polygon(0.5, 1.0, SQUARE)
+    assert not point_in_polygon(1.0, 1.0, SQUARE)
+    assert not point_in_polygon(0.5, 1.0000001, SQUARE)
+
+    # Borda e vértice compartilhados entre cercas vizinhas ficam em uma só
+    engine = GeofenceEngine([_square(1, 0, 0), _square(2, 0, 1), _square(3, 1, 0), _square(4, 1, 1)])
+    for lat, lon in [(0.5, 1.0), (1.0, 0.5), (1.0, 1.0), (1.0, 1.5), (1.5, 1.0)]:
+        assert len(engine.containing(lat, lon)) == 1
+
+
+def test_concave_polygon():
+    # "U": o vão entre os braços fica fora, mesmo dentro da caixa
+    u_shape = [(0, 0), (0, 3), (3, 3), (3, 2), (1, 2), (1, 1), (3, 1), (3, 0)]
+    engine = GeofenceEngine([Geofence(id=1, name="U", polygon=u_shape)])
+    assert engine.containing(2.0, 1.5) == set()
+    assert engine.containing(0.5, 1.5) == {1}
+    assert engine.containing(2.0, 0.5) == {1}
+
+
+def test_enter_exit_sequence():
+    engine = GeofenceEngine([_square(1, 0, 0, name="Depot"), _square(2, 0.5, 0.5)])
+    path = [(-0.5, -0.5), (0.2, 0.2), (0.3, 0.3), (0.7, 0.7), (0.7, 0.7), (1.2, 1.2), (2.0, 2.0)]
+    transitions = []
+    for i, (lat, lon) in enumerate(path):
+        transitions.extend(engine.process(_event(i, lat, lon)))
+    assert [(t["geofence_id"], t["transition"], t["ts"]) for t in transitions] == [
+        (1, "enter", T0 + timedelta(seconds=1)),
+        (2, "enter", T0 + timedelta(seconds=3)),
+        (1, "exit", T0 + timedelta(seconds=5)),
+        (2, "exit", T0 + timedelta(seconds=6)),
+    ]
+    assert transitions[0]["geofence_name"] == "Depot"
+
+    # Evento sem posição não altera o estado; outro device tem estado próprio
+    assert engine.process(TelemetryEvent(device_id="GF-1", ts=T0, lat=None, lon=None)) == []
+    assert engine.process(_event(7, 0.2, 0.2, device_id="GF-2"))[0]["transition"] == "enter"
+    assert engine.inside["GF-1"] == set()
+
+
+def test_add_replaces_fence():
+    engine = GeofenceEngine([_square(1, 0, 0)])
+    assert engine.process(_event(0, 0.5, 0.5))[0]["transition"] == "enter"
+
+    engine.add(_square(1, 10, 10, name="moved"))
+    assert engine.containing(0.5, 0.5) == set()
+    assert engine.containing(10.5, 10.5) == {1}
+    assert engine.index.size == 1
+
+    transitions = engine.process(_event(1, 0.5, 0.5))
+    assert [(t["geofence_name"], t["transition"]) for t in transitions] == [("moved", "exit")]
+    assert engine.process(_event(2, 10.5, 10.5))[0]["transition"] == "enter"
+
+
+def test_load_drops_removed_fences():
+    engine = GeofenceEngine([_square(1, 0, 0), _square(2, 5, 5)])
+    engine.process(_event(0, 0.5, 0.5))
+    engine.load([_square(2, 5, 5)])
+    assert engine.inside["GF-1"] == set()
+    assert engine.process(_event(1, 0.5, 0.5)) == []
@@ -0,0 +1,104 @@
+"""
+Ranking incremental de motoristas (leaderboard.py)
+
+Uso (dentro de backend/):
+    python -m pytest -q test_leaderboard.py
+"""
+
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+
+from fuel_accumulators import FuelTracker
+from leaderboard import Leaderboard, LeaderboardCache
+from models import DriverScore, FuelConfig, TelemetryEvent
+
+CONFIG = FuelConfig(fuel_price=5.80, expected_kml=8.5, idle_consumption_lh=0.8)
+
+
+def _score(device_id: str, score: int) -> DriverScore:
+    return DriverScore(driver_id=device_id, score=score, avg_consumption=8.5,
+                       harsh_events=0, idle_hours=0, estimated_waste=0)
+
+
+def _sorted_reference(scores: dict) -> list:
+    # Mesma ordem do sort estável por score sobre devices em ordem de id
+    return sorted(sorted(scores), key=lambda d: scores[d], reverse=True)
+
+
+def test_leaderboard_matches_full_sort():
+    rng = random.Random(7)
+    board = Leaderboard()
+    scores = {}
+    for _ in range(2000):
+        device_id = f"TRK-{rng.randint(1, 200):03d}"
+        if rng.random() < 0.05:
+            scores.pop(device_id, None)
+            board.update(device_id, None)
+        else:
+            scores[device_id] = rng.randint(0, 100)
+            board.update(device_id, _score(device_id, scores[device_id]))
+
+    expected = _sorted_reference(scores)
+    assert [s.driver_id for s in board.page()] == expected
+    assert [s.rank for s in board.page(10, 5)] == [11, 12, 13, 14, 15]
+    assert [s.driver_id for s in board.page(10, 5)] == expected[10:15]
+    for i, device_id in enumerate(expected):
+        assert board.rank(device_id) == i + 1
+    assert board.rank("TRK-999") is None
+
+
+def test_rescores_only_changed_devices():
+    tracker = FuelTracker(retention_hours=48)
+    tracker.finish_warmup(datetime(2026, 1, 1, tzinfo=timezone.utc))
+    cache = LeaderboardCache(tracker, CONFIG)
+    now = datetime.now(timezone.utc)
+
+    def ingest(device_id, seconds, speed):
+        tracker.add_event(TelemetryEvent(
+            device_id=device_id, ts=now - timedelta(seconds=seconds),
+            lat=-23.5, lon=-46.6 + seconds * 1e-4, speed_kmh=speed
+        ))
+
+    for d in range(5):
+        for t in range(60, 0, -1):
+            ingest(f"TRK-{d}", t, 40.0 if d % 2 else 0.0)
+    board = cache.get(24)
+    assert len(board) == 5
+    window = cache.windows[24]
+    assert window.refresh() == 0
+
+    ingest("TRK-1", 0, 90.0)
+    assert window.refresh() == 1
+    expected = sorted(tracker.profiles(24, CONFIG), key=lambda p: p.score.score, reverse=True)
+    assert [s.driver_id for s in cache.get(24).page()] == [p.device_id for p in expected]
+
+
+def test_default_warmup_covers_ranking_window(tmp_path, monkeypatch):
+    # O aquecimento padrão precisa cobrir a janela padrão do ranking (720 h)
+    import main
+    from config import settings
+    from database_sqlite import SQLiteDatabase
+
+    tracker = FuelTracker(settings.fuel_tracker_retention_hours)
+    db = SQLiteDatabase(str(tmp_path / "warmup.db"))
+    monkeypatch.setattr(main, "db", db)
+    monkeypatch.setattr(main, "fuel_tracker", tracker)
+    old = datetime.now(timezone.utc) - timedelta(hours=600)
+
+    async def run():
+        await db.connect()
+        try:
+            for t in range(30):
+                await db.add_to_buffer(TelemetryEvent(
+                    device_id="TRK-OLD", ts=old + timedelta(seconds=t),
+                    lat=-23.5, lon=-46.6 + t * 1e-4, speed_kmh=50.0
+                ))
+            tracker.begin_warmup()
+            await main.warm_up_fuel_tracker()
+        finally:
+            await db.disconnect()
+
+    asyncio.run(run())
+    assert tracker.covers(720)
+    assert [p.device_id for p in tracker.profiles(720, CONFIG)] == ["TRK-OLD"]
@@ -0,0 +1,88 @@
+"""
+Snapshot do modo memória (main_simple.py) com vários workers
+
+Uso (dentro de backend/):
+    python -m pytest -q test_memory_snapshot.py
+"""
+
+import multiprocessing
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from shared_state import SharedState, supported
+
+pytestmark = pytest.mark.skipif(not supported(), reason='fcntl indisponível')
+
+NOW = datetime.now(timezone.utc).replace(microsecond=0)
+
+
+def _worker(name: str, snapshot: str, prefix: str, ready, stop, out):
+    """Worker do modo memória: restaura, ingere, grava o snapshot e espera"""
+    import asyncio
+
+    import main_simple
+    from models import TelemetryEvent
+    from shared_state import open_shared_state
+
+    main_simple.settings.memory_snapshot_path = snapshot
+    storage = main_simple.storage
+    storage.shared = open_shared_state(name, 128, zero_speeds=False)
+    path = main_simple.snapshot_path(storage.shared)
+    main_simple.restore_snapshot(path)
+    restored = [s.device_id for s in storage.telemetry.statuses()]
+    if prefix:
+        for i in range(20):
+            storage.add_event(TelemetryEvent(
+                device_id=f'{prefix}-{i % 2}', ts=NOW - timedelta(seconds=20 - i),
+                lat=-23.55, lon=-46.63, speed_kmh=40.0
+            ))
+        asyncio.run(main_simple.save_snapshot(path))
+    out.put((path.name, restored))
+    ready.set()
+    stop.wait(30)
+    storage.shared.close()
+
+
+@pytest.fixture
+def name():
+    name = f'monitora-test-{uuid.uuid4().hex[:8]}'
+    yield name
+    try:
+        SharedState(name).unlink()
+    except FileNotFoundError:
+        pass
+
+
+def test_restarted_worker_restores_its_snapshot(name, tmp_path):
+    ctx = multiprocessing.get_context('spawn')
+    snapshot = str(tmp_path / 'memory_snapshot.bin')
+    out = ctx.Queue()
+
+    # Um Event de parada por worker: matar um processo parado no wait() estraga o Event
+    def start(prefix: str):
+        ready, stop = ctx.Event(), ctx.Event()
+        process = ctx.Process(target=_worker, args=(name, snapshot, prefix, ready, stop, out))
+        process.start()
+        assert ready.wait(60)
+        return (process, stop), out.get(timeout=5)
+
+    first, (first_file, first_restored) = start('W0')
+    second, (second_file, _) = start('W1')
+    assert (first_file, second_file) == ('memory_snapshot.0.bin', 'memory_snapshot.1.bin')
+    assert first_restored == []
+
+    # O primeiro worker cai; o substituto (outro PID) fica com o índice livre
+    first[0].kill()
+    first[0].join(10)
+    restarted, (restarted_file, restored) = start('')
+    try:
+        assert restarted_file == 'memory_snapshot.0.bin'
+        assert restored == ['W0-0', 'W0-1']
+        assert sorted(p.name for p in tmp_path.iterdir()) == ['memory_snapshot.0.bin', 'memory_snapshot.1.bin']
+    finally:
+        for process, stop in (second, restarted):
+            stop.set()
+            process.join(30)
+    assert second[0].exitcode == 0 and restarted[0].exitcode == 0
@@ -0,0 +1,121 @@
+"""
+Recalculo em lote (recompute.py): checkpoint, retomada e config ativo
+
+Uso (dentro de backend/):
+    python -m pytest -q test_recompute.py
+"""
+
+import asyncio
+import sys
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+import database
+import recompute
+from database_sqlite import SQLiteDatabase
+from fuel_economy import DEFAULT_FUEL_CONFIG, config_hash
+from models import FuelConfig, TelemetryEvent
+from recompute import interval_end, load_checkpoint, resume_day, save_checkpoint
+
+START = date(2026, 1, 1)
+END = date(2026, 1, 31)
+
+
+def _checkpoint(done_through: date, config: FuelConfig = DEFAULT_FUEL_CONFIG) -> dict:
+    return {
+        "start": START.isoformat(), "end": END.isoformat(), "config": config.model_dump(),
+        "rows": 10, "events": 1000, "done_through": done_through.isoformat(),
+    }
+
+
+def test_checkpoint_round_trip(tmp_path):
+    path = tmp_path / "recompute.checkpoint.json"
+    assert load_checkpoint(path) is None
+    state = _checkpoint(date(2026, 1, 10))
+    save_checkpoint(path, state)
+    assert load_checkpoint(path) == state
+    save_checkpoint(path, {**state, "done_through": "2026-01-11"})
+    assert load_checkpoint(path)["done_through"] == "2026-01-11"
+    assert [p.name for p in tmp_path.iterdir()] == [path.name]     # Sem .tmp sobrando
+
+
+def test_resume_day():
+    assert resume_day(None, START, END, DEFAULT_FUEL_CONFIG) == START
+    assert resume_day(_checkpoint(date(2026, 1, 10)), START, END, DEFAULT_FUEL_CONFIG) == date(2026, 1, 11)
+    assert resume_day(_checkpoint(END), START, END, DEFAULT_FUEL_CONFIG) == END + timedelta(days=1)
+
+    other = DEFAULT_FUEL_CONFIG.model_copy(update={"fuel_price": 9.99})
+    with pytest.raises(SystemExit):
+        resume_day(_checkpoint(date(2026, 1, 10)), START, END, other)
+    with pytest.raises(SystemExit):
+        resume_day(_checkpoint(date(2026, 1, 10)), START, date(2026, 2, 28), DEFAULT_FUEL_CONFIG)
+
+
+def test_resume_takes_end_from_checkpoint():
+    # --resume sem --end num dia posterior continua o mesmo intervalo
+    checkpoint = _checkpoint(date(2026, 1, 10))
+    end = interval_end(None, checkpoint)
+    assert end == END
+    assert resume_day(checkpoint, START, end, DEFAULT_FUEL_CONFIG) == date(2026, 1, 11)
+    assert interval_end(date(2026, 1, 20), checkpoint) == date(2026, 1, 20)
+    assert interval_end(None, None) == datetime.now(timezone.utc).date()
+
+
+def test_rejects_config_other_than_active(tmp_path, monkeypatch):
+    monkeypatch.setattr(sys, "argv", [
+        "recompute.py", "--start", "2026-01-01", "--end", "2026-01-02",
+        "--fuel-price", "9.99", "--checkpoint", str(tmp_path / "cp.json")
+    ])
+    with pytest.raises(SystemExit) as exc:
+        recompute.main()
+    assert exc.value.code == 2
+
+
+def test_recompute_and_resume_on_sqlite(tmp_path, monkeypatch, capsys):
+    path = str(tmp_path / "recompute.db")
+    checkpoint = tmp_path / "cp.json"
+    day0 = datetime(2026, 1, 5, 8, tzinfo=timezone.utc)
+
+    async def seed():
+        db = SQLiteDatabase(path)
+        await db.connect()
+        try:
+            for d in range(3):
+                for i in range(30):
+                    await db.add_to_buffer(TelemetryEvent(
+                        device_id=f"RC-{i % 2}", ts=day0 + timedelta(days=d, seconds=10 * i),
+                        lat=-23.55 + i * 1e-4, lon=-46.63, speed_kmh=40.0
+                    ))
+            await db.flush_buffer()
+        finally:
+            await db.disconnect()
+
+    async def rows():
+        db = SQLiteDatabase(path)
+        await db.connect()
+        try:
+            return await db._fetch("SELECT device_id, day, events, config_hash FROM fuel_daily_summary")
+        finally:
+            await db.disconnect()
+
+    asyncio.run(seed())
+    first, last = date(2026, 1, 5), date(2026, 1, 7)
+
+    monkeypatch.setattr(database, "db", SQLiteDatabase(path))
+    asyncio.run(recompute.recompute(first, last, DEFAULT_FUEL_CONFIG, 1, checkpoint, False))
+    state = load_checkpoint(checkpoint)
+    assert state["done_through"] == "2026-01-07" and state["rows"] == 6
+
+    # Checkpoint como se a execução tivesse parado depois do 2º dia
+    save_checkpoint(checkpoint, {**state, "done_through": "2026-01-06", "rows": 4, "events": 60})
+
+    monkeypatch.setattr(database, "db", SQLiteDatabase(path))
+    asyncio.run(recompute.recompute(first, last, DEFAULT_FUEL_CONFIG, 1, checkpoint, True))
+    assert "Resuming at 2026-01-07" in capsys.readouterr().out
+    assert load_checkpoint(checkpoint)["rows"] == 6
+
+    result = asyncio.run(rows())
+    assert len(result) == 6
+    assert {r["config_hash"] for r in result} == {config_hash(DEFAULT_FUEL_CONFIG)}
+    assert all(r["events"] == 15 for r in result)
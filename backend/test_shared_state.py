@@ -0,0 +1,109 @@
+"""
+Estado compartilhado entre workers (shared_state.py)
+
+Uso (dentro de backend/):
+    python -m pytest -q test_shared_state.py
+"""
+
+import multiprocessing
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from models import DeviceStatus, TelemetryEvent
+from shared_state import SharedState, supported
+
+pytestmark = pytest.mark.skipif(not supported(), reason='fcntl indisponível')
+
+NOW = datetime.now(timezone.utc).replace(microsecond=0)
+
+
+def _event(device_id: str, seconds_ago: float, speed: float = 50.0, now: datetime = NOW) -> TelemetryEvent:
+    return TelemetryEvent(
+        device_id=device_id, ts=now - timedelta(seconds=seconds_ago),
+        lat=-23.55, lon=-46.63, speed_kmh=speed, battery_v=None
+    )
+
+
+def _worker(name: str, worker: int, events: int, now: datetime):
+    state = SharedState(name, slots=128)
+    state.open()
+    try:
+        for i in range(events):
+            state.update(_event(f'TRK-{i % 10:02d}', seconds_ago=events - i, speed=float(worker), now=now))
+    finally:
+        state.close()
+
+
+@pytest.fixture
+def name():
+    name = f'monitora-test-{uuid.uuid4().hex[:8]}'
+    yield name
+    try:
+        SharedState(name).unlink()
+    except FileNotFoundError:
+        pass
+
+
+def test_workers_share_latest_state_and_counters(name):
+    ctx = multiprocessing.get_context('spawn')
+    workers = [ctx.Process(target=_worker, args=(name, w + 1, 50, NOW)) for w in range(2)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join(30)
+        assert process.exitcode == 0
+
+    state = SharedState(name, slots=128)
+    state.open()
+    try:
+        statuses = state.statuses()
+        assert [s.device_id for s in statuses] == [f'TRK-{i:02d}' for i in range(10)]
+        assert statuses[0].last_battery is None
+        assert statuses[-1].last_seen == NOW - timedelta(seconds=1)
+        assert state.count_devices() == 10
+        assert state.count_online(30) == 10
+
+        stats = state.window_stats(120, NOW)
+        assert stats['events'] == 100
+        assert stats['speed_sum'] == 50 * 1 + 50 * 2
+        assert stats['speed_n'] == 100
+    finally:
+        state.close()
+
+
+def test_late_events_keep_latest_and_alerts(name):
+    state = SharedState(name, slots=16, zero_speeds=False)
+    state.open()
+    try:
+        state.update(_event('TRK-01', seconds_ago=5, speed=40.0))
+        state.update(_event('TRK-01', seconds_ago=60, speed=0.0))     # Atrasado
+        [status] = state.statuses()
+        assert status.last_speed == 40.0
+        assert state.window_stats(120, NOW) == {'events': 2, 'speed_sum': 40.0, 'speed_n': 1}
+
+        state.mark_alerts([{'device_id': 'TRK-02', 'ts': datetime.now(timezone.utc)}])
+        assert state.count_alert_devices(600) == 1
+        assert state.count_devices() == 1     # Alerta sem telemetria não vira status
+    finally:
+        state.close()
+
+
+def test_seed_keeps_newer_state_and_counters(name):
+    state = SharedState(name, slots=16)
+    state.open()
+    try:
+        state.update(_event('TRK-01', seconds_ago=5, speed=40.0))
+        state.seed([
+            DeviceStatus(device_id='TRK-01', online=False, last_seen=NOW - timedelta(hours=1), last_speed=10.0),
+            DeviceStatus(device_id='TRK-09', online=False, last_seen=NOW - timedelta(days=2),
+                         last_lat=-23.5, last_lon=-46.6, last_speed=0.0),
+        ])
+        old, seeded = state.statuses()
+        assert (old.device_id, old.last_speed, old.online) == ('TRK-01', 40.0, True)
+        assert seeded.device_id == 'TRK-09' and not seeded.online
+        assert seeded.last_seen == NOW - timedelta(days=2) and seeded.last_temp is None
+        assert state.window_stats(120, NOW)['events'] == 1     # Seed não conta como evento
+    finally:
+        state.close()
@@ -0,0 +1,162 @@
+"""
+Armazenamento colunar em memória (telemetry_store.py) e snapshot (store_snapshot.py)
+
+Uso (dentro de backend/):
+    python -m pytest -q test_telemetry_store.py
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from models import TelemetryEvent
+from store_snapshot import load_snapshot, write_snapshot
+from telemetry_store import BLOCK_DEVICES, TelemetryRingStore
+
+START = datetime(2026, 1, 5, 8, 0, 0, 123456, tzinfo=timezone.utc)
+
+
+def _event(device_id: str, i: int, **fields) -> TelemetryEvent:
+    values = {
+        'lat': -23.550512 + i * 1e-6,
+        'lon': -46.633308,
+        'speed_kmh': 72.3,
+        'engine_temp_c': 91.7,
+        'battery_v': 12.43,
+    }
+    values.update(fields)
+    return TelemetryEvent(device_id=device_id, ts=START + timedelta(seconds=i), **values)
+
+
+def test_round_trip_keeps_values():
+    store = TelemetryRingStore(history=10)
+    store.append(_event('TRK-001', 0, battery_v=None))
+    [event] = store.events('TRK-001')
+    assert event == {
+        'ts': START,
+        'lat': -23.550512,
+        'lon': -46.633308,
+        'speed_kmh': 72.3,
+        'engine_temp_c': 91.7,
+        'battery_v': None,
+    }
+
+
+def test_ring_wraps_in_order():
+    store = TelemetryRingStore(history=10)
+    for i in range(25):
+        store.append(_event('TRK-001', i))
+    events = store.events('TRK-001')
+    assert store.count('TRK-001') == 10
+    assert [e['ts'] for e in events] == [START + timedelta(seconds=i) for i in range(15, 25)]
+    assert store.latest('TRK-001')['ts'] == START + timedelta(seconds=24)
+    assert [e['ts'] for e in store.events('TRK-001', limit=3)] == [
+        START + timedelta(seconds=i) for i in range(22, 25)
+    ]
+    since = store.events('TRK-001', since=START + timedelta(seconds=20))
+    assert len(since) == 5
+
+
+def test_many_devices_and_window_stats():
+    store = TelemetryRingStore(history=4)
+    devices = BLOCK_DEVICES + 10
+    for i in range(6):
+        for d in range(devices):
+            store.append(_event(f'TRK-{d:04d}', i, speed_kmh=0.0 if d % 2 else 50.0))
+    assert len(store) == devices
+    assert len(store.statuses()) == devices
+
+    now = START + timedelta(seconds=5)
+    stats = store.window_stats(2, now)
+    assert stats['events'] == 3 * devices               # i = 3, 4, 5
+    assert stats['speed_n'] == 3 * (devices // 2)       # 0 km/h não conta
+    assert stats['speed_sum'] == 50.0 * stats['speed_n']
+
+    # Janela além do horizonte dos agregados: varredura dos anéis (últimos 4 por device)
+    scanned = store.window_stats(7200, now)
+    assert scanned['events'] == 4 * devices
+    assert scanned['speed_n'] == 4 * (devices // 2)
+
+
+def test_since_with_binary_search_and_late_events():
+    store = TelemetryRingStore(history=10)
+    for i in range(25):
+        store.append(_event('TRK-001', i))
+        store.append(_event('TRK-002', i))
+    # Atrasado: desliga a busca binária só do TRK-002
+    store.append(_event('TRK-002', 3))
+    assert store.ordered[store.slots['TRK-001']]
+    assert not store.ordered[store.slots['TRK-002']]
+
+    for device_id in ('TRK-001', 'TRK-002'):
+        everything = store.events(device_id)
+        for second in range(0, 27):
+            since = START + timedelta(seconds=second)
+            assert store.events(device_id, since=since) == [e for e in everything if e['ts'] >= since]
+
+
+def test_snapshot_round_trip(tmp_path):
+    store = TelemetryRingStore(history=8)
+    device_ids = [f'TRK-{d:04d}' for d in range(BLOCK_DEVICES + 3)]   # Bloco cheio + parcial
+    for i in range(12):
+        for device_id in device_ids:
+            store.append(_event(device_id, i, speed_kmh=float(i)))
+    store.append(_event('TRK-0000', 5))     # Atrasado: desliga a busca binária
+    path = tmp_path / 'memory.snap'
+    asyncio.run(write_snapshot(store, path, {'total_events': 42}))
+
+    for mmap in (True, False):
+        restored, extra = load_snapshot(path, mmap=mmap)
+        assert extra == {'total_events': 42}
+        assert restored.device_ids == store.device_ids
+        for device_id in ('TRK-0000', 'TRK-0001', device_ids[-1]):
+            assert restored.events(device_id) == store.events(device_id)
+        now = START + timedelta(seconds=12)
+        assert restored.window_stats(5, now) == store.window_stats(5, now)
+
+        # Continua gravando: devices novos no bloco parcial, escrita não toca o arquivo
+        restored.append(_event('TRK-0001', 20))
+        restored.append(_event('TRK-NEW', 0))
+        assert restored.latest('TRK-0001')['ts'] == START + timedelta(seconds=20)
+        assert restored.count('TRK-NEW') == 1
+
+    restored, _ = load_snapshot(path)
+    assert restored.events('TRK-0001') == store.events('TRK-0001')
+
+
+def test_concurrent_snapshots_do_not_collide(tmp_path):
+    # Dois workers gravando o mesmo caminho: temporários distintos, arquivo final íntegro
+    stores = []
+    for n in (3, 5):
+        store = TelemetryRingStore(history=4)
+        for d in range(n):
+            store.append(_event(f'TRK-{d}', 0))
+        stores.append(store)
+    path = tmp_path / 'memory.snap'
+
+    async def run():
+        await asyncio.gather(*(write_snapshot(store, path) for store in stores))
+
+    asyncio.run(run())
+    assert [p.name for p in tmp_path.iterdir()] == ['memory.snap']
+    restored, _ = load_snapshot(path)
+    assert len(restored) in (3, 5)
+
+
+def test_latest_reads_last_written_position():
+    store = TelemetryRingStore(history=5)
+    device_ids = [f'TRK-{d:04d}' for d in range(BLOCK_DEVICES + 2)]
+    for d, device_id in enumerate(device_ids):
+        for i in range(d % 12):                 # Sem leituras, parciais e já com volta
+            store.append(_event(device_id, i, speed_kmh=float(i), battery_v=None if i % 2 else 12.5))
+    store.append(_event('TRK-0011', 3))         # Atrasado: ainda é a última leitura gravada
+
+    statuses = {s.device_id: s for s in store.statuses()}
+    for device_id in device_ids:
+        expected = store.events(device_id, limit=1)
+        assert store.latest(device_id) == (expected[0] if expected else None)
+        if expected:
+            status = statuses[device_id]
+            assert (status.last_seen, status.last_speed, status.last_battery) == (
+                expected[0]['ts'], expected[0]['speed_kmh'], expected[0]['battery_v']
+            )
+    assert store.latest('TRK-0011')['ts'] == START + timedelta(seconds=3)
@@ -0,0 +1,80 @@
+"""
+Trace binário de ingestão (traffic_trace.py)
+
+Uso (dentro de backend/):
+    python -m pytest -q test_traffic_trace.py
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from models import TelemetryEvent
+from traffic_trace import MAGIC, TraceWriter, read_trace
+
+T0 = datetime(2024, 3, 1, 12, 0, tzinfo=timezone.utc)
+ARRIVAL0 = 1_709_294_400_000_000
+
+
+def _events():
+    # (chegada µs, evento): inclui campos ausentes, id não ASCII e um
+    # intervalo maior que o delta de 32 bits (~71 min)
+    gaps = [0, 250, 1_000_000, 3, 5_000_000_000, 10]
+    arrival = ARRIVAL0
+    for i, gap in enumerate(gaps):
+        arrival += gap
+        yield arrival, TelemetryEvent(
+            device_id=["VEH-1", "VEH-2", "caminhão-3"][i % 3],
+            ts=T0 + timedelta(seconds=i, microseconds=123),
+            lat=-23.55 + i * 1e-5, lon=-46.63,
+            speed_kmh=None if i == 2 else 40.5 + i,
+            engine_temp_c=90.0, battery_v=None if i % 2 else 12.6
+        )
+
+
+def _write(path, events):
+    async def run():
+        writer = TraceWriter(path)
+        writer.start()
+        for arrival, event in events:
+            writer.record(event, arrival)
+        await writer.stop()
+        return writer
+    return asyncio.run(run())
+
+
+def test_round_trip(tmp_path):
+    events = list(_events())
+    path = tmp_path / "ingest.trace"
+    writer = _write(path, events)
+    assert writer.events == len(events) and len(writer.devices) == 3
+
+    replayed = list(read_trace(path))
+    assert [a for a, _ in replayed] == [a for a, _ in events]
+    for (_, got), (_, expected) in zip(replayed, events):
+        assert got == expected.model_dump()
+
+
+def test_truncated_capture_keeps_whole_records(tmp_path):
+    events = list(_events())
+    path = tmp_path / "ingest.trace"
+    _write(path, events)
+    data = path.read_bytes()
+    path.write_bytes(data[:-7])
+    assert len(list(read_trace(path))) == len(events) - 1
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"not a trace at all")
+    with pytest.raises(ValueError):
+        list(read_trace(path))
+    path.write_bytes(MAGIC + b"X")
+    with pytest.raises(ValueError):
+        list(read_trace(path))
+
+
+def test_pid_in_path(tmp_path):
+    writer = TraceWriter(tmp_path / "ingest-{pid}.trace")
+    assert "{pid}" not in str(writer.path)
@@ -0,0 +1,64 @@
+"""
+Simplificação de trilhas (trajectory.py)
+
+Uso (dentro de backend/):
+    python -m pytest -q test_trajectory.py
+"""
+
+import numpy as np
+import pytest
+
+from fuel_economy import calculate_total_distance
+from fuel_kernels import columns_from_events
+from test_fuel_parity import FIXTURES
+from trajectory import douglas_peucker, resimplify_track, simplify_track, _project, _segment_distances
+
+
+def test_straight_line_keeps_endpoints():
+    lat = np.linspace(-23.5, -23.4, 1000)
+    lon = np.linspace(-46.6, -46.5, 1000)
+    assert douglas_peucker(lat, lon, 1.0).tolist() == [0, 999]
+
+
+def test_zero_tolerance_keeps_everything():
+    lat = np.array([-23.5, -23.49, -23.5, -23.49])
+    lon = np.array([-46.6, -46.59, -46.58, -46.57])
+    assert douglas_peucker(lat, lon, 0).tolist() == [0, 1, 2, 3]
+
+
+@pytest.mark.parametrize('name', ['ascending', 'gaps', 'stopped', 'single', 'empty'])
+@pytest.mark.parametrize('tolerance_m', [0, 5, 50])
+def test_distance_preserved(name, tolerance_m):
+    events = FIXTURES[name]
+    track = simplify_track(columns_from_events(events), tolerance_m)
+    expected = calculate_total_distance(events)
+    assert track['distance_km'] == pytest.approx(expected, rel=1e-12, abs=1e-12)
+    assert float(np.sum(track['seg_km'])) == pytest.approx(expected, rel=1e-9, abs=1e-12)
+
+
+def test_dropped_points_within_tolerance():
+    events = FIXTURES['ascending']
+    cols = columns_from_events(events)
+    kept = douglas_peucker(cols.lat, cols.lon, 20)
+    assert len(kept) < len(cols)
+
+    x, y = _project(cols.lat, cols.lon)
+    for a, b in zip(kept[:-1], kept[1:]):
+        if b - a > 1:
+            assert _segment_distances(x, y, a, b).max() <= 20
+
+
+@pytest.mark.parametrize('name', ['ascending', 'gaps', 'stopped', 'single', 'empty'])
+def test_resimplify_uses_stored_segments(name, monkeypatch):
+    events = FIXTURES[name]
+    track = simplify_track(columns_from_events(events), 0)
+    expected = calculate_total_distance(events)
+
+    # Trilha gravada: nenhuma distância recalculada
+    import trajectory
+    monkeypatch.setattr(trajectory, 'pair_contributions', None)
+    coarse = resimplify_track(track, 50)
+    assert coarse['distance_km'] == pytest.approx(expected, rel=1e-12, abs=1e-12)
+    assert float(np.sum(coarse['seg_km'])) == pytest.approx(expected, rel=1e-9, abs=1e-12)
+    assert coarse['raw_points'] == len(events)
+    assert len(coarse['ts_us']) <= len(track['ts_us'])
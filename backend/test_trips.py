@@ -0,0 +1,97 @@
+"""
+Segmentação de viagens/paradas (trips.py)
+
+Uso (dentro de backend/):
+    python -m pytest -q test_trips.py
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from fuel_economy import calculate_idle_waste, calculate_total_distance
+from models import FuelConfig, TelemetryEvent
+from trips import TripSegmenter, TRIP, STOP
+
+CONFIG = FuelConfig(fuel_price=5.80, expected_kml=8.5, idle_consumption_lh=0.8)
+START = datetime(2026, 1, 5, 8, 0, tzinfo=timezone.utc)
+
+
+def _events(speeds: list, interval_s: float = 10.0) -> list:
+    """Um evento a cada interval_s, andando ~1 m para leste por km/h"""
+    lat, lon = -23.55, -46.63
+    events = []
+    for i, speed in enumerate(speeds):
+        lon += speed * 1e-5
+        events.append({
+            'device_id': 'TRK-001',
+            'ts': START + timedelta(seconds=i * interval_s),
+            'lat': lat,
+            'lon': lon,
+            'speed_kmh': speed,
+        })
+    return events
+
+
+def _run(segmenter: TripSegmenter, events: list) -> list:
+    closed = []
+    for e in events:
+        closed.extend(segmenter.process(TelemetryEvent(**e)))
+    return closed + segmenter.flush()
+
+
+def test_trip_stop_trip():
+    # 5 min andando, 5 min parado, 5 min andando (eventos a cada 10 s)
+    speeds = [50.0] * 30 + [0.0] * 30 + [50.0] * 30
+    segments = _run(TripSegmenter(stop_dwell_s=180, start_dwell_s=30), _events(speeds))
+
+    assert [s['kind'] for s in segments] == [TRIP, STOP, TRIP]
+    assert segments[0]['end_ts'] == segments[1]['start_ts']
+    assert segments[1]['end_ts'] == segments[2]['start_ts']
+    assert segments[1]['duration_s'] == 300
+    assert segments[1]['distance_km'] < 0.1      # Só o par que sai da parada
+
+
+def test_short_stop_is_absorbed():
+    # Semáforo de 1 min (menor que o dwell de parada)
+    speeds = [50.0] * 30 + [0.0] * 6 + [50.0] * 30
+    segments = _run(TripSegmenter(stop_dwell_s=180), _events(speeds))
+
+    assert [s['kind'] for s in segments] == [TRIP]
+    assert segments[0]['events'] == len(speeds)
+    assert segments[0]['idle_s'] == 60
+
+
+def test_gap_closes_segment():
+    events = _events([50.0] * 10) + [
+        {**e, 'ts': e['ts'] + timedelta(hours=1)} for e in _events([50.0] * 10)
+    ]
+    segments = _run(TripSegmenter(max_gap_s=900), events)
+
+    assert [s['kind'] for s in segments] == [TRIP, TRIP]
+    assert segments[0]['end_ts'] == events[9]['ts']
+    assert segments[1]['start_ts'] == events[10]['ts']
+
+
+def test_late_event_ignored():
+    segmenter = TripSegmenter()
+    events = _events([50.0] * 5)
+    _run(segmenter, events[3:])
+    assert segmenter.process(TelemetryEvent(**events[0])) == []
+    assert segmenter.late_events == 1
+
+
+@pytest.mark.parametrize('speeds', [
+    [50.0] * 30 + [0.0] * 30 + [50.0] * 30,
+    [0.0, 3.0, 12.0, 40.0, 80.0, 2.0, 0.0] * 40,
+])
+def test_totals_partition_the_stream(speeds):
+    # Sem intervalos grandes, viagens + paradas somam a mesma distância e marcha lenta
+    events = _events(speeds)
+    segments = _run(TripSegmenter(stop_dwell_s=60, start_dwell_s=20), events)
+
+    assert sum(s['distance_km'] for s in segments) == pytest.approx(calculate_total_distance(events))
+    idle_hours = sum(s['idle_s'] for s in segments) / 3600
+    assert round(idle_hours, 2) == calculate_idle_waste(events, CONFIG)['hours']
+    assert sum(s['events'] for s in segments) == len(events) + len(segments) - 1
+
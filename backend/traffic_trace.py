@@ -0,0 +1,188 @@
+"""
+MÓDULO: Trace de tráfego de ingestão
+Grava os eventos recebidos em /ingest (com o instante de chegada) num
+arquivo binário compacto, para o simulador reenviar depois no mesmo ritmo
+
+Formato (little-endian):
+- cabeçalho: MAGIC (8 bytes)
+- registros, cada um começando por 1 byte de tipo:
+  - b"D": device novo -> uint16 tamanho + id utf-8 (índice = ordem de aparição)
+  - b"T": chegada absoluta -> int64 epoch µs (base dos deltas seguintes)
+  - b"E": evento -> uint32 índice do device, uint32 µs desde a chegada
+    anterior, int64 ts epoch µs, 5 float64 (lat, lon, speed_kmh,
+    engine_temp_c, battery_v; NaN = ausente)
+
+Só usa a biblioteca padrão: o simulador importa este módulo para o replay.
+"""
+
+import asyncio
+import logging
+import math
+import mmap
+import os
+import struct
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterator, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"METRACE1"
+VALUE_FIELDS = ("lat", "lon", "speed_kmh", "engine_temp_c", "battery_v")
+FLUSH_INTERVAL_S = 1.0
+
+_DEVICE = struct.Struct("<cH")
+_TIME = struct.Struct("<cq")
+_EVENT = struct.Struct("<cIIq5d")
+_MAX_DELTA_US = 2 ** 32 - 1
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_NAN = float("nan")
+
+
+def _epoch_us(ts: datetime) -> int:
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    delta = ts - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+class TraceWriter:
+    """
+    Captura de /ingest: record() só acumula bytes na memória (chamado no
+    event loop); o arquivo é gravado numa thread a cada FLUSH_INTERVAL_S
+
+    Com vários workers use "{pid}" no caminho (um arquivo por processo).
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(str(path).format(pid=os.getpid()))
+        self.devices = {}
+        self.events = 0
+        self.buffer = bytearray(MAGIC)
+        self.last_arrival_us = None
+        self.file = None
+        self.task = None
+        self.write_lock = asyncio.Lock()
+
+    def open(self):
+        self.file = open(self.path, "wb")
+        logger.info(f"Capturando ingestão em {self.path}")
+
+    def record(self, event, arrival_us: Optional[int] = None):
+        """Acrescenta um evento (arrival_us = agora, se omitido)"""
+        if arrival_us is None:
+            arrival_us = time.time_ns() // 1000
+        index = self.devices.get(event.device_id)
+        if index is None:
+            index = self.devices[event.device_id] = len(self.devices)
+            name = event.device_id.encode("utf-8")
+            self.buffer += _DEVICE.pack(b"D", len(name))
+            self.buffer += name
+        delta = None if self.last_arrival_us is None else arrival_us - self.last_arrival_us
+        if delta is None or not 0 <= delta <= _MAX_DELTA_US:
+            # Primeira chegada, relógio voltou ou intervalo > ~71 min
+            self.buffer += _TIME.pack(b"T", arrival_us)
+            delta = 0
+        self.last_arrival_us = arrival_us
+        values = [getattr(event, f) for f in VALUE_FIELDS]
+        self.buffer += _EVENT.pack(
+            b"E", index, delta, _epoch_us(event.ts),
+            *(_NAN if v is None else v for v in values)
+        )
+        self.events += 1
+
+    async def flush(self):
+        """Grava o que estiver acumulado (fora do event loop)"""
+        async with self.write_lock:
+            if not self.buffer or self.file is None:
+                return
+            data, self.buffer = self.buffer, bytearray()
+            await asyncio.to_thread(self._write, data)
+
+    def _write(self, data: bytes):
+        self.file.write(data)
+        self.file.flush()
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL_S)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Trace flush error: {e}")
+
+    def start(self):
+        self.open()
+        self.task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Trace flush error: {e}")
+        if self.file:
+            self.file.close()
+            self.file = None
+        logger.info(f"Trace {self.path}: {self.events} eventos, {len(self.devices)} devices")
+
+
+def open_trace_writer(path: str) -> Optional[TraceWriter]:
+    """TraceWriter do caminho configurado (None se vazio)"""
+    if not path:
+        return None
+    return TraceWriter(path)
+
+
+def read_trace(path: Union[str, Path]) -> Iterator[Tuple[int, dict]]:
+    """
+    (chegada em epoch µs, evento) na ordem de gravação; o evento é um
+    dict no formato do payload de /ingest com ts em datetime UTC
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < len(MAGIC):
+            raise ValueError(f"{path}: não é um trace de ingestão")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path}: não é um trace de ingestão")
+            yield from _records(data, path)
+
+
+def _records(data: mmap.mmap, path) -> Iterator[Tuple[int, dict]]:
+    pos = len(MAGIC)
+    devices = []
+    arrival_us = 0
+    size = len(data)
+    while pos < size:
+        kind = data[pos:pos + 1]
+        if kind == b"E":
+            if pos + _EVENT.size > size:
+                break       # Registro truncado (captura interrompida)
+            _, index, delta, ts_us, *values = _EVENT.unpack_from(data, pos)
+            pos += _EVENT.size
+            arrival_us += delta
+            event = {
+                "device_id": devices[index],
+                "ts": _EPOCH + timedelta(microseconds=ts_us),
+            }
+            for field, value in zip(VALUE_FIELDS, values):
+                event[field] = None if math.isnan(value) else value
+            yield arrival_us, event
+        elif kind == b"T":
+            if pos + _TIME.size > size:
+                break
+            arrival_us = _TIME.unpack_from(data, pos)[1]
+            pos += _TIME.size
+        elif kind == b"D":
+            if pos + _DEVICE.size > size:
+                break
+            length = _DEVICE.unpack_from(data, pos)[1]
+            pos += _DEVICE.size
+            if pos + length > size:
+                break
+            devices.append(data[pos:pos + length].decode("utf-8"))
+            pos += length
+        else:
+            raise ValueError(f"{path}: registro inválido na posição {pos}")
@@ -0,0 +1,128 @@
+"""
+MÓDULO: Simplificação de trajetórias (Douglas-Peucker)
+Menos pontos para mapas e somas de distância, com o comprimento exato
+de cada trecho preservado
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+import numpy as np
+
+from fuel_kernels import TelemetryColumns, pair_contributions
+
+EARTH_RADIUS_M = 6371000
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _project(lat: np.ndarray, lon: np.ndarray) -> tuple:
+    """Projeção equiretangular local em metros (suficiente para tolerâncias de metros)"""
+    lat0 = np.radians(np.mean(lat))
+    x = EARTH_RADIUS_M * np.radians(lon) * np.cos(lat0)
+    y = EARTH_RADIUS_M * np.radians(lat)
+    return x, y
+
+
+def _segment_distances(x, y, a: int, b: int) -> np.ndarray:
+    """Distância (m) dos pontos a+1..b-1 ao segmento a-b"""
+    px, py = x[a + 1:b], y[a + 1:b]
+    dx, dy = x[b] - x[a], y[b] - y[a]
+    length2 = dx * dx + dy * dy
+    if length2 == 0:
+        return np.hypot(px - x[a], py - y[a])
+    t = np.clip(((px - x[a]) * dx + (py - y[a]) * dy) / length2, 0.0, 1.0)
+    return np.hypot(px - (x[a] + t * dx), py - (y[a] + t * dy))
+
+
+def douglas_peucker(lat: np.ndarray, lon: np.ndarray, tolerance_m: float) -> np.ndarray:
+    """Índices dos pontos mantidos (primeiro e último sempre ficam)"""
+    n = len(lat)
+    if n <= 2 or tolerance_m <= 0:
+        return np.arange(n)
+
+    x, y = _project(lat, lon)
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    # Iterativo: trilhas de dias inteiros estourariam a recursão
+    while stack:
+        a, b = stack.pop()
+        if b - a < 2:
+            continue
+        dist = _segment_distances(x, y, a, b)
+        k = int(np.argmax(dist))
+        if dist[k] > tolerance_m:
+            k += a + 1
+            keep[k] = True
+            stack.append((a, k))
+            stack.append((k, b))
+    return np.flatnonzero(keep)
+
+
+def simplify_track(
+    cols: TelemetryColumns,
+    tolerance_m: float,
+    seg_km: Optional[np.ndarray] = None
+) -> dict:
+    """
+    Trilha simplificada de um device (colunas em ordem crescente de ts)
+
+    Pontos sem coordenadas não entram na trilha. seg_km[i] é a distância
+    exata (soma dos pares originais) do ponto i ao i+1 mantido, logo a
+    soma de seg_km é a distância de calculate_total_distance.
+
+    Sobre telemetria bruta o haversine ainda roda em todos os pares: o
+    ganho é no tamanho da trilha, não no cálculo da distância. Passando o
+    seg_km de uma trilha já gravada (cols = pontos dela), a distância sai
+    da soma dos trechos sem haversine (ver resimplify_track).
+    """
+    if seg_km is None:
+        _, _, km = pair_contributions(cols)
+    else:
+        km = np.asarray(seg_km, dtype=np.float64)[:-1]
+    cumulative = np.concatenate(([0.0], np.cumsum(km)))
+
+    located = np.flatnonzero(~np.isnan(cols.lat) & ~np.isnan(cols.lon))
+    kept = located[douglas_peucker(cols.lat[located], cols.lon[located], tolerance_m)]
+    kept_km = np.diff(cumulative[kept]) if len(kept) else np.zeros(0)
+
+    return {
+        "ts_us": cols.ts_us[kept],
+        "lat": cols.lat[kept],
+        "lon": cols.lon[kept],
+        "speed": cols.speed[kept],
+        "seg_km": np.append(kept_km, 0.0) if len(kept) else kept_km,
+        "raw_points": len(cols),
+        "distance_km": float(cumulative[-1]),
+    }
+
+
+def resimplify_track(track: dict, tolerance_m: float) -> dict:
+    """
+    Simplifica de novo uma trilha já simplificada (gravada ou em cache,
+    ex.: tolerância maior para um zoom menor) usando o seg_km guardado:
+    distância exata sem reler a telemetria nem calcular haversine
+    """
+    cols = TelemetryColumns(
+        ts_us=track["ts_us"], lat=track["lat"], lon=track["lon"], speed=track["speed"]
+    )
+    result = simplify_track(cols, tolerance_m, track["seg_km"])
+    result["raw_points"] = track["raw_points"]
+    return result
+
+
+def track_points(track: dict) -> List[dict]:
+    """Pontos da trilha no formato da API"""
+    return [
+        {
+            "ts": _EPOCH + timedelta(microseconds=ts_us),
+            "lat": lat,
+            "lon": lon,
+            "speed_kmh": None if speed != speed else speed,
+            "seg_km": seg_km,
+        }
+        for ts_us, lat, lon, speed, seg_km in zip(
+            track["ts_us"].tolist(), track["lat"].tolist(), track["lon"].tolist(),
+            track["speed"].tolist(), track["seg_km"].tolist()
+        )
+    ]
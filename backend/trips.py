@@ -0,0 +1,201 @@
+"""
+MÓDULO: Segmentação de viagens e paradas
+Transforma o fluxo de eventos de cada device em viagens (trip) e paradas (stop)
+"""
+
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from fuel_economy import IDLE_SPEED_THRESHOLD, HARSH_ACCEL_THRESHOLD, haversine_distance
+from models import TelemetryEvent
+
+TRIP = "trip"
+STOP = "stop"
+
+
+class _Segment:
+    """Totais de um trecho contínuo (viagem, parada ou candidato)"""
+
+    __slots__ = (
+        "kind", "start_ts", "start_lat", "start_lon", "end_ts", "end_lat", "end_lon",
+        "events", "distance_km", "idle_s", "harsh_events", "max_speed_kmh"
+    )
+
+    def __init__(self, kind: str, ts: datetime, lat: Optional[float], lon: Optional[float], speed: float):
+        self.kind = kind
+        self.start_ts = self.end_ts = ts
+        self.start_lat = self.end_lat = lat
+        self.start_lon = self.end_lon = lon
+        self.events = 1
+        self.distance_km = 0.0
+        self.idle_s = 0.0
+        self.harsh_events = 0
+        self.max_speed_kmh = speed
+
+    def extend(self, ts: datetime, lat, lon, speed: float, idle_s: float, harsh: bool, km: float):
+        self.end_ts = ts
+        self.end_lat = lat
+        self.end_lon = lon
+        self.events += 1
+        self.distance_km += km
+        self.idle_s += idle_s
+        self.harsh_events += harsh
+        self.max_speed_kmh = max(self.max_speed_kmh, speed)
+
+    def merge(self, other: "_Segment"):
+        """Absorve um candidato que não se confirmou (o ponto inicial é compartilhado)"""
+        self.end_ts = other.end_ts
+        self.end_lat = other.end_lat
+        self.end_lon = other.end_lon
+        self.events += other.events - 1
+        self.distance_km += other.distance_km
+        self.idle_s += other.idle_s
+        self.harsh_events += other.harsh_events
+        self.max_speed_kmh = max(self.max_speed_kmh, other.max_speed_kmh)
+
+    def to_row(self, device_id: str) -> dict:
+        return {
+            "device_id": device_id,
+            "kind": self.kind,
+            "start_ts": self.start_ts,
+            "end_ts": self.end_ts,
+            "duration_s": (self.end_ts - self.start_ts).total_seconds(),
+            "distance_km": self.distance_km,
+            "idle_s": self.idle_s,
+            "harsh_events": self.harsh_events,
+            "events": self.events,
+            "max_speed_kmh": self.max_speed_kmh,
+            "start_lat": self.start_lat,
+            "start_lon": self.start_lon,
+            "end_lat": self.end_lat,
+            "end_lon": self.end_lon,
+        }
+
+
+class _DeviceState:
+    __slots__ = ("current", "candidate", "last_ts", "last_lat", "last_lon", "last_speed")
+
+    def __init__(self):
+        self.current: Optional[_Segment] = None
+        self.candidate: Optional[_Segment] = None     # Trecho do tipo oposto ainda sem dwell
+        self.last_ts: Optional[datetime] = None
+        self.last_lat = None
+        self.last_lon = None
+        self.last_speed = 0.0
+
+
+class TripSegmenter:
+    """
+    Máquina de estados por device
+
+    Velocidade abaixo de IDLE_SPEED_THRESHOLD = parado. Um trecho do tipo
+    oposto só encerra o segmento atual depois de durar o dwell do seu tipo
+    (stop_dwell_s para paradas, start_dwell_s para viagens); antes disso é
+    absorvido (semáforo, ruído de GPS). Um intervalo sem eventos maior que
+    max_gap_s fecha o segmento no último ponto recebido.
+
+    A contribuição de cada par de eventos (marcha lenta, evento brusco, km)
+    segue os critérios de fuel_economy.py e vai para o segmento do primeiro
+    ponto do par.
+    """
+
+    def __init__(self, stop_dwell_s: float = 180.0, start_dwell_s: float = 30.0,
+                 max_gap_s: float = 900.0):
+        self.dwell = {STOP: stop_dwell_s, TRIP: start_dwell_s}
+        self.max_gap_s = max_gap_s
+        self.devices: Dict[str, _DeviceState] = {}
+        self.late_events = 0
+
+    def process(self, event: TelemetryEvent) -> List[dict]:
+        """Aplica um evento; retorna os segmentos que ele fechou"""
+        ts = event.ts if event.ts.tzinfo else event.ts.replace(tzinfo=timezone.utc)
+        speed = event.speed_kmh or 0
+        kind = TRIP if speed >= IDLE_SPEED_THRESHOLD else STOP
+
+        state = self.devices.get(event.device_id)
+        if state is None:
+            state = self.devices[event.device_id] = _DeviceState()
+        if state.last_ts is not None and ts < state.last_ts:
+            self.late_events += 1
+            return []
+
+        closed = []
+        if state.current is not None and (ts - state.last_ts).total_seconds() > self.max_gap_s:
+            closed.extend(self._close(event.device_id, state))
+
+        if state.current is None:
+            state.current = _Segment(kind, ts, event.lat, event.lon, speed)
+        else:
+            dt = (ts - state.last_ts).total_seconds()
+            idle_s = dt if state.last_speed < IDLE_SPEED_THRESHOLD else 0.0
+            harsh = dt > 0 and abs(speed - state.last_speed) / dt > HARSH_ACCEL_THRESHOLD
+            km = 0.0
+            if all([state.last_lat, state.last_lon, event.lat, event.lon]):
+                km = haversine_distance(state.last_lat, state.last_lon, event.lat, event.lon)
+
+            if state.candidate is not None:
+                state.candidate.extend(ts, event.lat, event.lon, speed, idle_s, harsh, km)
+            else:
+                state.current.extend(ts, event.lat, event.lon, speed, idle_s, harsh, km)
+
+            if kind == state.current.kind:
+                if state.candidate is not None:
+                    state.current.merge(state.candidate)
+                    state.candidate = None
+            elif state.candidate is None:
+                state.candidate = _Segment(kind, ts, event.lat, event.lon, speed)
+
+            candidate = state.candidate
+            if candidate is not None and \
+                    (candidate.end_ts - candidate.start_ts).total_seconds() >= self.dwell[kind]:
+                # Segmento atual termina onde o candidato começou
+                closed.append(state.current.to_row(event.device_id))
+                state.current = candidate
+                state.candidate = None
+
+        state.last_ts = ts
+        state.last_lat = event.lat
+        state.last_lon = event.lon
+        state.last_speed = speed
+        return closed
+
+    def _close(self, device_id: str, state: _DeviceState) -> List[dict]:
+        """Fecha o segmento aberto (um candidato pendente é absorvido)"""
+        if state.candidate is not None:
+            state.current.merge(state.candidate)
+        closed = [state.current.to_row(device_id)]
+        state.current = None
+        state.candidate = None
+        return closed
+
+    def flush(self, device_id: Optional[str] = None) -> List[dict]:
+        """Fecha os segmentos abertos (ex.: fim de um backfill)"""
+        closed = []
+        for dev_id, state in self.devices.items():
+            if state.current is not None and device_id in (None, dev_id):
+                closed.extend(self._close(dev_id, state))
+        return closed
+
+    def open_segments(self, device_id: Optional[str] = None) -> List[dict]:
+        """Segmentos em andamento (ainda não gravados)"""
+        result = []
+        for dev_id in sorted(self.devices):
+            state = self.devices[dev_id]
+            if state.current is None or device_id not in (None, dev_id):
+                continue
+            row = state.current.to_row(dev_id)
+            pending = state.candidate
+            if pending is not None:
+                row.update(
+                    end_ts=pending.end_ts,
+                    end_lat=pending.end_lat,
+                    end_lon=pending.end_lon,
+                    duration_s=(pending.end_ts - row["start_ts"]).total_seconds(),
+                    distance_km=row["distance_km"] + pending.distance_km,
+                    idle_s=row["idle_s"] + pending.idle_s,
+                    harsh_events=row["harsh_events"] + pending.harsh_events,
+                    events=row["events"] + pending.events - 1,
+                    max_speed_kmh=max(row["max_speed_kmh"], pending.max_speed_kmh),
+                )
+            result.append(row)
+        return result
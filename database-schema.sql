@@ -38,6 +38,111 @@ CREATE INDEX IF NOT EXISTS idx_telemetry_speed
 ON telemetry_events(speed_kmh) 
 WHERE speed_kmh > 90;
 
+-- ================================================
+-- 2.1 TABELA DE ALERTAS (motor de regras na ingestão)
+-- ================================================
+
+CREATE TABLE IF NOT EXISTS alerts (
+  id bigserial PRIMARY KEY,
+  device_id text NOT NULL,
+  ts timestamptz NOT NULL,
+  alert_type text NOT NULL,
+  rule_id text NOT NULL,
+  value double precision NOT NULL,
+  message text NOT NULL,
+  created_at timestamptz DEFAULT now()
+);
+
+-- Listagem recente e contagem de devices com alerta (index-only scan)
+CREATE INDEX IF NOT EXISTS idx_alerts_ts_device 
+ON alerts(ts DESC, device_id);
+
+-- Histórico de alertas por device
+CREATE INDEX IF NOT EXISTS idx_alerts_device_ts 
+ON alerts(device_id, ts DESC);
+
+-- ================================================
+-- 2.2 GEOFENCES (polígonos e transições entrada/saída)
+-- ================================================
+
+CREATE TABLE IF NOT EXISTS geofences (
+  id bigserial PRIMARY KEY,
+  name text NOT NULL,
+  kind text NOT NULL DEFAULT 'site',
+  polygon jsonb NOT NULL,
+  created_at timestamptz DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS geofence_events (
+  id bigserial PRIMARY KEY,
+  device_id text NOT NULL,
+  geofence_id bigint NOT NULL REFERENCES geofences(id) ON DELETE CASCADE,
+  transition text NOT NULL,
+  ts timestamptz NOT NULL,
+  lat double precision,
+  lon double precision
+);
+
+CREATE INDEX IF NOT EXISTS idx_geofence_events_ts 
+ON geofence_events(ts DESC);
+
+CREATE INDEX IF NOT EXISTS idx_geofence_events_device_ts 
+ON geofence_events(device_id, ts DESC);
+
+-- ================================================
+-- 2.3 RESUMO DIÁRIO DE COMBUSTÍVEL (por device, dia UTC)
+-- ================================================
+
+CREATE TABLE IF NOT EXISTS fuel_daily_summary (
+  device_id text NOT NULL,
+  day date NOT NULL,
+  events integer NOT NULL,
+  idle_hours double precision NOT NULL,
+  harsh_events integer NOT NULL,
+  distance_km double precision NOT NULL,
+  idle_cost double precision NOT NULL,
+  aggressive_cost double precision NOT NULL,
+  estimated_waste double precision NOT NULL,
+  config_hash text NOT NULL DEFAULT '',   -- FuelConfig usado (fuel_economy.config_hash)
+  updated_at timestamptz DEFAULT now(),
+  PRIMARY KEY (device_id, day)
+);
+
+-- Bancos criados antes da coluna config_hash
+ALTER TABLE fuel_daily_summary ADD COLUMN IF NOT EXISTS config_hash text NOT NULL DEFAULT '';
+
+-- Comparação entre períodos (soma da frota por intervalo de dias)
+CREATE INDEX IF NOT EXISTS idx_fuel_daily_day 
+ON fuel_daily_summary(day);
+
+-- ================================================
+-- 2.4 VIAGENS E PARADAS (segmentadas na ingestão)
+-- ================================================
+
+CREATE TABLE IF NOT EXISTS trips (
+  id bigserial PRIMARY KEY,
+  device_id text NOT NULL,
+  kind text NOT NULL,                 -- trip | stop
+  start_ts timestamptz NOT NULL,
+  end_ts timestamptz NOT NULL,
+  duration_s double precision NOT NULL,
+  distance_km double precision NOT NULL,
+  idle_s double precision NOT NULL,
+  harsh_events integer NOT NULL,
+  events integer NOT NULL,
+  max_speed_kmh double precision,
+  start_lat double precision,
+  start_lon double precision,
+  end_lat double precision,
+  end_lon double precision
+);
+
+CREATE INDEX IF NOT EXISTS idx_trips_start 
+ON trips(start_ts DESC);
+
+CREATE INDEX IF NOT EXISTS idx_trips_device_start 
+ON trips(device_id, start_ts DESC);
+
 -- ================================================
 -- 3. COMENTÁRIOS E DOCUMENTAÇÃO
 -- ================================================
@@ -50,6 +155,11 @@ COMMENT ON COLUMN telemetry_events.lon IS 'Longitude em graus decimais';
 COMMENT ON COLUMN telemetry_events.speed_kmh IS 'Velocidade em km/h';
 COMMENT ON COLUMN telemetry_events.engine_temp_c IS 'Temperatura do motor em Celsius';
 COMMENT ON COLUMN telemetry_events.battery_v IS 'Voltagem da bateria';
+COMMENT ON TABLE alerts IS 'Alertas disparados pelo motor de regras na ingestão';
+COMMENT ON TABLE geofences IS 'Cercas virtuais: polygon = [[lat, lon], ...]';
+COMMENT ON TABLE geofence_events IS 'Transições enter/exit de devices em geofences';
+COMMENT ON TABLE fuel_daily_summary IS 'Resumo diário de combustível por device (recalculado com dados atrasados)';
+COMMENT ON TABLE trips IS 'Viagens e paradas fechadas, com distância e duração pré-calculadas';
 
 -- ================================================
 -- 4. EXEMPLO DE DADOS (OPCIONAL - PARA TESTE)
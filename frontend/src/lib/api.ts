@@ -38,6 +38,23 @@ export interface Alert {
   message: string
 }
 
+export interface TrackPoint {
+  ts: string
+  lat: number
+  lon: number
+  speed_kmh: number | null
+  seg_km: number
+}
+
+export interface DeviceTrack {
+  device_id: string
+  period_hours: number
+  tolerance_m: number
+  raw_points: number
+  distance_km: number
+  points: TrackPoint[]
+}
+
 export const api = {
   async healthCheck(): Promise<any> {
     const res = await fetch(`${API_URL}/health`)
@@ -69,6 +86,19 @@ export const api = {
     return res.json()
   },
 
+  async getDeviceTrack(
+    deviceId: string,
+    hours: number = 24,
+    toleranceM?: number
+  ): Promise<DeviceTrack> {
+    const tolerance = toleranceM === undefined ? '' : `&tolerance_m=${toleranceM}`
+    const res = await fetch(
+      `${API_URL}/devices/${deviceId}/track?hours=${hours}${tolerance}`
+    )
+    if (!res.ok) throw new Error('Failed to fetch track')
+    return res.json()
+  },
+
   async getMetrics(minutes: number = 5): Promise<MetricsSummary> {
     const res = await fetch(`${API_URL}/metrics/summary?minutes=${minutes}`)
     if (!res.ok) throw new Error('Failed to fetch metrics')
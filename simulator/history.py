@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+Gerador offline de histórico para MonitoraEngine
+Sintetiza meses de telemetria para N devices muito mais rápido que o tempo
+real, com o mesmo movimento do simulador (_update_position), e grava
+direto no destino: Postgres (COPY), SQLite, snapshot do modo memória,
+CSV ou trace de ingestão (replay com simulator.py --mode replay)
+
+Cada device tem um perfil sorteado: turno (horário, duração, fins de
+semana), parcela de paradas com motor ligado (marcha lenta) e
+agressividade (arrancadas bruscas). Fora do turno e em paradas com
+motor desligado não há eventos. A mesma semente gera o mesmo histórico.
+
+Uso:
+    python history.py --devices 100 --days 30 --output postgres
+    python history.py --devices 50 --days 90 --output sqlite --path ../backend/monitora.db
+    python history.py --devices 20 --days 7 --output trace --path semana.trace --seed 7
+"""
+
+import asyncio
+import csv
+import heapq
+import math
+import os
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List, Optional, Tuple
+
+import click
+
+from simulator import BACKEND_DIR, CITIES, DeviceState, TelemetrySimulator, import_backend
+
+OUTPUTS = ("postgres", "sqlite", "memory", "csv", "trace")
+DEFAULT_PATHS = {
+    "sqlite": str(BACKEND_DIR / "monitora.db"),
+    "memory": str(BACKEND_DIR / "memory_snapshot.bin"),
+    "csv": "history.csv",
+    "trace": "history.trace",
+}
+LOCAL_UTC_OFFSET_H = -3         # Turnos no horário de Brasília
+COLUMNS = ("device_id", "ts", "lat", "lon", "speed_kmh", "engine_temp_c", "battery_v")
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# (ts µs, device_id, lat, lon, speed_kmh, engine_temp_c, battery_v)
+Row = Tuple[int, str, float, float, float, float, float]
+
+
+@dataclass
+class DriverProfile:
+    """Rotina sorteada de um device"""
+    home_lat: float
+    home_lon: float
+    shift_start_h: float        # Hora local de início do turno
+    shift_hours: float
+    weekends: bool
+    idle_share: float           # Fração das paradas com motor ligado
+    aggressiveness: float       # 0..1, chance de arrancadas bruscas
+
+
+def _ramp(v_from: float, v_to: float, accel_kmh_s: float, dt_s: float) -> List[float]:
+    """Velocidades dos próximos passos indo de v_from a v_to com aceleração fixa"""
+    step = abs(accel_kmh_s) * dt_s
+    speeds = []
+    v = v_from
+    while abs(v_to - v) > 1e-9:
+        v = min(v + step, v_to) if v_to > v else max(v - step, v_to)
+        speeds.append(v)
+    return speeds
+
+
+class HistoryGenerator(TelemetrySimulator):
+    """
+    Histórico sintético em ordem de ts (todos os devices intercalados,
+    como a ingestão real gravaria)
+
+    Dirigindo, a velocidade segue _update_position entre speed_min e
+    speed_max; arrancadas, frenagens, trânsito parado e episódios bruscos
+    fixam a faixa de velocidade de cada passo (speed_min = speed_max).
+    """
+
+    def __init__(
+        self,
+        num_devices: int,
+        city: str,
+        speed_min: float,
+        speed_max: float,
+        interval_s: float,
+        seed: int
+    ):
+        # O simulador usa o módulo random: semente antes de sortear os devices
+        random.seed(seed)
+        super().__init__("", num_devices, city, speed_min, speed_max)
+        self.interval_s = interval_s
+        self.interval_ms = int(interval_s * 1000)
+        self.interval_us = int(interval_s * 1_000_000)
+        self.cruise = (speed_min, speed_max)
+        self.profiles = {
+            device_id: DriverProfile(
+                home_lat=device.lat,
+                home_lon=device.lon,
+                shift_start_h=random.uniform(5, 9),
+                shift_hours=random.uniform(8, 11),
+                weekends=random.random() < 0.3,
+                idle_share=random.uniform(0.1, 0.6),
+                aggressiveness=random.random() ** 2,
+            )
+            for device_id, device in self.devices.items()
+        }
+
+    # ==================== MOVIMENTO ====================
+
+    def _step(self, device: DeviceState, v_min: float, v_max: float):
+        """Um intervalo de _update_position com a velocidade limitada a [v_min, v_max]"""
+        center_lat, center_lon = self.city_config["center"]
+        dy = (device.lat - center_lat) * 111
+        dx = (device.lon - center_lon) * 111 * math.cos(math.radians(center_lat))
+        if dx * dx + dy * dy > self.city_config["radius_km"] ** 2:
+            # Fora da cidade: volta na direção do centro
+            device.heading = (math.degrees(math.atan2(-dx, -dy)) + random.uniform(-30, 30)) % 360
+        self.speed_min, self.speed_max = v_min, v_max
+        self._update_position(device, self.interval_ms)
+        self.speed_min, self.speed_max = self.cruise
+
+    @staticmethod
+    def _row(device: DeviceState, ts_us: int) -> Row:
+        return (
+            ts_us, device.device_id,
+            round(device.lat, 6), round(device.lon, 6), round(device.speed_kmh, 2),
+            round(device.engine_temp_c, 1), round(device.battery_v, 2)
+        )
+
+    def _drive(self, device: DeviceState, profile: DriverProfile, t: int, until: int):
+        """Viagem de t até until (sai do repouso e termina parado); retorna o novo t"""
+        dt = self.interval_s
+        lo, hi = self.cruise
+        harsh_p = 0.004 * profile.aggressiveness
+        traffic_p = 0.015
+        stop_accel = random.uniform(0.8, 1.8)
+        device.speed_kmh = 0.0
+        # Acelerações e frenagens normais ficam abaixo de 2 km/h/s (HARSH_ACCEL_THRESHOLD);
+        # arrancadas e episódios bruscos passam do limiar
+        accel = random.uniform(2.5, 4.0) if random.random() < profile.aggressiveness * 0.3 \
+            else random.uniform(0.6, 1.6)
+        plan = deque(_ramp(0.0, random.uniform(lo, hi), accel, dt))
+        while t < until:
+            # Frenagem final começa a tempo de parar antes de until (+1 passo de folga)
+            if math.ceil(device.speed_kmh / (stop_accel * dt)) + 1 >= (until - t) // self.interval_us:
+                break
+            if not plan:
+                r = random.random()
+                v = device.speed_kmh
+                if r < harsh_p:
+                    # Reduz e acelera forte (semáforo, ultrapassagem)
+                    low = random.uniform(0, 15)
+                    plan.extend(_ramp(v, low, random.uniform(2, 4), dt))
+                    plan.extend(_ramp(low, random.uniform(lo, hi), random.uniform(2.5, 4.5), dt))
+                elif r < harsh_p + traffic_p:
+                    # Trânsito parado: marcha lenta com o veículo em movimento
+                    crawl = random.uniform(0, 4)
+                    plan.extend(_ramp(v, crawl, random.uniform(0.8, 1.8), dt))
+                    plan.extend([crawl] * random.randint(1, 12))
+                    plan.extend(_ramp(crawl, random.uniform(lo, hi), random.uniform(0.6, 1.6), dt))
+            if plan:
+                v = plan.popleft()
+                self._step(device, v, v)
+            else:
+                self._step(device, lo, hi)
+            yield self._row(device, t)
+            t += self.interval_us
+        for v in _ramp(device.speed_kmh, 0.0, stop_accel, dt):
+            if t >= until:
+                break
+            self._step(device, v, v)
+            yield self._row(device, t)
+            t += self.interval_us
+        return t
+
+    def _idle(self, device: DeviceState, t: int, until: int):
+        """Parado com motor ligado (eventos com velocidade 0)"""
+        while t < until:
+            self._step(device, 0.0, 0.0)
+            yield self._row(device, t)
+            t += self.interval_us
+        return t
+
+    def _device_history(self, device: DeviceState, start_us: int, end_us: int) -> Iterator[Row]:
+        profile = self.profiles[device.device_id]
+        offset_us = LOCAL_UTC_OFFSET_H * 3_600_000_000
+        day_us = 86_400_000_000
+        # Meia-noite local do primeiro dia (ts em UTC)
+        day = (start_us + offset_us) // day_us * day_us - offset_us
+        while day < end_us:
+            weekday = datetime.fromtimestamp((day - offset_us) / 1e6, timezone.utc).weekday()
+            if weekday < 5 or profile.weekends:
+                shift_start = day + int((profile.shift_start_h + random.uniform(-0.5, 0.5)) * 3.6e9)
+                shift_end = min(end_us, shift_start + int(profile.shift_hours * 3.6e9))
+                t = max(shift_start, start_us)
+                if t < shift_end:
+                    # Começo do turno: na garagem, motor frio e bateria carregada
+                    device.lat, device.lon = profile.home_lat, profile.home_lon
+                    device.engine_temp_c = random.uniform(85, 88)
+                    device.battery_v = random.uniform(12.5, 12.8)
+                while t < shift_end:
+                    t = yield from self._drive(
+                        device, profile, t, min(shift_end, t + int(random.uniform(10, 45) * 6e7))
+                    )
+                    stop_us = int(random.uniform(2, 40) * 6e7)
+                    if random.random() < profile.idle_share:
+                        t = yield from self._idle(device, t, min(shift_end, t + stop_us // 2))
+                    else:
+                        t += stop_us        # Motor desligado: sem eventos
+            day += day_us
+
+    def events(self, start: datetime, end: datetime) -> Iterator[Row]:
+        """Todas as leituras em [start, end) em ordem de ts"""
+        start_us = int((start - _EPOCH).total_seconds() * 1e6)
+        end_us = int((end - _EPOCH).total_seconds() * 1e6)
+        return heapq.merge(*(
+            self._device_history(device, start_us, end_us)
+            for device in self.devices.values()
+        ))
+
+
+# ==================== DESTINOS ====================
+
+def _ts(ts_us: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=ts_us)
+
+
+class PostgresSink:
+    """COPY em telemetry_events (schema do database-schema.sql)"""
+
+    def __init__(self, database_url: str):
+        self.database_url = database_url
+        self.conn = None
+
+    async def open(self):
+        import asyncpg
+        self.conn = await asyncpg.connect(self.database_url)
+
+    async def write(self, rows: List[Row]):
+        await self.conn.copy_records_to_table(
+            "telemetry_events",
+            records=[(r[1], _ts(r[0]), *r[2:]) for r in rows],
+            columns=list(COLUMNS)
+        )
+
+    async def close(self):
+        await self.conn.execute("ANALYZE telemetry_events")
+        await self.conn.close()
+
+
+class SQLiteSink:
+    """Arquivo do backend SQLite (cria o schema se preciso)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.db = None
+
+    async def open(self):
+        database_sqlite = import_backend("database_sqlite")
+        self.insert = database_sqlite._INSERT_EVENT
+        self.db = database_sqlite.SQLiteDatabase(self.path)
+        self.db._open_writer()
+        self.created_at = time.time_ns() // 1000
+
+    async def write(self, rows: List[Row]):
+        writer = self.db.writer
+        writer.execute("BEGIN IMMEDIATE")
+        writer.executemany(self.insert, [(r[1], r[0], *r[2:], self.created_at) for r in rows])
+        writer.execute("COMMIT")
+
+    async def close(self):
+        self.db.writer.execute("ANALYZE")
+        self.db.writer.close()
+
+
+class MemorySnapshotSink:
+    """Snapshot do main_simple.py (guarda só as últimas leituras de cada device)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.total = 0
+
+    async def open(self):
+        self.models = import_backend("models")
+        self.store = import_backend("telemetry_store").TelemetryRingStore()
+
+    async def write(self, rows: List[Row]):
+        construct = self.models.TelemetryEvent.model_construct
+        for r in rows:
+            self.store.append(construct(
+                device_id=r[1], ts=_ts(r[0]), lat=r[2], lon=r[3],
+                speed_kmh=r[4], engine_temp_c=r[5], battery_v=r[6]
+            ))
+        self.total += len(rows)
+
+    async def close(self):
+        extra = {"total_events": self.total, "total_alerts": 0, "alerts": []}
+        await import_backend("store_snapshot").write_snapshot(self.store, self.path, extra)
+
+
+class CsvSink:
+    """CSV com cabeçalho (ts em ISO 8601 UTC)"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    async def open(self):
+        self.file = open(self.path, "w", newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(COLUMNS)
+
+    async def write(self, rows: List[Row]):
+        self.writer.writerows((r[1], _ts(r[0]).isoformat(), *r[2:]) for r in rows)
+
+    async def close(self):
+        self.file.close()
+
+
+class TraceSink:
+    """Trace de ingestão com chegada = ts (replay em N× pelo simulador)"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    async def open(self):
+        self.models = import_backend("models")
+        self.trace = import_backend("traffic_trace").TraceWriter(self.path)
+        self.trace.open()
+
+    async def write(self, rows: List[Row]):
+        construct = self.models.TelemetryEvent.model_construct
+        for r in rows:
+            self.trace.record(construct(
+                device_id=r[1], ts=_ts(r[0]), lat=r[2], lon=r[3],
+                speed_kmh=r[4], engine_temp_c=r[5], battery_v=r[6]
+            ), r[0])
+        await self.trace.flush()
+
+    async def close(self):
+        await self.trace.stop()
+
+
+def make_sink(output: str, path: Optional[str], database_url: str):
+    if output == "postgres":
+        return PostgresSink(database_url)
+    path = path or DEFAULT_PATHS[output]
+    return {
+        "sqlite": SQLiteSink,
+        "memory": MemorySnapshotSink,
+        "csv": CsvSink,
+        "trace": TraceSink,
+    }[output](path)
+
+
+async def generate(generator: HistoryGenerator, sink, start: datetime, end: datetime,
+                   batch_size: int) -> int:
+    """Gera e grava em lotes; retorna o total de eventos"""
+    await sink.open()
+    total = 0
+    started = time.perf_counter()
+    span_us = (end - start).total_seconds() * 1e6
+    start_us = (start - _EPOCH).total_seconds() * 1e6
+    batch: List[Row] = []
+    try:
+        for row in generator.events(start, end):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                await sink.write(batch)
+                total += len(batch)
+                elapsed = time.perf_counter() - started
+                done = (row[0] - start_us) / span_us
+                print(f"\r📝 {total:,} eventos | {done * 100:5.1f}% do período | "
+                      f"{total / elapsed:,.0f} eventos/s", end="", flush=True)
+                batch = []
+        if batch:
+            await sink.write(batch)
+            total += len(batch)
+    finally:
+        await sink.close()
+    print()
+    return total
+
+
+@click.command()
+@click.option('--devices', type=int, default=20, help='Número de devices')
+@click.option('--days', type=float, default=30.0, help='Dias de histórico (terminando em --end)')
+@click.option('--end', type=click.DateTime(formats=['%Y-%m-%d', '%Y-%m-%dT%H:%M']), default=None,
+              help='Fim do período em UTC (padrão: agora; fixe para reproduzir exatamente)')
+@click.option('--interval-s', type=float, default=10.0, help='Intervalo entre leituras em segundos')
+@click.option('--city', type=click.Choice(list(CITIES), case_sensitive=False), default='saopaulo')
+@click.option('--speed-min', type=float, default=20.0, help='Velocidade mínima em viagem (km/h)')
+@click.option('--speed-max', type=float, default=90.0, help='Velocidade máxima em viagem (km/h)')
+@click.option('--seed', type=int, default=42, help='Semente (mesma semente = mesmo histórico)')
+@click.option('--output', type=click.Choice(OUTPUTS), default='sqlite', help='Destino')
+@click.option('--path', type=str, default=None, help='Arquivo de saída (sqlite, memory, csv, trace)')
+@click.option('--database-url', type=str, default=None, help='Postgres (padrão: DATABASE_URL)')
+@click.option('--batch-size', type=int, default=50000, help='Eventos por lote gravado')
+def main(devices, days, end, interval_s, city, speed_min, speed_max, seed, output, path,
+         database_url, batch_size):
+    """Gera histórico sintético de telemetria"""
+    if devices < 1 or days <= 0 or interval_s <= 0 or batch_size < 1:
+        click.echo("❌ --devices, --days, --interval-s e --batch-size devem ser positivos")
+        return
+    if speed_min >= speed_max:
+        click.echo("❌ Velocidade mínima deve ser menor que máxima")
+        return
+    database_url = database_url or os.getenv("DATABASE_URL", "")
+    if output == "postgres" and not database_url:
+        click.echo("❌ Informe --database-url ou DATABASE_URL para --output postgres")
+        return
+
+    if end is None:
+        end = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    else:
+        end = end.replace(tzinfo=timezone.utc)
+    start = end - timedelta(days=days)
+
+    generator = HistoryGenerator(devices, city, speed_min, speed_max, interval_s, seed)
+    sink = make_sink(output, path, database_url)
+    print(f"\n🗂️  {devices} devices | {start:%Y-%m-%d %H:%M} → {end:%Y-%m-%d %H:%M} UTC | "
+          f"a cada {interval_s:g}s | semente {seed}")
+    print(f"💾 Destino: {output} {getattr(sink, 'path', '')}")
+    started = time.perf_counter()
+    total = asyncio.run(generate(generator, sink, start, end, batch_size))
+    elapsed = time.perf_counter() - started
+    simulated_s = (end - start).total_seconds()
+    print(f"✅ {total:,} eventos em {elapsed:.1f}s "
+          f"({simulated_s / elapsed:,.0f}x o tempo real)")
+
+
+if __name__ == '__main__':
+    main()
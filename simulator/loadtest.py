@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Teste de carga em malha aberta para MonitoraEngine
+Envia POST /ingest numa taxa fixa, independente do tempo de resposta, e
+mede a latência num histograma log-linear (estilo HdrHistogram)
+
+A latência é medida a partir do instante PLANEJADO do envio: se o backend
+(ou o cliente) atrasa, a fila aparece nos percentis em vez de reduzir a
+carga oferecida (sem "coordinated omission"). Pelo mesmo motivo falhas
+(erro HTTP, timeout, erro de conexão, perdidas pelo cliente) entram nos
+percentis valendo no mínimo o timeout: sob sobrecarga elas não podem
+deixar p99/p99.9 melhores do que o backend realmente está.
+
+Uso:
+    python loadtest.py --rate 2000 --duration-s 60 --label v1.4 --output v1.4.json
+    python loadtest.py --rate 2000 --duration-s 60 --compare v1.4.json
+"""
+
+import asyncio
+import json
+import math
+import os
+import platform
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import List, Optional
+
+import aiohttp
+import click
+
+from simulator import CITIES, TelemetrySimulator
+
+PERCENTILES = (50.0, 90.0, 95.0, 99.0, 99.9)
+
+
+class LatencyHistogram:
+    """
+    Histograma log-linear em microssegundos: cada potência de 2 é dividida
+    em faixas lineares (erro relativo < 2/sub_buckets, ~0,8% no padrão)
+    Registro O(1) e memória fixa, qualquer que seja o número de amostras
+    """
+
+    def __init__(self, max_us: int = 60_000_000, sub_buckets: int = 256):
+        self.sub_buckets = sub_buckets
+        self.half = sub_buckets // 2
+        self.sub_bits = sub_buckets.bit_length() - 1
+        self.max_us = max_us
+        self.counts = [0] * (self._index(max_us) + 1)
+        self.total = 0
+        self.sum_us = 0
+        self.min_us = None
+        self.max_seen_us = 0
+        self.overflow = 0
+
+    def _index(self, value: int) -> int:
+        # Abaixo de sub_buckets a resolução é de 1 µs; acima, cada potência
+        # de 2 tem sub_buckets/2 faixas lineares
+        if value < self.sub_buckets:
+            return value
+        shift = value.bit_length() - self.sub_bits
+        return self.sub_buckets + (shift - 1) * self.half + (value >> shift) - self.half
+
+    def _value(self, index: int) -> int:
+        """Maior valor representado pelo bucket"""
+        if index < self.sub_buckets:
+            return index
+        shift, top = divmod(index - self.sub_buckets, self.half)
+        shift += 1
+        return ((top + self.half + 1) << shift) - 1
+
+    def record(self, value_us: int):
+        value_us = max(0, int(value_us))
+        if value_us > self.max_us:
+            self.overflow += 1
+            value_us = self.max_us
+        self.counts[self._index(value_us)] += 1
+        self.total += 1
+        self.sum_us += value_us
+        self.min_us = value_us if self.min_us is None else min(self.min_us, value_us)
+        self.max_seen_us = max(self.max_seen_us, value_us)
+
+    def percentile(self, p: float) -> int:
+        if not self.total:
+            return 0
+        target = max(1, math.ceil(self.total * p / 100))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(self._value(index), self.max_seen_us)
+        return self.max_seen_us
+
+    def summary(self) -> dict:
+        """Percentis, média, mínimo e máximo em milissegundos"""
+        result = {f"p{p:g}": self.percentile(p) / 1000 for p in PERCENTILES}
+        result.update({
+            "mean": (self.sum_us / self.total / 1000) if self.total else 0.0,
+            "min": (self.min_us or 0) / 1000,
+            "max": self.max_seen_us / 1000,
+            "count": self.total,
+            "overflow": self.overflow,
+        })
+        return result
+
+    def buckets(self) -> List[List[int]]:
+        """[valor µs, contagem] dos buckets não vazios (para juntar execuções)"""
+        return [[self._value(i), count] for i, count in enumerate(self.counts) if count]
+
+
+class OpenLoopLoadTest:
+    """Disparo em taxa fixa: requisições saem no horário, respondam ou não"""
+
+    def __init__(
+        self,
+        api_url: str,
+        rate: float,
+        duration_s: float,
+        warmup_s: float,
+        simulator: TelemetrySimulator,
+        concurrency: int,
+        max_in_flight: int,
+        timeout_s: float
+    ):
+        self.api_url = api_url
+        self.rate = rate
+        self.duration_s = duration_s
+        self.warmup_s = warmup_s
+        self.simulator = simulator
+        self.devices = list(simulator.devices.values())
+        self.concurrency = concurrency
+        self.max_in_flight = max_in_flight
+        self.timeout_s = timeout_s
+        self.interval_ms = max(1, int(1000 * len(self.devices) / rate))
+
+        self.response_time = LatencyHistogram()     # Desde o horário planejado
+        self.service_time = LatencyHistogram()      # Desde o envio efetivo
+        self.ok = 0
+        self.errors: Counter = Counter()
+        self.dropped = 0
+        self.scheduled = 0
+        self.in_flight = 0
+        self.max_send_lag_s = 0.0
+
+    async def _request(self, session: aiohttp.ClientSession, device, planned: float, measured: bool):
+        loop = asyncio.get_running_loop()
+        self.simulator._update_position(device, self.interval_ms)
+        payload = self.simulator._payload(device)
+        self.in_flight += 1
+        started = loop.time()
+        try:
+            async with session.post(f"{self.api_url}/ingest", json=payload) as response:
+                await response.read()
+                status = response.status
+            error = None if status < 400 else f"http_{status}"
+        except asyncio.TimeoutError:
+            error = "timeout"
+        except aiohttp.ClientError as e:
+            error = type(e).__name__
+        finally:
+            self.in_flight -= 1
+        if not measured:
+            return
+        done = loop.time()
+        response_us = (done - planned) * 1_000_000
+        service_us = (done - started) * 1_000_000
+        if error:
+            # Falha rápida (503, conexão recusada) não pode melhorar os percentis
+            self.errors[error] += 1
+            response_us = max(response_us, self.timeout_s * 1_000_000)
+            service_us = max(service_us, self.timeout_s * 1_000_000)
+        else:
+            self.ok += 1
+        self.response_time.record(response_us)
+        self.service_time.record(service_us)
+
+    async def run(self) -> float:
+        """Dispara até o fim e espera as respostas; retorna a duração medida"""
+        connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=60)
+        timeout = aiohttp.ClientTimeout(total=self.timeout_s)
+        loop = asyncio.get_running_loop()
+        tasks = set()
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            start = loop.time()
+            total = int(self.rate * (self.warmup_s + self.duration_s))
+            warmup = int(self.rate * self.warmup_s)
+            sent = 0
+            while sent < total:
+                now = loop.time()
+                due = min(total, int((now - start) * self.rate) + 1)
+                for i in range(sent, due):
+                    planned = start + i / self.rate
+                    self.max_send_lag_s = max(self.max_send_lag_s, now - planned)
+                    measured = i >= warmup
+                    if self.in_flight >= self.max_in_flight:
+                        # Cliente saturado: conta como perdido em vez de reduzir a taxa
+                        if measured:
+                            self.dropped += 1
+                            self.response_time.record(self.timeout_s * 1_000_000)
+                        continue
+                    # Device escolhido aqui: a rajada inteira é criada antes de qualquer task rodar
+                    device = self.devices[self.scheduled % len(self.devices)]
+                    task = asyncio.create_task(self._request(session, device, planned, measured))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                    self.scheduled += 1
+                sent = due
+                next_at = start + sent / self.rate
+                await asyncio.sleep(max(0.0, next_at - loop.time()))
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            return loop.time() - start - self.warmup_s
+
+    def results(self, elapsed_s: float, label: str) -> dict:
+        offered = int(self.rate * self.duration_s)
+        failed = sum(self.errors.values())
+        return {
+            "label": label,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "host": platform.node(),
+            "config": {
+                "api_url": self.api_url,
+                "rate": self.rate,
+                "duration_s": self.duration_s,
+                "warmup_s": self.warmup_s,
+                "devices": len(self.devices),
+                "concurrency": self.concurrency,
+                "max_in_flight": self.max_in_flight,
+                "timeout_s": self.timeout_s,
+            },
+            "requests": {
+                "offered": offered,
+                "ok": self.ok,
+                "errors": failed,
+                "dropped": self.dropped,
+                "error_rate": (failed + self.dropped) / offered if offered else 0.0,
+                "errors_by_kind": dict(self.errors),
+            },
+            "throughput_rps": self.ok / elapsed_s if elapsed_s > 0 else 0.0,
+            "max_send_lag_ms": self.max_send_lag_s * 1000,
+            "response_time_ms": self.response_time.summary(),
+            "service_time_ms": self.service_time.summary(),
+            "histogram_us": self.response_time.buckets(),
+        }
+
+
+def print_results(results: dict, baseline: Optional[dict] = None):
+    requests_ = results["requests"]
+    print("-" * 60)
+    print(f"📨 Oferecidas: {requests_['offered']:,} | ✅ {requests_['ok']:,} | "
+          f"❌ {requests_['errors']:,} | ⏭️  {requests_['dropped']:,} perdidas "
+          f"({requests_['error_rate'] * 100:.2f}%)")
+    if requests_["errors_by_kind"]:
+        print(f"   erros: {requests_['errors_by_kind']}")
+    print(f"🚀 Vazão: {results['throughput_rps']:,.0f} req/s "
+          f"(alvo {results['config']['rate']:,.0f}) | atraso máx. de disparo "
+          f"{results['max_send_lag_ms']:.1f}ms")
+    print()
+    print(f"{'latência (ms)':<16}{'resposta':>12}{'serviço':>12}" + (f"{'base':>12}{'Δ':>9}" if baseline else ""))
+    keys = [f"p{p:g}" for p in PERCENTILES] + ["max", "mean"]
+    for key in keys:
+        response = results["response_time_ms"][key]
+        line = f"{key:<16}{response:>12.2f}{results['service_time_ms'][key]:>12.2f}"
+        if baseline:
+            base = baseline["response_time_ms"][key]
+            delta = (response / base - 1) * 100 if base else 0.0
+            line += f"{base:>12.2f}{delta:>+8.1f}%"
+        print(line)
+    if baseline:
+        base_rps = baseline["throughput_rps"]
+        delta = (results["throughput_rps"] / base_rps - 1) * 100 if base_rps else 0.0
+        print(f"\nVazão vs '{baseline.get('label', '')}': {base_rps:,.0f} → "
+              f"{results['throughput_rps']:,.0f} req/s ({delta:+.1f}%)")
+
+
+@click.command()
+@click.option('--rate', type=float, default=1000.0, help='Requisições por segundo (alvo fixo)')
+@click.option('--duration-s', type=float, default=30.0, help='Duração medida em segundos')
+@click.option('--warmup-s', type=float, default=5.0, help='Aquecimento (fora das estatísticas)')
+@click.option('--devices', type=int, default=1000, help='Devices simulados (payloads em rodízio)')
+@click.option('--city', type=click.Choice(list(CITIES), case_sensitive=False), default='saopaulo')
+@click.option('--concurrency', type=int, default=1000, help='Conexões keep-alive no pool')
+@click.option('--max-in-flight', type=int, default=20000, help='Acima disso novas requisições são perdidas')
+@click.option('--timeout-s', type=float, default=10.0, help='Timeout por requisição')
+@click.option('--label', type=str, default='', help='Nome da versão testada (vai no resultado)')
+@click.option('--output', type=click.Path(dir_okay=False), default=None, help='Arquivo JSON de resultados')
+@click.option('--compare', type=click.Path(exists=True, dir_okay=False), default=None, help='Resultado anterior para comparar')
+@click.option('--api-url', type=str, default=None, help='URL da API (padrão: SIMULATOR_API_URL ou http://localhost:8000)')
+def main(rate, duration_s, warmup_s, devices, city, concurrency, max_in_flight, timeout_s,
+         label, output, compare, api_url):
+    """Teste de carga em malha aberta (taxa fixa) com percentis de latência"""
+    api_url = api_url or os.getenv('SIMULATOR_API_URL', 'http://localhost:8000')
+    if rate <= 0 or duration_s <= 0 or devices < 1:
+        click.echo("❌ --rate, --duration-s e --devices devem ser positivos")
+        return
+
+    simulator = TelemetrySimulator(api_url, devices, city, speed_min=40.0, speed_max=100.0)
+    test = OpenLoopLoadTest(
+        api_url, rate, duration_s, warmup_s, simulator, concurrency, max_in_flight, timeout_s
+    )
+    print(f"\n🎯 {api_url} | {rate:,.0f} req/s por {duration_s:g}s (+{warmup_s:g}s de aquecimento)")
+    print(f"🚗 {devices} devices | 🔌 até {concurrency} conexões")
+
+    t0 = time.perf_counter()
+    elapsed = asyncio.run(test.run())
+    results = test.results(elapsed, label)
+    results["wall_time_s"] = time.perf_counter() - t0
+
+    baseline = None
+    if compare:
+        with open(compare) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    output = output or f"loadtest-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n💾 Resultados: {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -4,12 +4,17 @@ Simulador de Telemetria para MonitoraEngine
 Gera dados realistas de múltiplos devices com movimento suave
 """
 
+import importlib
 import os
+import sys
 import time
 import random
+import asyncio
 import requests
+import aiohttp
 import click
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
 from typing import Dict, List, Tuple
 from dataclasses import dataclass
 import math
@@ -34,6 +39,12 @@ CITIES = {
     }
 }
 
+# Limite de devices por modo
+MAX_DEVICES = {
+    "sync": 100,
+    "async": 50000
+}
+
 @dataclass
 class DeviceState:
     """Estado atual de um device"""
@@ -126,9 +137,9 @@ class TelemetrySimulator:
         # Atualizar bateria (lenta diminuição)
         device.battery_v = max(11.8, device.battery_v - random.uniform(0, 0.01))
     
-    def _send_telemetry(self, device: DeviceState) -> bool:
-        """Envia telemetria para API"""
-        payload = {
+    def _payload(self, device: DeviceState) -> dict:
+        """Evento de telemetria do estado atual"""
+        return {
             "device_id": device.device_id,
             "ts": datetime.now(timezone.utc).isoformat(),
             "lat": round(device.lat, 6),
@@ -137,6 +148,10 @@ class TelemetrySimulator:
             "engine_temp_c": round(device.engine_temp_c, 1),
             "battery_v": round(device.battery_v, 2)
         }
+    
+    def _send_telemetry(self, device: DeviceState) -> bool:
+        """Envia telemetria para API"""
+        payload = self._payload(device)
         
         try:
             response = requests.post(
@@ -190,6 +205,241 @@ class TelemetrySimulator:
             print("\n\n⏹️  Simulador interrompido pelo usuário")
             print(f"📊 Total de iterações: {iteration}")
 
+
+class AsyncSender:
+    """Envio assíncrono com contadores e relatório por segundo (modos async e replay)"""
+    
+    def __init__(self, api_url: str, concurrency: int):
+        self.api_url = api_url
+        self.concurrency = concurrency
+        self.in_flight = 0
+        self.total_sent = 0
+        self.total_errors = 0
+        self.last_error = ""
+        self._reset_window()
+    
+    def _reset_window(self):
+        """Zera os contadores da janela de relatório"""
+        self.sent = 0
+        self.errors = 0
+        self.skipped = 0
+        self.max_lag_s = 0.0
+    
+    async def _post(self, session: aiohttp.ClientSession, payload: dict):
+        self.in_flight += 1
+        try:
+            async with session.post(f"{self.api_url}/ingest", json=payload) as response:
+                await response.read()
+                if response.status >= 400:
+                    raise aiohttp.ClientResponseError(
+                        response.request_info, response.history, status=response.status
+                    )
+            self.sent += 1
+            self.total_sent += 1
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.errors += 1
+            self.total_errors += 1
+            self.last_error = f"{payload['device_id']}: {e!r}"
+        finally:
+            self.in_flight -= 1
+    
+    async def _report(self, interval_s: float = 1.0):
+        """Vazão e atraso a cada segundo"""
+        iteration = 0
+        while True:
+            await asyncio.sleep(interval_s)
+            iteration += 1
+            line = (
+                f"[{iteration:05d}] ✅ {self.sent / interval_s:,.0f} eventos/s | "
+                f"❌ {self.errors} erros | ⏭️  {self.skipped} pulados | "
+                f"atraso máx. {self.max_lag_s * 1000:.0f}ms | em voo {self.in_flight}"
+            )
+            print(line)
+            if self.errors:
+                print(f"        último erro: {self.last_error}")
+            self._reset_window()
+
+
+class AsyncTelemetrySimulator(TelemetrySimulator, AsyncSender):
+    """
+    Modo asyncio para milhares de devices num processo
+    
+    Cada device tem seu próprio laço com prazos absolutos (start + fase +
+    k * intervalo), então o ritmo não acumula atraso; as fases espalham os
+    envios ao longo do intervalo. Um pool de conexões keep-alive limita as
+    requisições em voo (concurrency). Se um device atrasar mais de um
+    intervalo inteiro, os envios perdidos são pulados (não viram rajada).
+    """
+    
+    def __init__(self, *args, concurrency: int = 500, **kwargs):
+        TelemetrySimulator.__init__(self, *args, **kwargs)
+        AsyncSender.__init__(self, self.api_url, concurrency)
+    
+    async def _send_async(self, session: aiohttp.ClientSession, device: DeviceState):
+        await self._post(session, self._payload(device))
+    
+    async def _device_loop(
+        self,
+        session: aiohttp.ClientSession,
+        device: DeviceState,
+        interval_ms: int,
+        start: float,
+        phase_s: float
+    ):
+        loop = asyncio.get_running_loop()
+        interval_s = interval_ms / 1000
+        next_at = start + phase_s
+        while True:
+            delay = next_at - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                self.max_lag_s = max(self.max_lag_s, -delay)
+            self._update_position(device, interval_ms)
+            await self._send_async(session, device)
+            next_at += interval_s
+            behind = loop.time() - next_at
+            if behind >= interval_s:
+                missed = int(behind // interval_s)
+                self.skipped += missed
+                next_at += missed * interval_s
+    
+    async def _run_async(self, interval_ms: int, duration_s: float):
+        connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=60)
+        timeout = aiohttp.ClientTimeout(total=5)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            interval_s = interval_ms / 1000
+            devices = list(self.devices.values())
+            tasks = [
+                asyncio.create_task(self._device_loop(
+                    session, device, interval_ms, start, interval_s * i / len(devices)
+                ))
+                for i, device in enumerate(devices)
+            ]
+            tasks.append(asyncio.create_task(self._report()))
+            try:
+                if duration_s:
+                    await asyncio.sleep(duration_s)
+                else:
+                    await asyncio.gather(*tasks)
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+    
+    def run(self, interval_ms: int, duration_s: float = 0):
+        """Loop principal do simulador (asyncio)"""
+        print(f"\n🚀 MonitoraEngine Simulator (async)")
+        print(f"🚗 Devices: {self.num_devices}")
+        print(f"⏱️  Intervalo: {interval_ms}ms ({self.num_devices * 1000 / interval_ms:,.0f} eventos/s)")
+        print(f"🔌 Conexões: até {self.concurrency}")
+        print(f"🎯 API: {self.api_url}")
+        print("-" * 60)
+        try:
+            asyncio.run(self._run_async(interval_ms, duration_s))
+        except KeyboardInterrupt:
+            print("\n\n⏹️  Simulador interrompido pelo usuário")
+
+# Formatos e schemas compartilhados ficam no backend (trace, SQLite, snapshot)
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+
+def import_backend(module: str):
+    """Importa um módulo de backend/ (só quando o modo precisar)"""
+    if str(BACKEND_DIR) not in sys.path:
+        sys.path.append(str(BACKEND_DIR))
+    return importlib.import_module(module)
+
+
+def read_trace(path: str):
+    """(chegada µs, evento) de um trace de ingestão (traffic_trace.py)"""
+    return import_backend("traffic_trace").read_trace(path)
+
+
+class TraceReplayer(AsyncSender):
+    """
+    Reenvia um trace capturado no backend (TRACE_CAPTURE_PATH) com os
+    intervalos de chegada originais divididos por speed (0 = o mais
+    rápido possível, limitado só por concurrency)
+    
+    Os prazos são absolutos a partir do início, como no modo async: um
+    backend lento gera atraso (relatado), não encolhe o trace.
+    """
+    
+    def __init__(self, api_url: str, trace_path: str, speed: float,
+                 concurrency: int = 500, shift_ts: bool = False):
+        super().__init__(api_url, concurrency)
+        self.trace_path = trace_path
+        self.speed = speed
+        self.shift_ts = shift_ts
+    
+    async def _replay(self, session: aiohttp.ClientSession):
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.concurrency)
+        tasks = set()
+        start = loop.time()
+        first_arrival = None
+        ts_offset = timedelta(0)
+        
+        async def send(payload: dict):
+            try:
+                await self._post(session, payload)
+            finally:
+                slots.release()
+        
+        for count, (arrival_us, event) in enumerate(read_trace(self.trace_path)):
+            if first_arrival is None:
+                first_arrival = arrival_us
+                if self.shift_ts:
+                    ts_offset = datetime.now(timezone.utc) - event["ts"]
+            if self.speed > 0:
+                due = start + (arrival_us - first_arrival) / 1_000_000 / self.speed
+                delay = due - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                else:
+                    self.max_lag_s = max(self.max_lag_s, -delay)
+            elif count % 100 == 0:
+                await asyncio.sleep(0)      # Deixa o relatório e as respostas rodarem
+            await slots.acquire()
+            payload = {**event, "ts": (event["ts"] + ts_offset).isoformat()}
+            task = asyncio.create_task(send(payload))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+    
+    async def _run_replay(self):
+        connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=60)
+        timeout = aiohttp.ClientTimeout(total=5)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            report = asyncio.create_task(self._report())
+            try:
+                await self._replay(session)
+            finally:
+                report.cancel()
+    
+    def run(self):
+        """Reenvia o trace inteiro e mostra o total"""
+        pace = f"{self.speed:g}x" if self.speed > 0 else "o mais rápido possível"
+        print(f"\n🔁 MonitoraEngine Simulator (replay)")
+        print(f"📼 Trace: {self.trace_path} ({pace})")
+        print(f"🔌 Conexões: até {self.concurrency}")
+        print(f"🎯 API: {self.api_url}")
+        print("-" * 60)
+        started = time.perf_counter()
+        try:
+            asyncio.run(self._run_replay())
+        except KeyboardInterrupt:
+            print("\n\n⏹️  Replay interrompido pelo usuário")
+        elapsed = time.perf_counter() - started
+        print(
+            f"📊 {self.total_sent:,} eventos em {elapsed:.1f}s "
+            f"({self.total_sent / elapsed:,.0f} eventos/s) | ❌ {self.total_errors} erros"
+        )
+
 @click.command()
 @click.option(
     '--devices',
@@ -221,22 +471,73 @@ class TelemetrySimulator:
     default=100.0,
     help='Velocidade máxima em km/h'
 )
+@click.option(
+    '--mode',
+    type=click.Choice(['sync', 'async', 'replay'], case_sensitive=False),
+    default='sync',
+    help='sync: um device por vez (até 100); async: asyncio, até 50000 devices; replay: reenvia um trace'
+)
+@click.option(
+    '--concurrency',
+    type=int,
+    default=500,
+    help='Requisições em voo no modo async (conexões keep-alive)'
+)
+@click.option(
+    '--duration-s',
+    type=float,
+    default=0,
+    help='Duração no modo async em segundos (0 = até Ctrl+C)'
+)
+@click.option(
+    '--trace',
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help='Trace capturado no backend (modo replay)'
+)
+@click.option(
+    '--speed',
+    type=float,
+    default=1.0,
+    help='Velocidade do replay (1 = tempo real, 10 = 10x; 0 = o mais rápido possível)'
+)
+@click.option(
+    '--shift-ts/--keep-ts',
+    default=False,
+    help='Replay: desloca os ts para o primeiro evento cair em "agora" (padrão: ts originais)'
+)
 @click.option(
     '--api-url',
     type=str,
     default=None,
     help='URL da API (padrão: SIMULATOR_API_URL do .env ou http://localhost:8000)'
 )
-def main(devices, interval_ms, city, speed_min, speed_max, api_url):
+def main(devices, interval_ms, city, speed_min, speed_max, mode, concurrency, duration_s,
+         trace, speed, shift_ts, api_url):
     """Simulador de telemetria MonitoraEngine"""
     
     # API URL
     if not api_url:
         api_url = os.getenv('SIMULATOR_API_URL', 'http://localhost:8000')
     
+    if mode.lower() == 'replay':
+        if not trace:
+            click.echo("❌ Informe --trace no modo replay")
+            return
+        if speed < 0 or concurrency < 1:
+            click.echo("❌ --speed não pode ser negativo e a concorrência mínima é 1")
+            return
+        TraceReplayer(api_url, trace, speed, concurrency, shift_ts).run()
+        return
+    
     # Validações
-    if devices < 1 or devices > 100:
-        click.echo("❌ Número de devices deve estar entre 1 e 100")
+    max_devices = MAX_DEVICES[mode.lower()]
+    if devices < 1 or devices > max_devices:
+        click.echo(f"❌ Número de devices deve estar entre 1 e {max_devices} no modo {mode}")
+        return
+    
+    if concurrency < 1:
+        click.echo("❌ Concorrência mínima é 1")
         return
     
     if interval_ms < 100:
@@ -248,6 +549,18 @@ def main(devices, interval_ms, city, speed_min, speed_max, api_url):
         return
     
     # Criar e executar simulador
+    if mode.lower() == 'async':
+        simulator = AsyncTelemetrySimulator(
+            api_url=api_url,
+            num_devices=devices,
+            city=city,
+            speed_min=speed_min,
+            speed_max=speed_max,
+            concurrency=concurrency
+        )
+        simulator.run(interval_ms, duration_s)
+        return
+    
     simulator = TelemetrySimulator(
         api_url=api_url,
         num_devices=devices,
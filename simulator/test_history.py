@@ -0,0 +1,41 @@
+"""
+Gerador de histórico (history.py): semente e limites do intervalo
+
+Uso (dentro de simulator/):
+    python -m pytest -q test_history.py
+"""
+
+from datetime import datetime, timezone
+
+from history import HistoryGenerator, _EPOCH
+
+# Começa e termina no meio de turnos (06:00 e 12:37 em Brasília)
+START = datetime(2026, 1, 5, 9, 0, tzinfo=timezone.utc)
+END = datetime(2026, 1, 7, 15, 37, 13, tzinfo=timezone.utc)
+
+
+def _rows(seed: int) -> list:
+    generator = HistoryGenerator(5, "saopaulo", 20.0, 80.0, interval_s=30.0, seed=seed)
+    return list(generator.events(START, END))
+
+
+def test_same_seed_same_history():
+    first = _rows(7)
+    assert first == _rows(7)
+    assert first != _rows(8)
+
+
+def test_rows_inside_interval_in_ts_order():
+    rows = _rows(7)
+    start_us = int((START - _EPOCH).total_seconds() * 1e6)
+    end_us = int((END - _EPOCH).total_seconds() * 1e6)
+    assert rows
+    assert all(start_us <= r[0] < end_us for r in rows)
+    assert [r[0] for r in rows] == sorted(r[0] for r in rows)
+    assert len({r[1] for r in rows}) == 5
+
+    # Por device: uma leitura por intervalo no máximo, sem ts repetido
+    last = {}
+    for r in rows:
+        assert r[0] - last.get(r[1], -10**18) >= 30_000_000
+        last[r[1]] = r[0]
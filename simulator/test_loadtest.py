@@ -0,0 +1,101 @@
+"""
+Teste de carga (loadtest.py): histograma de latência e registro de falhas
+
+Uso (dentro de simulator/):
+    python -m pytest -q test_loadtest.py
+"""
+
+import asyncio
+
+import aiohttp
+
+from loadtest import LatencyHistogram, OpenLoopLoadTest
+from simulator import TelemetrySimulator
+
+
+def test_index_and_value_round_trip():
+    hist = LatencyHistogram()
+    previous = -1
+    for value in list(range(0, 2048)) + [10_000, 123_456, 1_000_000, 59_999_999, 60_000_000]:
+        index = hist._index(value)
+        assert index >= previous                # Monotônico
+        previous = index
+        top = hist._value(index)
+        assert top >= value                      # O bucket contém o valor
+        assert top - value <= value * 2 / hist.sub_buckets
+        assert hist._index(top) == index
+    # Resolução de 1 µs abaixo de sub_buckets
+    assert [hist._value(hist._index(v)) for v in (0, 1, 255)] == [0, 1, 255]
+
+
+def test_percentiles():
+    hist = LatencyHistogram()
+    assert hist.percentile(99) == 0
+    for value in range(1, 1001):
+        hist.record(value * 1000)               # 1 ms .. 1 s
+    for p, expected in ((50, 500_000), (90, 900_000), (99, 990_000), (99.9, 999_000)):
+        got = hist.percentile(p)
+        assert expected <= got <= expected * (1 + 2 / hist.sub_buckets)
+    assert hist.percentile(100) == 1_000_000    # Nunca passa do máximo visto
+
+    summary = hist.summary()
+    assert summary["count"] == 1000 and summary["min"] == 1.0 and summary["max"] == 1000.0
+    assert summary["mean"] == 500.5
+
+
+def test_record_clamps_overflow():
+    hist = LatencyHistogram(max_us=1_000_000)
+    hist.record(-5)
+    hist.record(5_000_000)
+    assert hist.overflow == 1 and hist.min_us == 0 and hist.max_seen_us == 1_000_000
+    assert sum(count for _, count in hist.buckets()) == 2
+
+
+class _Response:
+    status = 200
+
+    async def read(self):
+        return b""
+
+
+class _Post:
+    def __init__(self, error: Exception = None):
+        self.error = error
+
+    async def __aenter__(self):
+        if self.error:
+            raise self.error
+        return _Response()
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class _Session:
+    def __init__(self, error: Exception = None):
+        self.error = error
+
+    def post(self, url, json):
+        return _Post(self.error)
+
+
+def test_failed_requests_count_at_least_the_timeout():
+    simulator = TelemetrySimulator("http://test", 2, "saopaulo", 20.0, 80.0)
+    test = OpenLoopLoadTest("http://test", 100.0, 1.0, 0.0, simulator, 10, 100, timeout_s=2.0)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        device = test.devices[0]
+        await test._request(_Session(), device, loop.time(), measured=True)
+        await test._request(_Session(aiohttp.ClientConnectionError()), device, loop.time(), measured=True)
+        await test._request(_Session(asyncio.TimeoutError()), device, loop.time(), measured=True)
+        await test._request(_Session(asyncio.TimeoutError()), device, loop.time(), measured=False)
+
+    asyncio.run(run())
+    assert test.ok == 1
+    assert dict(test.errors) == {"ClientConnectionError": 1, "timeout": 1}
+    assert test.response_time.total == 3 and test.service_time.total == 3
+    # Sucesso instantâneo no p50; as duas falhas valem o timeout (2 s)
+    assert test.response_time.percentile(33) < 100_000
+    assert test.response_time.percentile(99) >= 2_000_000
+    assert test.service_time.percentile(50) >= 2_000_000